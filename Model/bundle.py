@@ -0,0 +1,224 @@
+"""
+Model Bundle
+Packages the soft ensemble as one directory of raw .npy arrays plus a JSON
+manifest. Arrays are memory-mapped read-only on load, so every gunicorn worker
+on a host shares the same page-cache copy of the forests instead of holding a
+private unpickled one, and members can be loaded lazily on first use.
+
+Layout:
+    ensemble_bundle/
+        manifest.json
+        scaler/{mean,scale}.npy
+        trees/*.npy         (flattened RF + XGB + GB, see tree_compiler.py)
+        svm/*.npy           (support vectors / coefficients, see svm_engine.py)
+        lr/{coef,intercept}.npy
+
+Usage:
+    python bundle.py        # build ensemble_bundle/ from the pickled models
+"""
+
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+from columnar import replace_directory
+from fingerprint import FINGERPRINT_KEY, members_fingerprint
+from tree_compiler import CompiledTreeEnsemble
+from svm_engine import SVMInferenceEngine
+
+BUNDLE_DIR = 'ensemble_bundle'
+BUNDLE_FORMAT_VERSION = 1
+
+# Members that can be loaded independently, in load order
+BUNDLE_MEMBERS = ['trees', 'svm', 'lr']
+
+
+def _softmax(raw):
+    raw = raw - raw.max(axis=1, keepdims=True)
+    np.exp(raw, out=raw)
+    raw /= raw.sum(axis=1, keepdims=True)
+    return raw
+
+
+class LogisticRegressionEngine:
+    """Multinomial logistic regression evaluated from its coefficients"""
+
+    def __init__(self, arrays):
+        self.coef = arrays['coef']
+        self.intercept = arrays['intercept']
+
+    @classmethod
+    def from_model(cls, lr_model):
+        return cls({
+            'coef': np.asarray(lr_model.coef_, dtype=np.float64),
+            'intercept': np.asarray(lr_model.intercept_, dtype=np.float64),
+        })
+
+    def to_arrays(self):
+        return {'coef': self.coef, 'intercept': self.intercept}
+
+    def predict_proba(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return _softmax(X @ self.coef.T + self.intercept)
+
+
+MEMBER_ENGINES = {
+    'trees': CompiledTreeEnsemble,
+    'svm': SVMInferenceEngine,
+    'lr': LogisticRegressionEngine,
+}
+
+
+def _write_arrays(directory, arrays):
+    """Save each array as <name>.npy and return its manifest entry"""
+    os.makedirs(directory, exist_ok=True)
+    entries = {}
+    for name, value in arrays.items():
+        value = np.asarray(value)
+        np.save(os.path.join(directory, f'{name}.npy'), value, allow_pickle=False)
+        entries[name] = {'dtype': value.dtype.str, 'shape': list(value.shape)}
+    return entries
+
+
+def export_bundle(path, rf_model, xgb_model, gb_model, svm_model, lr_model, scaler, class_mapping,
+                  feature_columns, members_fingerprint=None):
+    """
+    Write the fitted ensemble to a bundle directory
+
+    The bundle is assembled in a temporary sibling directory and renamed into
+    place, so readers never observe a half-written bundle. members_fingerprint
+    identifies the pickles the members were saved as (see fingerprint.py).
+    """
+    path = os.path.abspath(path)
+    staging = f'{path}.tmp-{os.getpid()}'
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+
+    members = {
+        'trees': CompiledTreeEnsemble.from_models(rf_model, xgb_model, gb_model).to_arrays(),
+        'svm': SVMInferenceEngine.from_model(svm_model, method='exact').to_arrays(),
+        'lr': LogisticRegressionEngine.from_model(lr_model).to_arrays(),
+    }
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        FINGERPRINT_KEY: members_fingerprint,
+        'feature_columns': list(feature_columns),
+        'numeric_cols': list(scaler.feature_names_in_),
+        'class_mapping': {str(k): v for k, v in class_mapping.items()},
+        'scaler': _write_arrays(os.path.join(staging, 'scaler'), {
+            'mean': np.asarray(scaler.mean_, dtype=np.float64),
+            'scale': np.asarray(scaler.scale_, dtype=np.float64),
+        }),
+        'members': {
+            name: _write_arrays(os.path.join(staging, name), arrays)
+            for name, arrays in members.items()
+        },
+    }
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    replace_directory(staging, path)
+    return path
+
+
+class ModelBundle:
+    """
+    Read-only view of an exported bundle
+
+    Large arrays are opened with np.load(mmap_mode='r'): pages are read from
+    the OS page cache on demand and shared by every process mapping the same
+    file. With lazy=True each member (trees, svm, lr) is mapped on first use.
+    """
+
+    def __init__(self, path, lazy=False):
+        self.path = os.path.abspath(path)
+        with open(os.path.join(self.path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported bundle format: {self.manifest.get('format_version')}")
+
+        self.members_fingerprint = self.manifest.get(FINGERPRINT_KEY)
+        self.feature_columns = self.manifest['feature_columns']
+        self.numeric_cols = self.manifest['numeric_cols']
+        self.class_mapping = {int(k): v for k, v in self.manifest['class_mapping'].items()}
+        scaler = self._load_arrays('scaler', self.manifest['scaler'])
+        self.scaler_mean = scaler['mean']
+        self.scaler_scale = scaler['scale']
+
+        self._members = {}
+        self._lock = threading.Lock()
+        if not lazy:
+            for name in BUNDLE_MEMBERS:
+                self.member(name)
+
+    def _load_arrays(self, directory, entries):
+        arrays = {}
+        for name, entry in entries.items():
+            file_path = os.path.join(self.path, directory, f'{name}.npy')
+            # Scalars are read eagerly; everything else is mapped read-only
+            mmap_mode = None if not entry['shape'] else 'r'
+            arrays[name] = np.load(file_path, mmap_mode=mmap_mode, allow_pickle=False)
+        return arrays
+
+    def member(self, name):
+        """Return the engine for a member, loading it on first access"""
+        engine = self._members.get(name)
+        if engine is None:
+            with self._lock:
+                engine = self._members.get(name)
+                if engine is None:
+                    arrays = self._load_arrays(name, self.manifest['members'][name])
+                    engine = self._members[name] = MEMBER_ENGINES[name](arrays)
+        return engine
+
+    @property
+    def loaded_members(self):
+        return [name for name in BUNDLE_MEMBERS if name in self._members]
+
+    @property
+    def trees(self):
+        return self.member('trees')
+
+    @property
+    def svm(self):
+        return self.member('svm')
+
+    @property
+    def lr(self):
+        return self.member('lr')
+
+
+def build_bundle_from_pickles(model_dir=None, output_path=None):
+    """Convert the pickled models in model_dir into a bundle"""
+    from predict import FEATURE_COLUMNS
+
+    if model_dir is None:
+        model_dir = os.path.dirname(os.path.abspath(__file__))
+    if output_path is None:
+        output_path = os.path.join(model_dir, BUNDLE_DIR)
+
+    def load(name):
+        return joblib.load(os.path.join(model_dir, name))
+
+    return export_bundle(
+        output_path,
+        load('rf_model.pkl'), load('xgb_model.pkl'), load('gb_model.pkl'),
+        load('svm_model.pkl'), load('lr_model.pkl'), load('scaler.pkl'),
+        load('class_mapping.pkl'), FEATURE_COLUMNS, members_fingerprint(model_dir)
+    )
+
+
+if __name__ == "__main__":
+    path = build_bundle_from_pickles()
+    total = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path) for name in files
+    )
+    print(f"✓ Model bundle written to {path} ({total / 1e6:.1f} MB)")
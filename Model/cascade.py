@@ -0,0 +1,218 @@
+"""
+Early-Exit Cascade Calibration
+Calibrates and evaluates the cascade mode of SoftEnsemblePredictor: members
+run cheapest first, and a panel stops as soon as the soft vote of the members
+evaluated so far is decided by a margin the calibration data shows is safe.
+
+After k members, the margin is the gap between the top two classes of the
+partial soft vote. The threshold for stage k is the largest margin any
+calibration panel had while its partial label still disagreed with the full
+five-member ensemble, plus a slack. Panels above it exit; the rest go on to
+the next member. The last member always completes the full vote.
+
+cascade.json:
+    {"order": ["lr", "xgb", ...], "thresholds": [t1, null, t3, t4],
+     "members_fingerprint": "...", ...}
+
+A margin is at most 1, so a stage whose calibrated threshold reaches 1 could
+never exit. Its threshold is written as null instead: the member is merged
+into the next stage and the panel goes on without a check.
+
+The thresholds only hold for the members they were calibrated on, so
+SoftEnsemblePredictor refuses a cascade.json whose fingerprint does not match
+the loaded models (see fingerprint.py); rerun this tool after retraining.
+
+Usage:
+    python cascade.py [--slack 0.05] [--order lr xgb rf gb svm] [--tree-engine compiled]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from fingerprint import FINGERPRINT_KEY
+
+CASCADE_FILE = 'cascade.json'
+
+# Members in the averaging order used by predict.py
+CASCADE_MEMBERS = ['rf', 'xgb', 'gb', 'svm', 'lr']
+
+# Run last by default: they should only see the ambiguous panels
+EXPENSIVE_MEMBERS = ['svm', 'gb']
+
+
+def load_cascade(path):
+    """Read a cascade configuration written by this tool (with the fingerprint of its members)"""
+    with open(path) as f:
+        config = json.load(f)
+    order = list(config['order'])
+    thresholds = [None if t is None else float(t) for t in config['thresholds']]
+    if sorted(order) != sorted(CASCADE_MEMBERS) or len(thresholds) != len(order) - 1:
+        raise ValueError(f"Invalid cascade configuration: {path}")
+    return {'order': order, 'thresholds': thresholds, FINGERPRINT_KEY: config.get(FINGERPRINT_KEY)}
+
+
+def vote_margin(partial):
+    """Gap between the two most probable classes of each row"""
+    top_two = np.partition(partial, -2, axis=1)[:, -2:]
+    return top_two[:, 1] - top_two[:, 0]
+
+
+def fit_thresholds(member_probas, order, slack=0.05):
+    """
+    Per-stage exit thresholds from calibration data
+
+    Args:
+        member_probas: Dict mapping member name to its (n_samples, 3) probabilities
+        order: Cascade order of member names
+        slack: Added to each stage's largest disagreeing margin
+
+    Returns:
+        List of len(order) - 1 thresholds; None where the threshold would be
+        >= 1 (no margin exceeds it), merging that member into the next stage
+    """
+    full_labels = np.argmax(np.mean([member_probas[name] for name in CASCADE_MEMBERS], axis=0), axis=1)
+    total = np.zeros_like(member_probas[order[0]])
+    thresholds = []
+    for k, name in enumerate(order[:-1], start=1):
+        total += member_probas[name]
+        partial = total / k
+        disagree = np.argmax(partial, axis=1) != full_labels
+        worst = float(vote_margin(partial)[disagree].max(initial=0.0))
+        thresholds.append(worst + slack if worst + slack < 1 else None)
+    return thresholds
+
+
+def simulate(member_probas, order, thresholds):
+    """
+    Replay the cascade on precomputed member probabilities
+
+    Returns:
+        (labels, members_used) arrays, as the predictor's cascade mode would produce
+    """
+    n = len(member_probas[order[0]])
+    total = np.zeros((n, 3))
+    used = np.zeros(n, dtype=np.int64)
+    active = np.arange(n)
+    for k, name in enumerate(order, start=1):
+        total[active] += member_probas[name][active]
+        used[active] = k
+        if k == len(order):
+            break
+        if thresholds[k - 1] is None:
+            continue
+        done = vote_margin(total[active] / k) > thresholds[k - 1]
+        active = active[~done]
+        if len(active) == 0:
+            break
+    return np.argmax(total / used[:, None], axis=1), used
+
+
+def evaluate(member_probas, order, thresholds, member_cost):
+    """Agreement with the full ensemble, members per panel and cost saved"""
+    full_labels = np.argmax(np.mean([member_probas[name] for name in CASCADE_MEMBERS], axis=0), axis=1)
+    labels, used = simulate(member_probas, order, thresholds)
+    stage_cost = np.cumsum([member_cost[name] for name in order])
+    full_cost = stage_cost[-1]
+    return {
+        'rows': int(len(labels)),
+        'agreement': float(np.mean(labels == full_labels)),
+        'mean_members': float(np.mean(used)),
+        'exit_rates': [float(np.mean(used == k)) for k in range(1, len(order) + 1)],
+        'cost_saved': float(1 - np.mean(stage_cost[used - 1]) / full_cost),
+    }
+
+
+def measure_member_costs(predictor, X, repeat=200):
+    """Median single-row latency of each member (seconds) with the predictor's engines"""
+    costs = {}
+    rows = X[:repeat]
+    for i, name in enumerate(CASCADE_MEMBERS):
+        predictor._member_proba(i, rows[:1])
+        timings = []
+        for row in rows:
+            start = time.perf_counter()
+            predictor._member_proba(i, row[None, :])
+            timings.append(time.perf_counter() - start)
+        costs[name] = float(np.median(timings))
+    return costs
+
+
+def main():
+    import pandas as pd
+    from predict import SoftEnsemblePredictor, FEATURE_COLUMNS
+
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=os.path.join(model_dir, '..', 'dataset', 'df_copy_cleaned.csv'))
+    parser.add_argument('--output', default=os.path.join(model_dir, CASCADE_FILE))
+    parser.add_argument('--order', nargs=len(CASCADE_MEMBERS), choices=CASCADE_MEMBERS,
+                        help='member order (default: lr, then the tree models by measured single-row cost, '
+                             'then svm and gb)')
+    parser.add_argument('--slack', type=float, default=0.05, help='added to every stage threshold')
+    parser.add_argument('--tree-engine', choices=['sklearn', 'compiled'], default='sklearn')
+    parser.add_argument('--svm-engine', default='sklearn')
+    parser.add_argument('--bundle', help='calibrate a model bundle directory (see bundle.py)')
+    parser.add_argument('--seed', type=int, default=42, help='seed for the held-out split')
+    args = parser.parse_args()
+
+    predictor = SoftEnsemblePredictor(tree_engine=args.tree_engine, svm_engine=args.svm_engine,
+                                      bundle_dir=args.bundle)
+    df = pd.read_csv(args.data)
+    X = predictor.preprocess_array(df[FEATURE_COLUMNS].dropna().to_numpy(dtype=np.float64))
+    member_probas = dict(zip(CASCADE_MEMBERS, predictor._member_probas(X)))
+
+    costs = measure_member_costs(predictor, X)
+    order = args.order or (['lr'] + sorted((name for name in CASCADE_MEMBERS
+                                            if name != 'lr' and name not in EXPENSIVE_MEMBERS), key=costs.get)
+                           + sorted(EXPENSIVE_MEMBERS, key=costs.get))
+    print("\nSingle-row member cost (ms): " + ', '.join(f"{name} {costs[name] * 1000:.3f}" for name in order))
+    print(f"Cascade order: {' -> '.join(order)}")
+
+    # Honest estimate: calibrate on one half, evaluate on the other
+    permutation = np.random.default_rng(args.seed).permutation(len(X))
+    halves = np.array_split(permutation, 2)
+    split = [{name: probas[rows] for name, probas in member_probas.items()} for rows in halves]
+    held_out = evaluate(split[1], order, fit_thresholds(split[0], order, args.slack), costs)
+
+    thresholds = fit_thresholds(member_probas, order, args.slack)
+    in_sample = evaluate(member_probas, order, thresholds, costs)
+
+    print(f"Thresholds: {', '.join('merged' if t is None else f'{t:.3f}' for t in thresholds)}")
+    print(f"\n{'':<22}{'rows':>7}{'agreement':>11}{'members':>9}{'cost saved':>12}   exits per stage")
+    for label, report in (('held-out half', held_out), ('all rows (final)', in_sample)):
+        exits = ' '.join(f"{rate:.1%}" for rate in report['exit_rates'])
+        print(f"{label:<22}{report['rows']:>7}{report['agreement']:>11.2%}{report['mean_members']:>9.2f}"
+              f"{report['cost_saved']:>12.1%}   {exits}")
+
+    # Wall-clock check through the predictor itself
+    panels = df[FEATURE_COLUMNS].dropna().to_numpy(dtype=np.float64)[:500]
+    timings = {}
+    for mode, cascade in (('full', None), ('cascade', {'order': order, 'thresholds': thresholds})):
+        predictor.cascade = cascade
+        start = time.perf_counter()
+        for row in panels:
+            predictor.predict_array(row)
+        timings[mode] = (time.perf_counter() - start) / len(panels) * 1000
+    print(f"\npredict_array over {len(panels)} panels: {timings['full']:.3f} ms full, "
+          f"{timings['cascade']:.3f} ms cascade ({1 - timings['cascade'] / timings['full']:.1%} saved)")
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'order': order,
+            'thresholds': thresholds,
+            'slack': args.slack,
+            FINGERPRINT_KEY: predictor.members_fingerprint,
+            'member_cost_ms': {name: costs[name] * 1000 for name in order},
+            'engines': {'tree_engine': args.tree_engine, 'svm_engine': args.svm_engine, 'bundle': args.bundle},
+            'held_out': held_out,
+            'calibration': in_sample,
+        }, f, indent=2)
+    print(f"✓ Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Columnar Dataset Format
+Converts the dataset CSVs into a directory of typed, memory-mappable .npy
+columns so callers load only the columns they need without re-parsing text.
+
+Column encodings:
+    bool      't'/'f' flags as uint8 0/1
+    category  strings as dictionary codes (int8/16/32, -1 = null)
+    int       smallest integer dtype that holds the range
+    float     float32 plus the column's decimal precision; float64 is used
+              when float32 cannot reproduce the CSV values exactly
+Nullable columns get an explicit uint8 null mask.
+
+to_frame(exact=True) rebuilds exactly the DataFrame pd.read_csv returns
+(float64 values re-rounded to their decimal precision, original strings);
+this is checked when the table is written. The default typed mode returns
+float32, bool and categorical columns.
+
+Layout:
+    thyroidDF.cols/
+        manifest.json
+        000_values.npy, 000_mask.npy, ...
+
+Usage:
+    python columnar.py [csv ...]    # default: both dataset CSVs
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+COLUMNAR_FORMAT_VERSION = 1
+COLUMNAR_SUFFIX = '.cols'
+
+# Most decimal places tried when checking that float32 storage is lossless
+MAX_DECIMALS = 6
+
+BOOL_LITERALS = ('t', 'f')
+
+
+def columnar_path(csv_path):
+    """Directory holding the columnar copy of a CSV (thyroidDF.csv -> thyroidDF.cols)"""
+    root, _ = os.path.splitext(csv_path)
+    return root + COLUMNAR_SUFFIX
+
+
+def _smallest_int_dtype(low, high):
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _float32_decimals(values):
+    """Decimal places that make float32 storage lossless, or None"""
+    as_float32 = values.astype(np.float32).astype(np.float64)
+    for decimals in range(MAX_DECIMALS + 1):
+        if np.array_equal(np.round(as_float32, decimals), values):
+            return decimals
+    return None
+
+
+def _encode_column(series):
+    """Return (column manifest entry, values array, null mask or None)"""
+    mask = series.isna().to_numpy()
+    entry = {'name': series.name, 'nullable': bool(mask.any())}
+
+    if pd.api.types.is_bool_dtype(series) and not mask.any():
+        entry.update(kind='bool', true=None, false=None)
+        return entry, series.to_numpy(dtype=np.uint8), None
+
+    if pd.api.types.is_integer_dtype(series) and not mask.any():
+        values = series.to_numpy()
+        dtype = _smallest_int_dtype(values.min(), values.max()) if len(values) else np.dtype(np.int64)
+        entry.update(kind='int', source_dtype=str(series.dtype))
+        return entry, values.astype(dtype), None
+
+    if pd.api.types.is_float_dtype(series) or pd.api.types.is_integer_dtype(series):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        decimals = _float32_decimals(values[~mask])
+        entry.update(kind='float', decimals=decimals)
+        stored = np.where(mask, 0.0, values).astype(np.float32 if decimals is not None else np.float64)
+        return entry, stored, mask.astype(np.uint8) if mask.any() else None
+
+    present = series[~mask]
+    if set(present.unique()) <= set(BOOL_LITERALS):
+        entry.update(kind='bool', true=BOOL_LITERALS[0], false=BOOL_LITERALS[1])
+        values = (series == BOOL_LITERALS[0]).to_numpy(dtype=np.uint8)
+        return entry, values, mask.astype(np.uint8) if mask.any() else None
+
+    codes, dictionary = pd.factorize(series.astype(object), sort=True, use_na_sentinel=True)
+    entry.update(kind='category', dictionary=[str(value) for value in dictionary])
+    codes = codes.astype(_smallest_int_dtype(-1, max(len(dictionary) - 1, 0)))
+    return entry, codes, None
+
+
+def replace_directory(staging, path):
+    """
+    Move a fully written staging directory to path
+
+    An existing directory is renamed aside first and deleted only once the
+    new one is in place, so path is never missing while a slow rmtree runs,
+    and files already open in the old directory stay readable.
+    """
+    previous = None
+    if os.path.exists(path):
+        previous = f'{path}.old-{os.getpid()}'
+        if os.path.exists(previous):
+            shutil.rmtree(previous)
+        os.rename(path, previous)
+    os.rename(staging, path)
+    if previous is not None:
+        shutil.rmtree(previous)
+
+
+def write_table(df, path, source=None):
+    """
+    Write a DataFrame as a columnar table directory
+
+    The table is written to a staging directory, read back and compared with
+    df, then renamed into place, so readers never see a partial table.
+    """
+    path = os.path.abspath(path)
+    staging = f'{path}.tmp-{os.getpid()}'
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    os.makedirs(staging)
+
+    columns = []
+    for index, name in enumerate(df.columns):
+        entry, values, mask = _encode_column(df[name])
+        entry['values'] = f'{index:03d}_values.npy'
+        np.save(os.path.join(staging, entry['values']), values, allow_pickle=False)
+        if mask is not None:
+            entry['mask'] = f'{index:03d}_mask.npy'
+            np.save(os.path.join(staging, entry['mask']), mask, allow_pickle=False)
+        entry['dtype'] = values.dtype.str
+        columns.append(entry)
+
+    manifest = {
+        'format_version': COLUMNAR_FORMAT_VERSION,
+        'n_rows': len(df),
+        'source': source,
+        'columns': columns,
+    }
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    pd.testing.assert_frame_equal(ColumnarTable(staging).to_frame(exact=True), df)
+
+    replace_directory(staging, path)
+    return path
+
+
+def convert_csv(csv_path, output_path=None):
+    """Parse a CSV once and store it as a columnar table next to it"""
+    if output_path is None:
+        output_path = columnar_path(csv_path)
+    st = os.stat(csv_path)
+    df = pd.read_csv(csv_path)
+    source = {'path': os.path.basename(csv_path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    return write_table(df, output_path, source=source)
+
+
+class ColumnarTable:
+    """
+    Read-only columnar table
+
+    Column arrays are opened with np.load(mmap_mode='r') when mmap=True, so
+    only the pages of the columns actually requested are read from disk.
+    """
+
+    def __init__(self, path, mmap=True):
+        self.path = os.path.abspath(path)
+        with open(os.path.join(self.path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != COLUMNAR_FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format: {self.manifest.get('format_version')}")
+        self.n_rows = self.manifest['n_rows']
+        self._entries = {entry['name']: entry for entry in self.manifest['columns']}
+        self._mmap_mode = 'r' if mmap else None
+
+    @property
+    def columns(self):
+        return [entry['name'] for entry in self.manifest['columns']]
+
+    def is_fresh(self, csv_path):
+        """True if the table was converted from csv_path at its current size and mtime"""
+        source = self.manifest.get('source')
+        if not source:
+            return False
+        st = os.stat(csv_path)
+        return (source['size'], source['mtime_ns']) == (st.st_size, st.st_mtime_ns)
+
+    def _load(self, file_name):
+        return np.load(os.path.join(self.path, file_name), mmap_mode=self._mmap_mode, allow_pickle=False)
+
+    def column(self, name, exact=False):
+        """
+        Decode one column
+
+        Args:
+            name: Column name
+            exact: Reproduce pd.read_csv's values and dtypes instead of the
+                   compact float32 / bool / categorical representation
+        """
+        entry = self._entries[name]
+        values = self._load(entry['values'])
+        mask = self._load(entry['mask']).view(bool) if 'mask' in entry else None
+        kind = entry['kind']
+
+        if kind == 'int':
+            data = values.astype(entry['source_dtype']) if exact else values
+        elif kind == 'float':
+            if exact:
+                data = values.astype(np.float64)
+            else:
+                data = values if mask is None else np.array(values)
+            if exact and entry['decimals'] is not None:
+                np.round(data, entry['decimals'], out=data)
+            if mask is not None:
+                data[mask] = np.nan
+        elif kind == 'bool':
+            flags = values.view(bool)
+            if exact and entry['true'] is not None:
+                # Fixed-width strings convert to pandas strings much faster
+                # than object arrays; nulls need the object form
+                data = np.where(flags, entry['true'], entry['false'])
+                if mask is not None:
+                    data = data.astype(object)
+                    data[mask] = np.nan
+            elif mask is not None:
+                data = pd.arrays.BooleanArray(np.array(flags), np.array(mask))
+            else:
+                data = flags
+        else:
+            if exact and entry['nullable']:
+                data = np.array(entry['dictionary'] + [np.nan], dtype=object)[values]
+            elif exact:
+                data = np.array(entry['dictionary'])[values]
+            else:
+                data = pd.Categorical.from_codes(values, categories=entry['dictionary'])
+        return pd.Series(data, name=name)
+
+    def to_frame(self, columns=None, exact=False):
+        """DataFrame of the requested columns (all by default), in the order given"""
+        if columns is None:
+            columns = self.columns
+        return pd.DataFrame({name: self.column(name, exact=exact) for name in columns})
+
+
+def load_table(csv_path, columns=None, exact=False, mmap=True):
+    """
+    Load a dataset CSV, using its columnar copy when one is up to date
+
+    Falls back to pd.read_csv(usecols=columns) if the columnar table is
+    missing or was converted from an older version of the CSV.
+    """
+    table_path = columnar_path(csv_path)
+    if os.path.exists(os.path.join(table_path, 'manifest.json')):
+        table = ColumnarTable(table_path, mmap=mmap)
+        if table.is_fresh(csv_path):
+            return table.to_frame(columns, exact=exact)
+    df = pd.read_csv(csv_path, usecols=columns)
+    return df if columns is None else df[list(columns)]
+
+
+if __name__ == "__main__":
+    import sys
+
+    dataset_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dataset')
+    csv_paths = sys.argv[1:] or [
+        os.path.join(dataset_dir, 'thyroidDF.csv'),
+        os.path.join(dataset_dir, 'df_copy_cleaned.csv'),
+    ]
+    for csv_path in csv_paths:
+        path = convert_csv(csv_path)
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        table = ColumnarTable(path)
+        kinds = {}
+        for entry in table.manifest['columns']:
+            kinds[entry['kind']] = kinds.get(entry['kind'], 0) + 1
+        print(f"✓ {os.path.basename(csv_path)} -> {os.path.basename(path)}/ "
+              f"({table.n_rows} rows, {os.path.getsize(csv_path) / 1e3:.0f} KB -> {size / 1e3:.0f} KB, {kinds})")
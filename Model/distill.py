@@ -0,0 +1,280 @@
+"""
+Ensemble Distillation
+Trains one compact student model on the soft ensemble's probabilities so it
+can serve in place of the five members (SoftEnsemblePredictor(student=True)).
+
+The student is a small ReLU MLP with a softmax output, trained in NumPy with
+Adam on the cross-entropy against the ensemble's soft labels. The training
+split of model.py is augmented with jittered copies (Gaussian noise on the
+scaled lab values) that the ensemble labels too, so the student also learns
+the ensemble's decision surface between the training panels.
+
+student.npz holds the layer weights together with the scaler parameters and
+class names, so serving the student loads no pickles at all.
+
+Usage:
+    python distill.py [--hidden 64 64] [--epochs 60] [--copies 8] [--noise 0.25]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from fingerprint import FINGERPRINT_KEY
+
+STUDENT_FILE = 'student.npz'
+
+
+def _softmax(logits):
+    """Row-wise softmax of raw scores"""
+    logits = logits - logits.max(axis=1, keepdims=True)
+    np.exp(logits, out=logits)
+    logits /= logits.sum(axis=1, keepdims=True)
+    return logits
+
+
+class StudentMLP:
+    """Fully connected ReLU network with a softmax output over the three classes"""
+
+    def __init__(self, arrays):
+        n_layers = int(arrays['n_layers'])
+        self.weights = [np.ascontiguousarray(arrays[f'weight_{i}'], dtype=np.float64) for i in range(n_layers)]
+        self.biases = [np.ascontiguousarray(arrays[f'bias_{i}'], dtype=np.float64) for i in range(n_layers)]
+        self.scale_mean = np.asarray(arrays['scale_mean'], dtype=np.float64)
+        self.scale_scale = np.asarray(arrays['scale_scale'], dtype=np.float64)
+        self.numeric_cols = [str(col) for col in arrays['numeric_cols']]
+        self.class_mapping = {i: str(name) for i, name in enumerate(arrays['class_names'])}
+        # Fingerprint of the teacher's member pickles (see fingerprint.py)
+        self.members_fingerprint = str(arrays[FINGERPRINT_KEY]) if FINGERPRINT_KEY in arrays else None
+
+    @classmethod
+    def initialize(cls, sizes, scale_mean, scale_scale, numeric_cols, class_mapping, seed=0):
+        """
+        Untrained network with He-initialized weights
+
+        Args:
+            sizes: Layer widths including input and output, e.g. [15, 64, 64, 3]
+            scale_mean, scale_scale, numeric_cols: Scaler the inputs are prepared with
+            class_mapping: Dict mapping class index to label
+        """
+        rng = np.random.default_rng(seed)
+        arrays = {
+            'n_layers': np.int32(len(sizes) - 1),
+            'scale_mean': scale_mean, 'scale_scale': scale_scale,
+            'numeric_cols': np.array(numeric_cols),
+            'class_names': np.array([class_mapping[i] for i in range(sizes[-1])]),
+        }
+        for i, (fan_in, fan_out) in enumerate(zip(sizes[:-1], sizes[1:])):
+            arrays[f'weight_{i}'] = rng.normal(0, np.sqrt(2.0 / fan_in), size=(fan_in, fan_out))
+            arrays[f'bias_{i}'] = np.zeros(fan_out)
+        return cls(arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load an exported student (.npz)"""
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def to_arrays(self):
+        """All arrays needed to rebuild the student"""
+        arrays = {
+            'n_layers': np.int32(len(self.weights)),
+            'scale_mean': self.scale_mean, 'scale_scale': self.scale_scale,
+            'numeric_cols': np.array(self.numeric_cols),
+            'class_names': np.array([self.class_mapping[i] for i in range(len(self.class_mapping))]),
+        }
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            arrays[f'weight_{i}'] = weight
+            arrays[f'bias_{i}'] = bias
+        if self.members_fingerprint is not None:
+            arrays[FINGERPRINT_KEY] = np.array(self.members_fingerprint)
+        return arrays
+
+    def save(self, path):
+        """Export the student arrays to a .npz file"""
+        np.savez(path, **self.to_arrays())
+
+    @property
+    def n_parameters(self):
+        return int(sum(w.size + b.size for w, b in zip(self.weights, self.biases)))
+
+    def _forward(self, X):
+        """Hidden activations (input first) and output probabilities"""
+        activations = [X]
+        hidden = X
+        for weight, bias in zip(self.weights[:-1], self.biases[:-1]):
+            hidden = hidden @ weight
+            hidden += bias
+            np.maximum(hidden, 0, out=hidden)
+            activations.append(hidden)
+        logits = hidden @ self.weights[-1]
+        logits += self.biases[-1]
+        return activations, _softmax(logits)
+
+    def predict_proba(self, X):
+        """(n_samples, 3) class probabilities for scaled inputs in FEATURE_COLUMNS order"""
+        return self._forward(np.atleast_2d(np.asarray(X, dtype=np.float64)))[1]
+
+    def fit(self, X, targets, epochs=60, batch_size=256, learning_rate=3e-3, seed=0, progress=None):
+        """
+        Minimize the cross-entropy against soft targets with Adam and a cosine
+        learning-rate decay
+
+        Args:
+            X: (n_samples, n_features) scaled inputs
+            targets: (n_samples, 3) teacher probabilities
+            progress: Optional callable(epoch, mean_loss) after each epoch
+        """
+        rng = np.random.default_rng(seed)
+        params = self.weights + self.biases
+        first = [np.zeros_like(p) for p in params]
+        second = [np.zeros_like(p) for p in params]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        steps_per_epoch = -(-len(X) // batch_size)
+        total_steps = epochs * steps_per_epoch
+        step = 0
+        for epoch in range(epochs):
+            order = rng.permutation(len(X))
+            loss = 0.0
+            for start in range(0, len(X), batch_size):
+                rows = order[start:start + batch_size]
+                activations, proba = self._forward(X[rows])
+                target = targets[rows]
+                loss += -float(np.sum(target * np.log(np.clip(proba, 1e-12, None))))
+
+                # Softmax + cross-entropy gradient, then back through the ReLU layers
+                grad = (proba - target) / len(rows)
+                weight_grads, bias_grads = [], []
+                for i in range(len(self.weights) - 1, -1, -1):
+                    weight_grads.append(activations[i].T @ grad)
+                    bias_grads.append(grad.sum(axis=0))
+                    if i > 0:
+                        grad = (grad @ self.weights[i].T) * (activations[i] > 0)
+                grads = weight_grads[::-1] + bias_grads[::-1]
+
+                step += 1
+                rate = learning_rate * 0.5 * (1 + np.cos(np.pi * step / total_steps))
+                for param, g, m, v in zip(params, grads, first, second):
+                    m *= beta1
+                    m += (1 - beta1) * g
+                    v *= beta2
+                    v += (1 - beta2) * g * g
+                    param -= rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+            if progress is not None:
+                progress(epoch, loss / len(X))
+        return self
+
+
+def augment(X, scaled_idx, copies=8, noise=0.25, seed=0):
+    """
+    X plus `copies` jittered copies with N(0, noise) added to the scaled lab
+    values (in standard deviations); age, sex and the measured flags are kept
+    """
+    rng = np.random.default_rng(seed)
+    out = [X]
+    for _ in range(copies):
+        jittered = X.copy()
+        jittered[:, scaled_idx] += rng.normal(0, noise, size=(len(X), len(scaled_idx)))
+        out.append(jittered)
+    return np.concatenate(out)
+
+
+def fidelity_report(student_proba, teacher_proba, y=None):
+    """Agreement with the ensemble's labels, probability error and (with y) accuracy"""
+    student_labels = student_proba.argmax(axis=1)
+    teacher_labels = teacher_proba.argmax(axis=1)
+    diff = np.abs(student_proba - teacher_proba)
+    report = {
+        'rows': int(len(student_proba)),
+        'agreement': float(np.mean(student_labels == teacher_labels)),
+        'mean_abs_prob_diff': float(diff.mean()),
+        'max_abs_prob_diff': float(diff.max()),
+    }
+    if y is not None:
+        report['student_accuracy'] = float(np.mean(student_labels == y))
+        report['ensemble_accuracy'] = float(np.mean(teacher_labels == y))
+    return report
+
+
+def _median_ms(fn, repeat=200):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from predict import SoftEnsemblePredictor, FEATURE_COLUMNS
+
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=os.path.join(model_dir, '..', 'dataset', 'df_copy_cleaned.csv'))
+    parser.add_argument('--output', default=os.path.join(model_dir, STUDENT_FILE))
+    parser.add_argument('--hidden', type=int, nargs='+', default=[64, 64], help='hidden layer widths')
+    parser.add_argument('--epochs', type=int, default=60)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--learning-rate', type=float, default=3e-3)
+    parser.add_argument('--copies', type=int, default=8, help='jittered copies of each training panel')
+    parser.add_argument('--noise', type=float, default=0.25, help='jitter in standard deviations of the scaled labs')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # Labels are computed in 4096-row chunks, where the libraries' native tree
+    # code is faster than the compiled evaluator (see compiled_max_rows)
+    teacher = SoftEnsemblePredictor()
+    df = pd.read_csv(args.data)
+    X = teacher.preprocess_array(df[FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+    y = df['target'].to_numpy()
+
+    # Same held-out split as model.py
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    X_fit = augment(X_train, teacher._scaled_idx, args.copies, args.noise, args.seed)
+    start = time.perf_counter()
+    targets = np.concatenate([teacher._ensemble_proba(X_fit[i:i + 4096]) for i in range(0, len(X_fit), 4096)])
+    print(f"\nLabelled {len(X_fit):,} panels ({len(X_train):,} + {args.copies} jittered copies) "
+          f"with the ensemble in {time.perf_counter() - start:.1f}s")
+
+    sizes = [len(FEATURE_COLUMNS)] + args.hidden + [len(teacher.class_mapping)]
+    student = StudentMLP.initialize(sizes, teacher._scale_mean, teacher._scale_scale, teacher.numeric_cols,
+                                    teacher.class_mapping, seed=args.seed)
+    student.members_fingerprint = teacher.members_fingerprint
+    print(f"Training student {' -> '.join(map(str, sizes))} ({student.n_parameters:,} parameters)")
+
+    def progress(epoch, loss):
+        if (epoch + 1) % 10 == 0 or epoch + 1 == args.epochs:
+            print(f"  epoch {epoch + 1:>3}: cross-entropy {loss:.4f}")
+
+    start = time.perf_counter()
+    student.fit(X_fit, targets, epochs=args.epochs, batch_size=args.batch_size,
+                learning_rate=args.learning_rate, seed=args.seed, progress=progress)
+    print(f"  trained in {time.perf_counter() - start:.1f}s")
+
+    report = fidelity_report(student.predict_proba(X_test), teacher._ensemble_proba(X_test), y_test)
+    print(f"\nHeld-out split ({report['rows']} panels):")
+    print(f"  Agreement with ensemble: {report['agreement']:.2%}")
+    print(f"  Mean |p - p_ensemble|:  {report['mean_abs_prob_diff']:.4f} (max {report['max_abs_prob_diff']:.4f})")
+    print(f"  Accuracy: student {report['student_accuracy']:.2%}, ensemble {report['ensemble_accuracy']:.2%}")
+
+    student.save(args.output)
+    print(f"\n✓ Wrote {args.output} ({os.path.getsize(args.output) / 1024:.0f} KB)")
+
+    # Serving latency through the predictor itself
+    served = SoftEnsemblePredictor(student=args.output)
+    panels = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    row = panels[0]
+    print(f"\n{'':<24}{'1 row (ms)':>12}{f'{len(panels)} rows (ms)':>18}")
+    for name, predictor in (('ensemble', teacher), ('student', served)):
+        row_ms = _median_ms(lambda: predictor.predict_array(row))
+        batch_ms = _median_ms(lambda: predictor.predict_batch_result(panels), repeat=5)
+        print(f"{name:<24}{row_ms:>12.3f}{batch_ms:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
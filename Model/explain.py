@@ -0,0 +1,418 @@
+"""
+Ensemble Explanations
+Per-prediction feature attributions for the soft ensemble.
+
+RF, XGBoost and GB use path-dependent TreeSHAP, computed from per-leaf path
+data extracted once from the flattened trees (tree_compiler.py). Each leaf
+path is reduced to its distinct features: the interval (lo, hi] a row must
+fall in to follow the path (o = 1) and the fraction of training cover that
+follows it (z). The Shapley value of path element i is
+
+    v * (o_i - z_i) * integral_0^1 prod_{j != i} ((1 - t) z_j + t o_j) dt
+
+which is exactly the TreeSHAP recursion in closed form. The integrand is a
+polynomial of degree m - 1 for a path with m features, so Gauss-Legendre
+quadrature with ceil(m / 2) nodes is exact. Paths are grouped by node count
+and each group is evaluated over all its paths at once with a few array
+operations; a sparse matrix sums the elements into (member, feature, class)
+totals.
+
+Logistic Regression uses its closed form, coef * (x - mean(x)), and the SVM
+member is left unattributed. Boosted and LR contributions are computed on
+the margin (log-odds) scale and mapped to probabilities through the softmax
+Jacobian, then adjusted so each class sums exactly to its probability
+change. The ensemble attribution is the average over the five members:
+
+    ensemble probability = base + sum(contributions) + unattributed (SVM share)
+
+Usage:
+    python explain.py      # check the attributions and time them
+"""
+
+import os
+import time
+
+import numpy as np
+from numpy.polynomial.legendre import leggauss
+from scipy import sparse
+
+from tree_compiler import CompiledTreeEnsemble, TREE_MEMBERS
+
+# Scaled background rows for the LR means and the SVM base rate
+EXPLAIN_BACKGROUND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dataset',
+                                  'df_copy_cleaned.csv')
+SVM_BACKGROUND_ROWS = 1000
+
+# Rows explained per pass. One row already spans about 275,000 path elements
+# (several MB of temporaries per array), and larger chunks only spill them out
+# of the CPU cache: 2-64 rows per pass measured 12-18 ms/row against 7 ms/row
+# for one, so a batch is explained row by row
+CHUNK_ROWS = 1
+
+
+def _softmax(raw):
+    raw = raw - raw.max(axis=-1, keepdims=True)
+    np.exp(raw, out=raw)
+    raw /= raw.sum(axis=-1, keepdims=True)
+    return raw
+
+
+def _leaf_paths(compiled, tree):
+    """Yield (leaf node, {feature: [lo, hi, zero fraction]}) for every leaf of one flattened tree"""
+    left, right, feature, threshold, cover = (compiled.left, compiled.right, compiled.feature,
+                                              compiled.threshold, compiled.cover)
+    stack = [(int(compiled.roots[tree]), {})]
+    while stack:
+        node, bounds = stack.pop()
+        if left[node] == node:
+            yield node, bounds
+            continue
+        f = int(feature[node])
+        for child, is_left in ((int(left[node]), True), (int(right[node]), False)):
+            lo, hi, z = bounds.get(f, (-np.inf, np.inf, 1.0))
+            if is_left:
+                hi = min(hi, threshold[node])
+            else:
+                lo = max(lo, threshold[node])
+            child_bounds = dict(bounds)
+            child_bounds[f] = (lo, hi, z * cover[child] / cover[node])
+            stack.append((child, child_bounds))
+
+
+class TreePathExplainer:
+    """
+    Path-dependent TreeSHAP for the flattened RF, XGBoost and GB trees
+
+    Attributes:
+        base_values: (n_members, n_classes) expected output of each member's
+                     tree sum (probability for RF, margin for XGB/GB, before
+                     the member's constant offset)
+    """
+
+    def __init__(self, compiled, n_features):
+        if compiled.cover is None:
+            raise ValueError("The compiled trees have no node covers; rebuild them "
+                             "(python tree_compiler.py / python bundle.py) to explain predictions")
+        self.n_features = n_features
+        self.n_classes = compiled.value.shape[1]
+        self.members = list(TREE_MEMBERS)
+        n_members = len(self.members)
+        self.base_values = np.zeros((n_members, self.n_classes))
+
+        # Leaf paths grouped by quadrature node count
+        groups = {}
+        for m, name in enumerate(self.members):
+            tree_slice = compiled.tree_slices[name]
+            for tree in range(tree_slice.start, tree_slice.stop):
+                for leaf, bounds in _leaf_paths(compiled, tree):
+                    value = compiled.value[leaf]
+                    elements = [(f, lo, hi, z) for f, (lo, hi, z) in bounds.items()]
+                    self.base_values[m] += value * np.prod([z for *_, z in elements])
+                    if elements:
+                        groups.setdefault((len(elements) + 1) // 2, []).append((m, value, elements))
+
+        self.groups = []
+        for n_nodes, paths in sorted(groups.items()):
+            n_paths, width = len(paths), 2 * n_nodes
+            # (element, path) layout: every array operation runs over the paths.
+            # Padding elements always match (o = z = 1) and change nothing
+            feature = np.zeros((width, n_paths), dtype=np.intp)
+            lo = np.full((width, n_paths), -np.inf)
+            hi = np.full((width, n_paths), np.inf)
+            zero = np.ones((width, n_paths))
+            values = np.empty((n_paths, self.n_classes))
+            member = np.empty(n_paths, dtype=np.intp)
+            for p, (m, value, elements) in enumerate(paths):
+                member[p] = m
+                values[p] = value
+                for k, (f, lower, upper, z) in enumerate(elements):
+                    feature[k, p], lo[k, p], hi[k, p], zero[k, p] = f, lower, upper, z
+            zero = np.maximum(zero, 1e-12)
+
+            nodes, weights = leggauss(n_nodes)
+            t = (nodes + 1) / 2
+            # (element, path) weight -> (member, feature, class) totals
+            columns = ((member * n_features + feature)[:, :, None] * self.n_classes
+                       + np.arange(self.n_classes))
+            scatter = sparse.csr_matrix(
+                (np.broadcast_to(values[None, :, :], columns.shape).ravel(),
+                 (np.repeat(np.arange(width * n_paths), self.n_classes), columns.ravel())),
+                shape=(width * n_paths, n_members * n_features * self.n_classes)
+            )
+            self.groups.append({
+                'feature': feature, 'lo': lo, 'hi': hi, 'zero': zero,
+                # Integrand factor of each element at each node: (1 - t) z when
+                # the row leaves the element's interval, (1 - t) z + t inside it
+                'cold': [zero * (1 - tq) for tq in t],
+                't': t, 'weights': weights / 2,
+                'scatter': scatter.T.tocsr(),
+            })
+        self.n_paths = sum(len(paths) for paths in groups.values())
+
+    def shap_values(self, X):
+        """
+        Args:
+            X: Scaled float array (n_samples, n_features)
+
+        Returns:
+            (n_members, n_samples, n_features, n_classes) contributions, members
+            in TREE_MEMBERS order; each member's sum over features equals its
+            tree sum minus base_values
+        """
+        # Both libraries compare on float32 inputs
+        X = np.ascontiguousarray(X, dtype=np.float32).astype(np.float64)
+        n_samples = len(X)
+        out = np.zeros((n_samples, len(self.members) * self.n_features * self.n_classes))
+        for group in self.groups:
+            values = X[:, group['feature']]
+            hot = ((values > group['lo']) & (values <= group['hi'])).astype(np.float64)
+            integral = np.zeros(values.shape)
+            a = np.empty(values.shape)
+            for cold, t, weight in zip(group['cold'], group['t'], group['weights']):
+                np.multiply(hot, t, out=a)
+                a += cold
+                np.divide((weight * a.prod(axis=1))[:, None, :], a, out=a)
+                integral += a
+            hot -= group['zero']
+            integral *= hot
+            out += (group['scatter'] @ integral.reshape(n_samples, -1).T).T
+        return out.reshape(n_samples, len(self.members), self.n_features, self.n_classes).transpose(1, 0, 2, 3)
+
+
+def _margin_to_probability(phi, margin, base_margin):
+    """
+    Map margin contributions (n, features, classes) of a softmax member to probabilities
+
+    Uses the softmax Jacobian at the midpoint of the base and actual margins,
+    then spreads the remainder over the features in proportion to their
+    size, so every class sums to softmax(margin) - softmax(base_margin).
+    """
+    p_mid = _softmax((margin + base_margin) / 2)[:, None, :]
+    g = p_mid * (phi - (phi * p_mid).sum(axis=2, keepdims=True))
+    delta = _softmax(margin.copy()) - _softmax(np.array(base_margin, dtype=np.float64))
+    remainder = delta - g.sum(axis=1)
+    size = np.abs(g)
+    total = size.sum(axis=1, keepdims=True)
+    share = np.divide(size, total, out=np.full_like(size, 1.0 / size.shape[1]), where=total > 0)
+    return g + remainder[:, None, :] * share
+
+
+class Explanation:
+    """
+    Ensemble attributions for a batch, all in probability units (0-1)
+
+    Attributes:
+        probabilities: (n_samples, 3) five-member soft-vote probabilities
+        base: (3,) ensemble probabilities with every feature at its expected value
+        contributions: (n_samples, n_features, 3) ensemble contribution of each feature
+        unattributed: (n_samples, 3) the SVM member's share of the change
+        members: {name: (n_samples, n_features, 3)} each member's own contributions
+    """
+
+    def __init__(self, probabilities, base, contributions, unattributed, members):
+        self.probabilities = probabilities
+        self.base = base
+        self.contributions = contributions
+        self.unattributed = unattributed
+        self.members = members
+        self.prediction = np.argmax(probabilities, axis=1)
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def to_dicts(self, class_mapping, feature_columns, X=None, class_index=None):
+        """
+        One dictionary per sample, in percentage points, with features sorted
+        by the size of their contribution to the explained class (the
+        predicted class unless class_index is given, either one class for
+        all samples or a list with an entry, possibly None, per sample)
+        """
+        if class_index is None or np.isscalar(class_index):
+            class_index = [class_index] * len(self)
+        rows = []
+        for n in range(len(self)):
+            k = int(self.prediction[n]) if class_index[n] is None else int(class_index[n])
+            order = np.argsort(-np.abs(self.contributions[n, :, k]), kind='stable')
+            rows.append({
+                'prediction': class_mapping[int(self.prediction[n])],
+                'explained_class': class_mapping[k],
+                'probability': float(self.probabilities[n, k]) * 100,
+                'base_value': float(self.base[k]) * 100,
+                'contributions': [
+                    {
+                        'feature': feature_columns[j],
+                        **({'value': float(X[n, j])} if X is not None else {}),
+                        'contribution': float(self.contributions[n, j, k]) * 100,
+                    }
+                    for j in order
+                ],
+                'unattributed': float(self.unattributed[n, k]) * 100,
+            })
+        return rows
+
+
+class EnsembleExplainer:
+    """Feature attributions for a SoftEnsemblePredictor (built once, then reused)"""
+
+    def __init__(self, predictor, background):
+        """
+        Args:
+            predictor: SoftEnsemblePredictor with its members loaded (not a student)
+            background: Scaled float array of reference rows in FEATURE_COLUMNS
+                        order (LR means and the SVM base rate)
+        """
+        if predictor.student is not None:
+            raise ValueError("Explanations need the ensemble members; the student model has none")
+        compiled = predictor.compiled_trees
+        if compiled is None or (compiled.cover is None and predictor.bundle is None):
+            compiled = CompiledTreeEnsemble.from_models(predictor.rf_model, predictor.xgb_model,
+                                                        predictor.gb_model)
+        self.trees = TreePathExplainer(compiled, background.shape[1])
+        self.offsets = {'rf': 0.0, 'xgb': compiled.xgb_base_margin, 'gb': compiled.gb_init}
+
+        if predictor.bundle is not None:
+            self.lr_coef, self.lr_intercept = predictor.bundle.lr.coef, predictor.bundle.lr.intercept
+        else:
+            self.lr_coef, self.lr_intercept = predictor.lr_model.coef_, predictor.lr_model.intercept_
+        self.background_mean = background.mean(axis=0)
+        rows = np.random.default_rng(0).permutation(len(background))[:SVM_BACKGROUND_ROWS]
+        self.svm_base = predictor._member_proba(3, background[rows]).mean(axis=0)
+
+        self.base_margins = {name: self.trees.base_values[m] + self.offsets[name]
+                             for m, name in enumerate(self.trees.members)}
+        self.base_margins['lr'] = self.lr_coef @ self.background_mean + self.lr_intercept
+        member_bases = [self.base_margins['rf'], _softmax(self.base_margins['xgb'].copy()),
+                        _softmax(self.base_margins['gb'].copy()), self.svm_base,
+                        _softmax(self.base_margins['lr'].copy())]
+        self.base = np.mean(member_bases, axis=0)
+        self.predictor = predictor
+
+    def explain(self, X_processed):
+        """Attributions for a scaled float array (n_samples, n_features)"""
+        X_processed = np.atleast_2d(np.asarray(X_processed, dtype=np.float64))
+        if np.isnan(X_processed).any():
+            raise ValueError("Cannot explain rows with missing values")
+        chunks = [self._explain(X_processed[start:start + CHUNK_ROWS])
+                  for start in range(0, len(X_processed), CHUNK_ROWS)]
+        return Explanation(
+            np.concatenate([c[0] for c in chunks]), self.base,
+            np.concatenate([c[1] for c in chunks]), np.concatenate([c[2] for c in chunks]),
+            {name: np.concatenate([c[3][name] for c in chunks]) for name in chunks[0][3]},
+        )
+
+    def _explain(self, X):
+        tree_phi = self.trees.shap_values(X)
+        members = {}
+        probabilities = []
+        for m, name in enumerate(self.trees.members):
+            phi = tree_phi[m]
+            margin = self.base_margins[name] + phi.sum(axis=1)
+            if name == 'rf':
+                members[name], proba = phi, margin
+            else:
+                members[name] = _margin_to_probability(phi, margin, self.base_margins[name])
+                proba = _softmax(margin)
+            probabilities.append(proba)
+
+        lr_phi = (X - self.background_mean)[:, :, None] * self.lr_coef.T[None]
+        lr_margin = self.base_margins['lr'] + lr_phi.sum(axis=1)
+        members['lr'] = _margin_to_probability(lr_phi, lr_margin, self.base_margins['lr'])
+        svm_proba = self.predictor._member_proba(3, X)
+        probabilities[3:3] = [svm_proba]
+        probabilities.append(_softmax(lr_margin))
+
+        n_members = len(probabilities)
+        contributions = sum(members.values()) / n_members
+        unattributed = (svm_proba - self.svm_base) / n_members
+        return np.mean(probabilities, axis=0), contributions, unattributed, members
+
+
+def load_background(predictor, path=EXPLAIN_BACKGROUND):
+    """Scaled rows of the training CSV, used as the reference distribution"""
+    from columnar import load_table
+    from predict import FEATURE_COLUMNS
+
+    df = load_table(path, columns=FEATURE_COLUMNS, exact=True)
+    return predictor.preprocess_array(df[FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+
+
+def _brute_force_shap(compiled, tree, x, n_features):
+    """Path-dependent Shapley values of one tree by enumerating feature subsets (for checking)"""
+    from itertools import combinations
+    from math import factorial
+
+    def expected(node, present):
+        if compiled.left[node] == node:
+            return compiled.value[node]
+        f = compiled.feature[node]
+        left, right = compiled.left[node], compiled.right[node]
+        if f in present:
+            return expected(left if x[f] <= compiled.threshold[node] else right, present)
+        return (compiled.cover[left] * expected(left, present)
+                + compiled.cover[right] * expected(right, present)) / compiled.cover[node]
+
+    root = int(compiled.roots[tree])
+    used, stack = set(), [root]
+    while stack:
+        node = stack.pop()
+        if compiled.left[node] != node:
+            used.add(int(compiled.feature[node]))
+            stack += [int(compiled.left[node]), int(compiled.right[node])]
+
+    phi = np.zeros((n_features, compiled.value.shape[1]))
+    for i in used:
+        others = sorted(used - {i})
+        for size in range(len(others) + 1):
+            weight = factorial(size) * factorial(len(used) - size - 1) / factorial(len(used))
+            for subset in combinations(others, size):
+                phi[i] += weight * (expected(root, set(subset) | {i}) - expected(root, set(subset)))
+    return phi
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.filterwarnings('ignore')
+    from predict import SoftEnsemblePredictor, FEATURE_COLUMNS
+
+    predictor = SoftEnsemblePredictor()
+    background = load_background(predictor)
+    start = time.perf_counter()
+    explainer = EnsembleExplainer(predictor, background)
+    print(f"\n✓ Built explainer over {explainer.trees.n_paths:,} leaf paths in {time.perf_counter() - start:.2f}s")
+
+    from columnar import load_table
+    raw = load_table(EXPLAIN_BACKGROUND, columns=FEATURE_COLUMNS, exact=True)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    raw = raw[np.random.default_rng(1).permutation(len(raw))[:200]]
+    X = predictor.preprocess_array(raw)
+    explanation = explainer.explain(X)
+
+    # Efficiency: base + contributions + unattributed reproduces the ensemble
+    total = explainer.base + explanation.contributions.sum(axis=1) + explanation.unattributed
+    print(f"  max |base + contributions - ensemble|      = {np.abs(total - explanation.probabilities).max():.2e}")
+    expected = predictor.predict_proba(raw)
+    print(f"  max |explained vote - predict_proba|       = {np.abs(explanation.probabilities - expected).max():.2e}")
+
+    # Exactness: TreeSHAP against subset enumeration on single trees
+    import copy
+    compiled = CompiledTreeEnsemble.from_models(predictor.rf_model, predictor.xgb_model, predictor.gb_model)
+    worst = 0.0
+    for name, offset in (('rf', 0), ('xgb', 0), ('gb', 0), ('gb', 1)):
+        tree = compiled.tree_slices[name].start + offset
+        single = copy.copy(compiled)
+        single.tree_slices = {member: slice(0, 0) for member in TREE_MEMBERS}
+        single.tree_slices[name] = slice(tree, tree + 1)
+        phi = TreePathExplainer(single, X.shape[1]).shap_values(X[:3])[TREE_MEMBERS.index(name)]
+        for n in range(3):
+            x = np.asarray(X[n], dtype=np.float32).astype(np.float64)
+            worst = max(worst, np.abs(phi[n] - _brute_force_shap(compiled, tree, x, X.shape[1])).max())
+    print(f"  max |TreeSHAP - subset enumeration|        = {worst:.2e}")
+
+    for rows in (1, 10, 100):
+        batch = X[:rows]
+        explainer.explain(batch)
+        timings = []
+        for _ in range(max(3, 100 // rows)):
+            start = time.perf_counter()
+            explainer.explain(batch)
+            timings.append(time.perf_counter() - start)
+        print(f"  {rows:>4} rows: {np.median(timings) * 1000:8.2f} ms ({np.median(timings) * 1000 / rows:.2f} ms/row)")
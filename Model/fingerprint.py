@@ -0,0 +1,77 @@
+"""
+Member Fingerprints
+Identifies which trained members a derived artifact (ensemble_bundle/,
+compiled_trees.npz, cascade.json, student.npz) was built from, so an artifact
+left over from an earlier training run is rejected or rebuilt instead of being
+served next to the retrained models.
+
+The fingerprint is a hash of the member pickles written by model.py. Each
+derived artifact records it under 'members_fingerprint'.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# The pickles written by model.py that every derived artifact depends on
+MEMBER_FILES = ['rf_model.pkl', 'xgb_model.pkl', 'gb_model.pkl', 'svm_model.pkl', 'lr_model.pkl',
+                'scaler.pkl', 'class_mapping.pkl']
+FINGERPRINT_KEY = 'members_fingerprint'
+
+# (path, size, mtime) -> fingerprint, so workers hash each version once
+_cache = {}
+
+
+def has_members(model_dir):
+    return all(os.path.isfile(os.path.join(model_dir, name)) for name in MEMBER_FILES)
+
+
+def members_fingerprint(model_dir):
+    """Hash of the member pickles in model_dir, or None if any is missing"""
+    if not has_members(model_dir):
+        return None
+    stats = tuple(
+        (name, os.path.getsize(os.path.join(model_dir, name)), os.path.getmtime(os.path.join(model_dir, name)))
+        for name in MEMBER_FILES
+    )
+    key = (os.path.abspath(model_dir), stats)
+    fingerprint = _cache.get(key)
+    if fingerprint is None:
+        digest = hashlib.blake2b(digest_size=16)
+        for name in MEMBER_FILES:
+            digest.update(name.encode())
+            with open(os.path.join(model_dir, name), 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        fingerprint = _cache[key] = digest.hexdigest()
+    return fingerprint
+
+
+def recorded_fingerprint(path):
+    """The fingerprint stored in a derived artifact, or None if it has none"""
+    if os.path.isdir(path):
+        path = os.path.join(path, 'manifest.json')
+    if path.endswith('.json'):
+        with open(path) as f:
+            return json.load(f).get(FINGERPRINT_KEY)
+    with np.load(path) as data:
+        return str(data[FINGERPRINT_KEY]) if FINGERPRINT_KEY in data.files else None
+
+
+def check_fingerprint(artifact, recorded, expected):
+    """Raise if an artifact was not built from the members with fingerprint expected"""
+    if expected is not None and recorded != expected:
+        raise ValueError(f"{artifact} was built from other member models than the ones loaded "
+                         f"(fingerprint {recorded or 'missing'}, models {expected}); rebuild it")
+
+
+def arrays_fingerprint(arrays):
+    """Short hash of a dict of arrays (e.g. a student's weights or cascade thresholds)"""
+    digest = hashlib.blake2b(digest_size=8)
+    for name in sorted(arrays):
+        value = np.ascontiguousarray(arrays[name])
+        digest.update(f'{name}:{value.dtype.str}:{value.shape}'.encode())
+        digest.update(value.tobytes())
+    return digest.hexdigest()
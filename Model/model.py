@@ -1,176 +1,207 @@
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import joblib
+import argparse
 import os
+import time
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.ensemble import RandomForestClassifier
 from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.svm import SVC
 from xgboost import XGBClassifier
 from sklearn.linear_model import LogisticRegression
-
-# Load and prepare data
-df_clean = pd.read_csv("../dataset/df_copy_cleaned.csv")
-
-X = df_clean.drop('target', axis=1)
-y = df_clean['target']
-
-# Preprocess: Scale numeric columns
-numeric_cols = ['age', 'TSH', 'T3', 'TT4', 'T4U', 'FTI', 'TBG']
-scaler = StandardScaler()
-X[numeric_cols] = scaler.fit_transform(X[numeric_cols])
-
-# Split data
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+from columnar import load_table
+from training import StageTimer, TRAIN_CACHE_DIR, train_members
+from model_registry import ModelRegistry, REGISTRY_DIR
 
 # Target class mapping
 # 0: Hyperthyroid, 1: Hypothyroid, 2: Negative (Normal)
 class_mapping = {0: 'Hyper', 1: 'Hypo', 2: 'Negative'}
 
-print("=" * 80)
-print("SOFT ENSEMBLE LEARNING MODEL - THYROID PREDICTION")
-print("=" * 80)
-print(f"\nDataset shape: {X.shape}")
-print(f"Train set: {X_train.shape}, Test set: {X_test.shape}")
-print(f"Target classes: {class_mapping}")
-print(f"Class distribution in training set:")
-print(y_train.value_counts())
-
-# Build individual models
-print("\n" + "=" * 80)
-print("BUILDING INDIVIDUAL MODELS")
-print("=" * 80)
-
-# Model 1: Random Forest
-print("\n1. Training Random Forest Classifier...")
-rf_model = RandomForestClassifier(
-    n_estimators=200,
-    max_depth=15,
-    min_samples_split=5,
-    min_samples_leaf=2,
-    random_state=42,
-    n_jobs=-1
-)
-rf_model.fit(X_train, y_train)
-rf_pred = rf_model.predict(X_test)
-rf_acc = accuracy_score(y_test, rf_pred)
-print(f"   Random Forest Accuracy: {rf_acc:.4f}")
-
-# Model 2: XGBoost
-print("\n2. Training XGBoost Classifier...")
-xgb_model = XGBClassifier(
-    n_estimators=200,
-    max_depth=7,
-    learning_rate=0.1,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    random_state=42,
-    eval_metric='mlogloss'
-)
-xgb_model.fit(X_train, y_train)
-xgb_pred = xgb_model.predict(X_test)
-xgb_acc = accuracy_score(y_test, xgb_pred)
-print(f"   XGBoost Accuracy: {xgb_acc:.4f}")
-
-# Model 3: Gradient Boosting
-print("\n3. Training Gradient Boosting Classifier...")
-gb_model = GradientBoostingClassifier(
-    n_estimators=200,
-    max_depth=5,
-    learning_rate=0.1,
-    subsample=0.8,
-    random_state=42
-)
-gb_model.fit(X_train, y_train)
-gb_pred = gb_model.predict(X_test)
-gb_acc = accuracy_score(y_test, gb_pred)
-print(f"   Gradient Boosting Accuracy: {gb_acc:.4f}")
-
-# Model 4: Support Vector Machine
-print("\n4. Training Support Vector Machine...")
-svm_model = SVC(kernel='rbf', probability=True, C=1.0, random_state=42, gamma='scale')
-svm_model.fit(X_train, y_train)
-svm_pred = svm_model.predict(X_test)
-svm_acc = accuracy_score(y_test, svm_pred)
-print(f"   SVM Accuracy: {svm_acc:.4f}")
-
-# Model 5: Logistic Regression
-print("\n5. Training Logistic Regression...")
-lr_model = LogisticRegression(max_iter=1000, random_state=42, n_jobs=-1)
-lr_model.fit(X_train, y_train)
-lr_pred = lr_model.predict(X_test)
-lr_acc = accuracy_score(y_test, lr_pred)
-print(f"   Logistic Regression Accuracy: {lr_acc:.4f}")
-
-# Build Soft Voting Ensemble (Manual Implementation)
-print("\n" + "=" * 80)
-print("BUILDING SOFT VOTING ENSEMBLE")
-print("=" * 80)
-
-# Get probability predictions from each model
-rf_proba = rf_model.predict_proba(X_test)
-xgb_proba = xgb_model.predict_proba(X_test)
-gb_proba = gb_model.predict_proba(X_test)
-svm_proba = svm_model.predict_proba(X_test)
-lr_proba = lr_model.predict_proba(X_test)
-
-# Average the probabilities (soft voting)
-ensemble_pred_proba = np.mean([rf_proba, xgb_proba, gb_proba, svm_proba, lr_proba], axis=0)
-
-# Get class predictions from averaged probabilities
-ensemble_pred = np.argmax(ensemble_pred_proba, axis=1)
-ensemble_acc = accuracy_score(y_test, ensemble_pred)
-
-print(f"\nSoft Ensemble Accuracy: {ensemble_acc:.4f}")
-print(f"Individual model accuracies:")
-print(f"  - Random Forest:     {rf_acc:.4f}")
-print(f"  - XGBoost:           {xgb_acc:.4f}")
-print(f"  - Gradient Boosting: {gb_acc:.4f}")
-print(f"  - SVM:               {svm_acc:.4f}")
-print(f"  - Logistic Regression: {lr_acc:.4f}")
-
-# Detailed Classification Report
-print("\n" + "=" * 80)
-print("CLASSIFICATION REPORT - SOFT ENSEMBLE")
-print("=" * 80)
-print(classification_report(y_test, ensemble_pred, target_names=[class_mapping[i] for i in sorted(class_mapping.keys())]))
-
-# Save the ensemble models and scaler
-model_dir = os.path.dirname(os.path.abspath(__file__))
-rf_path = os.path.join(model_dir, 'rf_model.pkl')
-xgb_path = os.path.join(model_dir, 'xgb_model.pkl')
-gb_path = os.path.join(model_dir, 'gb_model.pkl')
-svm_path = os.path.join(model_dir, 'svm_model.pkl')
-lr_path = os.path.join(model_dir, 'lr_model.pkl')
-scaler_path = os.path.join(model_dir, 'scaler.pkl')
-
-print("\n" + "=" * 80)
-print("SAVING MODELS")
-print("=" * 80)
-
-joblib.dump(rf_model, rf_path)
-joblib.dump(xgb_model, xgb_path)
-joblib.dump(gb_model, gb_path)
-joblib.dump(svm_model, svm_path)
-joblib.dump(lr_model, lr_path)
-joblib.dump(scaler, scaler_path)
-print(f"✓ Random Forest model saved")
-print(f"✓ XGBoost model saved")
-print(f"✓ Gradient Boosting model saved")
-print(f"✓ SVM model saved")
-print(f"✓ Logistic Regression model saved")
-print(f"✓ Scaler saved")
-
-# Save class mapping for predictions
-mapping_path = os.path.join(model_dir, 'class_mapping.pkl')
-joblib.dump(class_mapping, mapping_path)
-print(f"✓ Class mapping saved")
-
-print("\n" + "=" * 80)
-print("MODEL TRAINING COMPLETE!")
-print("=" * 80)
+# Preprocess: Scale numeric columns
+numeric_cols = ['age', 'TSH', 'T3', 'TT4', 'T4U', 'FTI', 'TBG']
 
+MEMBER_LABELS = {
+    'rf': 'Random Forest',
+    'xgb': 'XGBoost',
+    'gb': 'Gradient Boosting',
+    'svm': 'SVM',
+    'lr': 'Logistic Regression',
+}
+
+
+def build_members():
+    """Unfitted ensemble members, in the order their probabilities are averaged"""
+    return {
+        # Model 1: Random Forest
+        'rf': RandomForestClassifier(
+            n_estimators=200,
+            max_depth=15,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            random_state=42,
+            n_jobs=-1
+        ),
+        # Model 2: XGBoost
+        'xgb': XGBClassifier(
+            n_estimators=200,
+            max_depth=7,
+            learning_rate=0.1,
+            subsample=0.8,
+            colsample_bytree=0.8,
+            random_state=42,
+            eval_metric='mlogloss'
+        ),
+        # Model 3: Gradient Boosting
+        'gb': GradientBoostingClassifier(
+            n_estimators=200,
+            max_depth=5,
+            learning_rate=0.1,
+            subsample=0.8,
+            random_state=42
+        ),
+        # Model 4: Support Vector Machine
+        'svm': SVC(kernel='rbf', probability=True, C=1.0, random_state=42, gamma='scale'),
+        # Model 5: Logistic Regression
+        'lr': LogisticRegression(max_iter=1000, random_state=42, n_jobs=-1),
+    }
+
+
+def main():
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Train the soft ensemble and save it next to predict.py')
+    parser.add_argument('--data', default=os.path.join(model_dir, '..', 'dataset', 'df_copy_cleaned.csv'))
+    parser.add_argument('--output-dir', default=model_dir, help='where the models and the bundle are written')
+    parser.add_argument('--workers', type=int, help='member training processes (default: one per member, '
+                                                    'at most cpu_count; 1 trains in this process)')
+    parser.add_argument('--cache-dir', default=os.path.join(model_dir, TRAIN_CACHE_DIR),
+                        help='fitted-member cache, keyed on the training data and hyperparameters')
+    parser.add_argument('--no-cache', action='store_true', help='refit every member and do not write the cache')
+    parser.add_argument('--publish', action='store_true',
+                        help='publish the trained models to the model registry and activate them '
+                             '(running servers hot-swap to the new version)')
+    parser.add_argument('--registry', default=os.path.join(model_dir, REGISTRY_DIR))
+    args = parser.parse_args()
+
+    timer = StageTimer()
+    pipeline_start = time.perf_counter()
+
+    # Load and prepare data (from dataset/df_copy_cleaned.cols when converted)
+    with timer.stage('load data'):
+        df_clean = load_table(args.data, exact=True)
+
+    with timer.stage('scale + split'):
+        X = df_clean.drop('target', axis=1)
+        y = df_clean['target']
+
+        scaler = StandardScaler()
+        X[numeric_cols] = scaler.fit_transform(X[numeric_cols])
+
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    print("=" * 80)
+    print("SOFT ENSEMBLE LEARNING MODEL - THYROID PREDICTION")
+    print("=" * 80)
+    print(f"\nDataset shape: {X.shape}")
+    print(f"Train set: {X_train.shape}, Test set: {X_test.shape}")
+    print(f"Target classes: {class_mapping}")
+    print(f"Class distribution in training set:")
+    print(y_train.value_counts())
+
+    # Build individual models (independent fits run in parallel processes)
+    print("\n" + "=" * 80)
+    print("BUILDING INDIVIDUAL MODELS")
+    print("=" * 80)
+
+    members = build_members()
+    start = time.perf_counter()
+    results = train_members(members, X_train, y_train, X_test, workers=args.workers,
+                            cache_dir=None if args.no_cache else args.cache_dir, timer=timer)
+    members_wall = time.perf_counter() - start
+    timer.add('members (wall)', members_wall)
+
+    accuracies = {}
+    for i, (name, result) in enumerate(results.items(), start=1):
+        # Labels are the argmax of the probabilities computed once per member
+        model = result['model']
+        pred = model.classes_[np.argmax(result['proba'], axis=1)]
+        accuracies[name] = accuracy_score(y_test, pred)
+        source = 'loaded from cache' if result['cached'] else f"trained in {result['fit_seconds']:.1f}s"
+        print(f"\n{i}. {MEMBER_LABELS[name]} ({source})")
+        print(f"   {MEMBER_LABELS[name]} Accuracy: {accuracies[name]:.4f}")
+
+    # Build Soft Voting Ensemble (Manual Implementation)
+    print("\n" + "=" * 80)
+    print("BUILDING SOFT VOTING ENSEMBLE")
+    print("=" * 80)
+
+    with timer.stage('ensemble + metrics'):
+        # Average the probabilities (soft voting)
+        ensemble_pred_proba = np.mean([result['proba'] for result in results.values()], axis=0)
+
+        # Get class predictions from averaged probabilities
+        ensemble_pred = np.argmax(ensemble_pred_proba, axis=1)
+        ensemble_acc = accuracy_score(y_test, ensemble_pred)
+        report = classification_report(y_test, ensemble_pred,
+                                       target_names=[class_mapping[i] for i in sorted(class_mapping.keys())])
+
+    print(f"\nSoft Ensemble Accuracy: {ensemble_acc:.4f}")
+    print(f"Individual model accuracies:")
+    for name, acc in accuracies.items():
+        print(f"  - {MEMBER_LABELS[name] + ':':<20} {acc:.4f}")
+
+    # Detailed Classification Report
+    print("\n" + "=" * 80)
+    print("CLASSIFICATION REPORT - SOFT ENSEMBLE")
+    print("=" * 80)
+    print(report)
+
+    # Save the ensemble models and scaler
+    print("\n" + "=" * 80)
+    print("SAVING MODELS")
+    print("=" * 80)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with timer.stage('save models'):
+        for name, result in results.items():
+            joblib.dump(result['model'], os.path.join(args.output_dir, f'{name}_model.pkl'))
+            print(f"✓ {MEMBER_LABELS[name]} model saved")
+        joblib.dump(scaler, os.path.join(args.output_dir, 'scaler.pkl'))
+        print(f"✓ Scaler saved")
+
+        # Save class mapping for predictions
+        joblib.dump(class_mapping, os.path.join(args.output_dir, 'class_mapping.pkl'))
+        print(f"✓ Class mapping saved")
+
+    # Export the memory-mappable serving bundle (see bundle.py)
+    from bundle import export_bundle, BUNDLE_DIR
+    from fingerprint import members_fingerprint
+    with timer.stage('export bundle'):
+        models = [results[name]['model'] for name in ('rf', 'xgb', 'gb', 'svm', 'lr')]
+        bundle_path = export_bundle(os.path.join(args.output_dir, BUNDLE_DIR), *models,
+                                    scaler, class_mapping, X.columns, members_fingerprint(args.output_dir))
+    print(f"✓ Model bundle saved to {bundle_path}")
+
+    if args.publish:
+        with timer.stage('publish'):
+            registry = ModelRegistry(args.registry)
+            version = registry.publish(args.output_dir, activate=True)
+        print(f"✓ Published and activated model version {version} in {registry.path}")
+
+    print("\n" + "=" * 80)
+    print("TIMING")
+    print("=" * 80)
+    print(timer.report())
+    member_seconds = sum(result['fit_seconds'] + result['predict_seconds'] for result in results.values())
+    print(f"\nTotal {time.perf_counter() - pipeline_start:.2f}s; member fit + predict {member_seconds:.2f}s "
+          f"of work in {members_wall:.2f}s wall")
+
+    print("\n" + "=" * 80)
+    print("MODEL TRAINING COMPLETE!")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
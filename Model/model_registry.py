@@ -0,0 +1,191 @@
+"""
+Model Registry
+Versioned copies of the trained ensemble, so a retrained model can be
+published next to the one being served and switched to without a restart.
+
+Each version is an immutable directory holding the artifacts
+SoftEnsemblePredictor loads from model_dir. CURRENT names the version that
+should be served; app.py watches it and hot-swaps every worker to the new
+version (see model_manager.py).
+
+Layout:
+    registry/
+        CURRENT                 (name of the active version)
+        20261017-091500/
+            manifest.json
+            rf_model.pkl ... class_mapping.pkl
+            ensemble_bundle/    (if exported)
+            cascade.json, student.npz (if present and built from these pickles)
+
+Usage:
+    python model_registry.py publish [--from DIR] [--version NAME] [--activate]
+    python model_registry.py activate VERSION
+    python model_registry.py list
+"""
+
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+from bundle import BUNDLE_DIR
+from cascade import CASCADE_FILE
+from distill import STUDENT_FILE
+from fingerprint import FINGERPRINT_KEY, MEMBER_FILES, members_fingerprint, recorded_fingerprint
+
+REGISTRY_DIR = 'registry'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+
+# Artifacts every version must contain
+REQUIRED_FILES = MEMBER_FILES
+# Copied when present and built from the members above (matching fingerprint)
+OPTIONAL_FILES = [BUNDLE_DIR, CASCADE_FILE, STUDENT_FILE]
+
+
+def _write_atomic(path, text):
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """A directory of published model versions and the pointer to the active one"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+
+    def version_dir(self, version):
+        return os.path.join(self.path, version)
+
+    def versions(self):
+        """Published versions, oldest first"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            name for name in os.listdir(self.path)
+            if os.path.isfile(os.path.join(self.path, name, MANIFEST_FILE))
+        )
+
+    def manifest(self, version):
+        with open(os.path.join(self.version_dir(version), MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def current(self):
+        """The active version, or None when nothing has been activated"""
+        try:
+            with open(os.path.join(self.path, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, version):
+        """Point CURRENT at a published version (rollbacks are activations too)"""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        _write_atomic(os.path.join(self.path, CURRENT_FILE), version + '\n')
+        return version
+
+    def publish(self, source_dir, version=None, activate=False):
+        """
+        Copy the artifacts in source_dir into a new version
+
+        The version is staged in a temporary sibling directory and renamed
+        into place, so a watcher never sees a half-copied version.
+
+        Args:
+            source_dir: Directory written by model.py (the pickles, and
+                        optionally the bundle, cascade and student)
+            version: Version name (default: UTC timestamp)
+            activate: Also make it the served version
+
+        Returns:
+            The version name
+        """
+        missing = [name for name in REQUIRED_FILES if not os.path.isfile(os.path.join(source_dir, name))]
+        if missing:
+            raise FileNotFoundError(f"Missing model artifacts in {source_dir}: {', '.join(missing)}")
+        if version is None:
+            version = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+        if version in (CURRENT_FILE, '') or os.sep in version or version.startswith('.'):
+            raise ValueError(f"Invalid model version: {version!r}")
+        target = self.version_dir(version)
+        if os.path.exists(target):
+            raise FileExistsError(f"Model version already exists: {version}")
+
+        os.makedirs(self.path, exist_ok=True)
+        staging = os.path.join(self.path, f'.{version}.tmp-{os.getpid()}')
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        os.makedirs(staging)
+        fingerprint = members_fingerprint(source_dir)
+        files = {}
+        skipped = []
+        for name in REQUIRED_FILES + OPTIONAL_FILES:
+            source = os.path.join(source_dir, name)
+            if name in OPTIONAL_FILES and os.path.exists(source) and recorded_fingerprint(source) != fingerprint:
+                # Left over from an earlier training run: serving it would
+                # pair old calibration/weights with the new members
+                print(f"  Skipping {name}: built from other member models; rebuild it and republish")
+                skipped.append(name)
+                continue
+            if os.path.isdir(source):
+                shutil.copytree(source, os.path.join(staging, name))
+            elif os.path.isfile(source):
+                shutil.copy2(source, os.path.join(staging, name))
+            else:
+                continue
+            files[name] = os.path.getmtime(source)
+
+        manifest = {
+            'version': version,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'source': os.path.abspath(source_dir),
+            FINGERPRINT_KEY: fingerprint,
+            'files': {name: datetime.fromtimestamp(mtime, timezone.utc).isoformat() for name, mtime in files.items()},
+            'skipped': skipped,
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging, target)
+
+        if activate:
+            self.activate(version)
+        return version
+
+
+def main():
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registry', default=os.path.join(model_dir, REGISTRY_DIR))
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish = commands.add_parser('publish', help='copy trained artifacts into a new version')
+    publish.add_argument('--from', dest='source', default=model_dir, help='directory written by model.py')
+    publish.add_argument('--version', help='version name (default: UTC timestamp)')
+    publish.add_argument('--activate', action='store_true', help='serve the new version')
+    activate = commands.add_parser('activate', help='serve a published version')
+    activate.add_argument('version')
+    commands.add_parser('list', help='show the published versions')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == 'publish':
+        version = registry.publish(args.source, version=args.version, activate=args.activate)
+        print(f"✓ Published model version {version} to {registry.version_dir(version)}")
+        if args.activate:
+            print(f"✓ Activated {version}")
+    elif args.command == 'activate':
+        registry.activate(args.version)
+        print(f"✓ Activated {args.version}; running servers switch to it on their next check")
+    else:
+        current = registry.current()
+        for version in registry.versions():
+            manifest = registry.manifest(version)
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version:<24}{manifest['created_at']:<36}{', '.join(sorted(manifest['files']))}")
+
+
+if __name__ == "__main__":
+    main()
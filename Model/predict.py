@@ -7,103 +7,579 @@ import joblib
 import numpy as np
 import pandas as pd
 import os
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
+from tree_compiler import CompiledTreeEnsemble, COMPILED_TREES_FILE
+from svm_engine import SVMInferenceEngine, SVM_ENGINES
+from bundle import ModelBundle
+from cascade import CASCADE_FILE, load_cascade, vote_margin
+from distill import STUDENT_FILE, StudentMLP
+from explain import EnsembleExplainer, load_background
+from fingerprint import FINGERPRINT_KEY, arrays_fingerprint, check_fingerprint, members_fingerprint
+
+# Feature order the models were trained on (columns of df_copy_cleaned.csv minus target)
+FEATURE_COLUMNS = [
+    'age', 'sex', 'pregnant',
+    'TSH_measured', 'TSH',
+    'T3_measured', 'T3',
+    'TT4_measured', 'TT4',
+    'T4U_measured', 'T4U',
+    'FTI_measured', 'FTI',
+    'TBG_measured', 'TBG'
+]
+
+# Ensemble members, in the order their probabilities are averaged
+MEMBER_NAMES = ['rf', 'xgb', 'gb', 'svm', 'lr']
+
+# Column of each class in the (n_samples, 3) probability arrays
+PROBABILITY_INDEX = {'Negative': 2, 'Hypo': 1, 'Hyper': 0}
+
+class BatchResult:
+    """
+    Columnar ensemble results for a batch of samples
+    
+    Attributes:
+        probabilities: (n_samples, 3) ensemble probabilities (0=Hyper, 1=Hypo, 2=Negative)
+        prediction: (n_samples,) predicted class index
+        confidence: (n_samples,) probability of the predicted class, in percent
+        members_used: (n_samples,) members evaluated per sample in cascade
+                      mode, otherwise None
+    """
+    
+    def __init__(self, probabilities, class_mapping, members_used=None):
+        self.probabilities = probabilities
+        self.class_mapping = class_mapping
+        self.members_used = members_used
+        self.prediction = np.argmax(probabilities, axis=1)
+        self.confidence = np.take_along_axis(probabilities, self.prediction[:, None], axis=1)[:, 0] * 100
+    
+    def __len__(self):
+        return len(self.probabilities)
+    
+    @property
+    def labels(self):
+        """(n_samples,) object array of predicted class names"""
+        names = np.array([self.class_mapping[i] for i in range(self.probabilities.shape[1])], dtype=object)
+        return names[self.prediction]
+    
+    def to_frame(self, index=None):
+        """DataFrame with prediction, label, confidence and prob_<class> columns (percentages)"""
+        frame = pd.DataFrame({
+            'prediction': self.prediction,
+            'label': self.labels,
+            'confidence': self.confidence,
+        }, index=index)
+        for name, i in PROBABILITY_INDEX.items():
+            frame[f'prob_{name}'] = self.probabilities[:, i] * 100
+        return frame
+    
+    def to_dicts(self):
+        """One dictionary per sample, in the format predict_batch returns"""
+        percent = (self.probabilities * 100).tolist()
+        return [
+            {
+                'prediction': prediction,
+                'label': label,
+                'probabilities': {'Negative': row[2], 'Hyper': row[0], 'Hypo': row[1]},
+                'confidence': confidence
+            }
+            for prediction, label, row, confidence in zip(
+                self.prediction.tolist(), self.labels.tolist(), percent, self.confidence.tolist())
+        ]
+
 class SoftEnsemblePredictor:
     """
     Soft Ensemble predictor that combines predictions from multiple models
     using probability averaging (soft voting)
     """
     
-    def __init__(self, model_dir=None):
+    model_type = 'Soft Ensemble (RF + XGB + GB + SVM + LR)'
+    
+    # Registry version the models were loaded from (set by model_manager.py)
+    model_version = None
+    
+    # Largest batch routed through the compiled tree evaluator; bigger batches
+    # are faster in the libraries' native (multi-threaded) tree code
+    compiled_max_rows = 100
+    
+    def __init__(self, model_dir=None, tree_engine='sklearn', svm_engine='sklearn', svm_components=128,
+                 bundle_dir=None, lazy=False, member_threads=0, cascade=None, student=None):
         """
         Initialize the predictor by loading all trained models
         
         Args:
             model_dir: Directory containing the trained models. 
                       Defaults to current directory if None.
+            tree_engine: 'sklearn' to call each tree model's predict_proba, or
+                      'compiled' to evaluate RF, XGB and GB together with the
+                      flattened evaluator from tree_compiler.py
+            svm_engine: 'sklearn' to call SVC.predict_proba, 'exact' for the
+                      batched kernel evaluator from svm_engine.py, or
+                      'nystroem' / 'random_features' for its approximations
+            svm_components: Landmarks / random features for the approximate SVM engines
+            bundle_dir: Load a memory-mapped model bundle (see bundle.py) instead
+                      of the pickles; all members then run on the array engines
+            lazy: With bundle_dir, map each member only when it is first used
+            member_threads: Evaluate the members concurrently on a pool of this
+                      many threads (0 or 1 runs them one after another); each
+                      member's own n_jobs/nthread is then capped to
+                      cpu_count // member_threads
+            cascade: Early-exit cascade mode: True to load cascade.json from
+                      model_dir, a path, or a dict with 'order' and
+                      'thresholds' (see cascade.py); None runs every member
+            student: Serve a distilled student model instead of the members:
+                      True to load student.npz from model_dir, a path, or a
+                      StudentMLP (see distill.py); no member pickles are loaded
         """
         if model_dir is None:
             model_dir = os.path.dirname(os.path.abspath(__file__))
         
-        # Load individual models
-        self.rf_model = joblib.load(os.path.join(model_dir, 'rf_model.pkl'))
-        self.xgb_model = joblib.load(os.path.join(model_dir, 'xgb_model.pkl'))
-        self.gb_model = joblib.load(os.path.join(model_dir, 'gb_model.pkl'))
-        self.svm_model = joblib.load(os.path.join(model_dir, 'svm_model.pkl'))
-        self.lr_model = joblib.load(os.path.join(model_dir, 'lr_model.pkl'))
+        self.bundle = None
+        self.rf_model = self.xgb_model = self.gb_model = self.svm_model = self.lr_model = None
+        self.scaler = None
+        self._compiled_trees = None
+        self._svm_engine = None
+        self.student = None
         
-        # Load scaler
-        self.scaler = joblib.load(os.path.join(model_dir, 'scaler.pkl'))
+        if student is not None:
+            # One small network replaces the five members (see distill.py)
+            if cascade is not None:
+                raise ValueError("cascade and student modes cannot be combined")
+            if student is True:
+                student = os.path.join(model_dir, STUDENT_FILE)
+            self.student = StudentMLP.load(student) if isinstance(student, str) else student
+            # A student trained on earlier members must not replace retrained ones
+            check_fingerprint('Student model', self.student.members_fingerprint, members_fingerprint(model_dir))
+            self.members_fingerprint = self.student.members_fingerprint
+            self.class_mapping = self.student.class_mapping
+            self.numeric_cols = list(self.student.numeric_cols)
+            scale_mean, scale_scale = self.student.scale_mean, self.student.scale_scale
+            self.model_type = 'Distilled Student (MLP trained on the soft ensemble)'
+            tree_engine, svm_engine = 'sklearn', 'sklearn'
+        elif bundle_dir is not None:
+            # Array engines only: no sklearn/XGBoost objects are unpickled
+            self.bundle = ModelBundle(bundle_dir, lazy=lazy)
+            check_fingerprint(f'Bundle {self.bundle.path}', self.bundle.members_fingerprint,
+                              members_fingerprint(model_dir))
+            self.members_fingerprint = self.bundle.members_fingerprint
+            self.class_mapping = self.bundle.class_mapping
+            self.numeric_cols = list(self.bundle.numeric_cols)
+            scale_mean, scale_scale = self.bundle.scaler_mean, self.bundle.scaler_scale
+            tree_engine, svm_engine = 'compiled', 'exact'
+        else:
+            # Load individual models
+            self.rf_model = joblib.load(os.path.join(model_dir, 'rf_model.pkl'))
+            self.xgb_model = joblib.load(os.path.join(model_dir, 'xgb_model.pkl'))
+            self.gb_model = joblib.load(os.path.join(model_dir, 'gb_model.pkl'))
+            self.svm_model = joblib.load(os.path.join(model_dir, 'svm_model.pkl'))
+            self.lr_model = joblib.load(os.path.join(model_dir, 'lr_model.pkl'))
+            
+            # Load scaler
+            self.scaler = joblib.load(os.path.join(model_dir, 'scaler.pkl'))
+            scale_mean, scale_scale = self.scaler.mean_, self.scaler.scale_
+            
+            # Load class mapping
+            self.class_mapping = joblib.load(os.path.join(model_dir, 'class_mapping.pkl'))
+            
+            # Feature names
+            self.numeric_cols = ['age', 'TSH', 'T3', 'TT4', 'T4U', 'FTI', 'TBG']
+            self.members_fingerprint = members_fingerprint(model_dir)
+        
+        # NumPy fast path: scaler parameters laid out in FEATURE_COLUMNS order
+        self._scaled_idx = np.array([FEATURE_COLUMNS.index(col) for col in self.numeric_cols])
+        self._scale_mean = np.asarray(scale_mean, dtype=np.float64)
+        self._scale_scale = np.asarray(scale_scale, dtype=np.float64)
+        self._buffers = threading.local()
+        
+        # Shallow copies of the members that accept bare ndarrays without
+        # sklearn's per-call feature-name validation warning
+        self._array_models = [
+            self._array_view(model)
+            for model in (self.rf_model, self.xgb_model, self.gb_model, self.svm_model, self.lr_model)
+        ]
+        
+        # Optional flattened RF/XGB/GB evaluator
+        if tree_engine not in ('sklearn', 'compiled'):
+            raise ValueError(f"Unknown tree_engine: {tree_engine}")
+        self.tree_engine = tree_engine
+        if tree_engine == 'compiled' and self.bundle is None:
+            compiled_path = os.path.join(model_dir, COMPILED_TREES_FILE)
+            if os.path.exists(compiled_path):
+                self._compiled_trees = CompiledTreeEnsemble.load(compiled_path)
+                if self._compiled_trees.members_fingerprint != self.members_fingerprint:
+                    # Compiled from earlier pickles: recompile rather than serve stale trees
+                    print(f"  {COMPILED_TREES_FILE} does not match the loaded models; recompiling")
+                    self._compiled_trees = None
+            if self._compiled_trees is None:
+                self._compiled_trees = CompiledTreeEnsemble.from_models(self.rf_model, self.xgb_model, self.gb_model)
+                self._compiled_trees.members_fingerprint = self.members_fingerprint
+        
+        # Optional batched kernel evaluator for the SVM member
+        if svm_engine != 'sklearn' and svm_engine not in SVM_ENGINES:
+            raise ValueError(f"Unknown svm_engine: {svm_engine}")
+        if svm_engine != 'sklearn' and self.bundle is None:
+            self._svm_engine = SVMInferenceEngine.from_model(self.svm_model, method=svm_engine,
+                                                             n_components=svm_components)
         
-        # Load class mapping
-        self.class_mapping = joblib.load(os.path.join(model_dir, 'class_mapping.pkl'))
+        # Optional thread pool for evaluating the members concurrently; the
+        # libraries release the GIL in their native predict code
+        self.member_threads = member_threads
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        if member_threads > 1:
+            self.set_num_threads(max(1, (os.cpu_count() or 1) // member_threads))
         
-        # Feature names
-        self.numeric_cols = ['age', 'TSH', 'T3', 'TT4', 'T4U', 'FTI', 'TBG']
+        # Optional early-exit cascade (cheap members first, see cascade.py)
+        if cascade is True:
+            cascade = os.path.join(model_dir, CASCADE_FILE)
+        self.cascade = load_cascade(cascade) if isinstance(cascade, str) else (cascade or None)
+        if self.cascade is not None and FINGERPRINT_KEY in self.cascade:
+            # Thresholds calibrated on other members no longer bound the disagreement
+            check_fingerprint('Cascade configuration', self.cascade[FINGERPRINT_KEY], self.members_fingerprint)
+        
+        # Serving mode and engines, the part of model_key that the artifacts'
+        # fingerprint does not cover
+        if self.student is not None:
+            self._mode_key = f'student-{arrays_fingerprint(self.student.to_arrays())}'
+        else:
+            approximate = svm_engine in ('nystroem', 'random_features')
+            self._mode_key = f"{tree_engine}-{svm_engine}{f'/{svm_components}' if approximate else ''}"
+            if self.cascade is not None:
+                self._mode_key += '-cascade-' + arrays_fingerprint({
+                    'order': np.array(self.cascade['order']),
+                    'thresholds': np.array([np.nan if t is None else t for t in self.cascade['thresholds']]),
+                })
+        
+        # Optional callable(stage, seconds) notified after each inference stage
+        # (preprocess, each member's predict_proba, average)
+        self.timing_hook = None
+        
+        # Feature attributions, built on first use (see explain.py)
+        self._explainer = None
+        self._explainer_lock = threading.Lock()
         
         print("✓ Soft Ensemble Predictor loaded successfully")
-        print(f"  Models: RF, XGBoost, GB, SVM, Logistic Regression")
+        if self.student is not None:
+            print(f"  Student: {self.student.n_parameters:,} parameters (distilled from RF, XGBoost, GB, SVM, LR)")
+        else:
+            print(f"  Models: RF, XGBoost, GB, SVM, Logistic Regression")
+        if self.bundle is not None:
+            print(f"  Bundle: {self.bundle.path} (lazy={lazy})")
+        if member_threads > 1:
+            print(f"  Member threads: {member_threads}")
+        if self.cascade is not None:
+            print(f"  Cascade: {' -> '.join(self.cascade['order'])}")
         print(f"  Class mapping: {self.class_mapping}")
     
+    @property
+    def model_key(self):
+        """
+        Identifies the model behind these probabilities: the registry version
+        (or, outside the registry, the fingerprint of the loaded artifacts),
+        the serving mode and the engines. Keys cached results and drift
+        baselines, so those of different models never mix.
+        """
+        return f'{self.model_version or self.members_fingerprint}:{self._mode_key}'
+    
+    @property
+    def compiled_trees(self):
+        """Flattened RF/XGB/GB evaluator, or None when using the libraries"""
+        if self.bundle is not None:
+            return self.bundle.trees
+        return self._compiled_trees
+    
+    @property
+    def svm_engine(self):
+        """Batched SVM evaluator, or None when using SVC.predict_proba"""
+        if self.bundle is not None:
+            return self.bundle.svm
+        return self._svm_engine
+    
+    def set_num_threads(self, n_threads):
+        """
+        Cap the threads each member may use for one predict_proba call
+        
+        The pickled RF and XGBoost models default to every core (n_jobs=-1),
+        which oversubscribes the CPU once several gunicorn workers each spawn
+        a full pool. BLAS/OpenMP pools are capped separately (gunicorn.conf.py).
+        """
+        for model in (self.rf_model, self.lr_model) + tuple(self._array_models[i] for i in (0, 4)):
+            if model is not None and hasattr(model, 'n_jobs'):
+                model.n_jobs = n_threads
+        if self.xgb_model is not None:
+            self.xgb_model.set_params(n_jobs=n_threads)
+            self._array_models[1].set_params(n_jobs=n_threads)
+            self.xgb_model.get_booster().set_param('nthread', n_threads)
+    
     def preprocess_input(self, X):
         """
         Preprocess input data (scale numeric features)
         
         Args:
-            X: DataFrame or dict with features
+            X: DataFrame, dict or list of dicts with features
             
         Returns:
             Preprocessed DataFrame ready for prediction
         """
         if isinstance(X, dict):
             X = pd.DataFrame([X])
+        elif isinstance(X, list):
+            X = pd.DataFrame(X)
         elif not isinstance(X, pd.DataFrame):
-            raise ValueError("Input must be a dict or pandas DataFrame")
+            raise ValueError("Input must be a dict, list of dicts or pandas DataFrame")
         
-        # Make a copy to avoid modifying original
-        X_processed = X.copy()
+        # Select (and copy) the features in training order
+        X_processed = X[FEATURE_COLUMNS].astype(float)
         
-        # Scale numeric columns
-        X_processed[self.numeric_cols] = self.scaler.transform(X_processed[self.numeric_cols])
+        # Scale numeric columns (same operations as StandardScaler.transform)
+        X_processed[self.numeric_cols] = (X_processed[self.numeric_cols].to_numpy() - self._scale_mean) / self._scale_scale
         
         return X_processed
     
-    def predict(self, X):
+    @staticmethod
+    def _array_view(model):
+        """Return a shallow copy of a fitted model that skips feature-name checks"""
+        if model is None or 'feature_names_in_' not in vars(model):
+            return model
+        view = copy.copy(model)
+        del view.feature_names_in_
+        return view
+    
+    def _row_buffer(self):
+        """Per-thread preallocated (1, n_features) buffer for single-row inference"""
+        buffer = getattr(self._buffers, 'row', None)
+        if buffer is None:
+            buffer = np.empty((1, len(FEATURE_COLUMNS)), dtype=np.float64)
+            self._buffers.row = buffer
+        return buffer
+    
+    def preprocess_array(self, X, out=None):
         """
-        Make predictions using the soft ensemble
+        Scale a feature array in FEATURE_COLUMNS order without going through pandas
         
         Args:
-            X: Input features (dict or DataFrame)
+            X: Array-like of shape (n_features,) or (n_samples, n_features)
+            out: Optional preallocated float64 array of shape (n_samples, n_features)
+                 to write into (may be X itself to scale in place)
             
         Returns:
-            Dictionary with:
-            - prediction: Class label (0, 1, or 2)
-            - label: Class name (Hypo, Hyper, or Negative)
-            - probabilities: Dict with probabilities for each class
-            - confidence: Confidence score (0-100)
+            2D float64 ndarray ready for prediction
         """
-        # Preprocess input
-        X_processed = self.preprocess_input(X)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(f"Expected {len(FEATURE_COLUMNS)} features, got {X.shape[1]}")
+        
+        if out is None:
+            out = X.copy()
+        elif out is not X:
+            np.copyto(out, X)
+        
+        # Same operations as StandardScaler.transform, so results are bit-identical
+        scaled = out[:, self._scaled_idx]
+        scaled -= self._scale_mean
+        scaled /= self._scale_scale
+        out[:, self._scaled_idx] = scaled
+        return out
+    
+    def _record(self, stage, start):
+        """Report the time elapsed since start to the timing hook, if any"""
+        hook = self.timing_hook
+        if hook is not None:
+            hook(stage, time.perf_counter() - start)
+    
+    def _timed(self, stage, predict_proba, X):
+        """Run one member's predict_proba and report its stage time"""
+        start = time.perf_counter()
+        proba = predict_proba(X)
+        self._record(stage, start)
+        return (proba,)
+    
+    def _compiled_tree_probas(self, X):
+        """Run the flattened RF/XGB/GB evaluator (one task for three members)"""
+        start = time.perf_counter()
+        tree_probas = self.compiled_trees.predict_proba(X)
+        self._record('compiled_trees', start)
+        return tree_probas['rf'], tree_probas['xgb'], tree_probas['gb']
+    
+    def _member_tasks(self, X_processed):
+        """
+        Split one ensemble evaluation into independent tasks
+        
+        Args:
+            X_processed: Scaled DataFrame, or ndarray in FEATURE_COLUMNS order
+        
+        Returns:
+            List of (member indices, callable returning their probabilities)
+        """
+        if isinstance(X_processed, np.ndarray):
+            models = list(self._array_models)
+        else:
+            models = [self.rf_model, self.xgb_model, self.gb_model, self.svm_model, self.lr_model]
+        tasks = []
+        
+        # A bundle has no library models to fall back to for large batches
+        use_compiled = self.tree_engine == 'compiled' and (
+            self.bundle is not None or len(X_processed) <= self.compiled_max_rows)
+        if use_compiled:
+            X_processed = np.asarray(X_processed, dtype=np.float64)
+            models = self._array_models
+            tasks.append(((0, 1, 2), partial(self._compiled_tree_probas, X_processed)))
+        
+        if self.svm_engine is not None:
+            tasks.append(((3,), partial(self._timed, 'svm', self.svm_engine.predict_proba,
+                                        np.asarray(X_processed, dtype=np.float64))))
+        
+        if self.bundle is not None:
+            tasks.append(((4,), partial(self._timed, 'lr', self.bundle.lr.predict_proba,
+                                        np.asarray(X_processed, dtype=np.float64))))
+        
+        covered = {i for indices, _ in tasks for i in indices}
+        for i, (name, model) in enumerate(zip(MEMBER_NAMES, models)):
+            if i not in covered:
+                tasks.append(((i,), partial(self._timed, name, model.predict_proba, X_processed)))
+        return tasks
+    
+    def _member_pool(self):
+        """Thread pool shared by all calls for parallel member evaluation (None when sequential)"""
+        if self.member_threads <= 1:
+            return None
+        # Threads do not survive a fork, so a pool made in the gunicorn master is replaced
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(self.member_threads, thread_name_prefix='ensemble-member')
+                    self._pool_pid = os.getpid()
+        return self._pool
+    
+    def _iter_member_probas(self, X_processed):
+        """
+        Yield (member index, class probabilities) in RF, XGB, GB, SVM, LR order
+        
+        With member_threads > 1 every task is submitted to the member pool up
+        front and the results are collected in member order; otherwise each
+        task runs when its first member is needed.
+        
+        Args:
+            X_processed: Scaled DataFrame, or ndarray in FEATURE_COLUMNS order
+        """
+        tasks = self._member_tasks(X_processed)
+        owner = {i: k for k, (indices, _) in enumerate(tasks) for i in indices}
+        pool = self._member_pool() if len(tasks) > 1 else None
+        futures = [pool.submit(run) for _, run in tasks] if pool is not None else None
+        results = [None] * len(tasks)
+        
+        for i in range(len(MEMBER_NAMES)):
+            k = owner[i]
+            indices, run = tasks[k]
+            if results[k] is None:
+                results[k] = futures[k].result() if futures is not None else run()
+            yield i, results[k][indices.index(i)]
+            if i == indices[-1]:
+                results[k] = None
+
+    def _member_probas(self, X_processed):
+        """Get class probabilities from every member, in RF, XGB, GB, SVM, LR order"""
+        return [proba for _, proba in self._iter_member_probas(X_processed)]
+    
+    def _member_proba(self, i, X):
+        """
+        Class probabilities of member i alone (MEMBER_NAMES order) for a scaled ndarray
         
-        # Get probability predictions from each model
-        rf_proba = self.rf_model.predict_proba(X_processed)
-        xgb_proba = self.xgb_model.predict_proba(X_processed)
-        gb_proba = self.gb_model.predict_proba(X_processed)
-        svm_proba = self.svm_model.predict_proba(X_processed)
-        lr_proba = self.lr_model.predict_proba(X_processed)
+        Uses the same engine for the member as a full evaluation would.
+        """
+        name = MEMBER_NAMES[i]
+        start = time.perf_counter()
+        if i < 3 and self.tree_engine == 'compiled' and (
+                self.bundle is not None or len(X) <= self.compiled_max_rows):
+            proba = self.compiled_trees.predict_proba(X, members=(name,))[name]
+        elif i == 3 and self.svm_engine is not None:
+            proba = self.svm_engine.predict_proba(X)
+        elif i == 4 and self.bundle is not None:
+            proba = self.bundle.lr.predict_proba(X)
+        else:
+            proba = self._array_models[i].predict_proba(X)
+        self._record(name, start)
+        return proba
+    
+    def _cascade_proba(self, X_processed):
+        """
+        Early-exit soft vote: evaluate members in cascade order and stop for
+        each sample once the partial vote's top-two margin exceeds the
+        calibrated threshold for that stage
         
-        # Average the probabilities (soft voting)
-        ensemble_proba = np.mean([rf_proba, xgb_proba, gb_proba, svm_proba, lr_proba], axis=0)
+        Returns:
+            (n_samples, 3) soft vote of the members each sample used, and the
+            (n_samples,) number of members used
+        """
+        X = np.asarray(X_processed, dtype=np.float64)
+        order = [MEMBER_NAMES.index(name) for name in self.cascade['order']]
+        thresholds = self.cascade['thresholds']
+        total = np.zeros((len(X), 3))
+        used = np.zeros(len(X), dtype=np.int64)
+        active = np.arange(len(X))
+        for k, i in enumerate(order, start=1):
+            total[active] += self._member_proba(i, X[active] if len(active) < len(X) else X)
+            used[active] = k
+            if k == len(order):
+                break
+            if thresholds[k - 1] is None:
+                # Merged into the next stage: no panel could exit here
+                continue
+            decided = vote_margin(total[active] / k) > thresholds[k - 1]
+            active = active[~decided]
+            if len(active) == 0:
+                break
+        total /= used[:, None]
+        return total, used
+    
+    def _ensemble_proba(self, X_processed):
+        """
+        Soft-vote the members into one (n_samples, 3) float64 array
         
-        # Get class predictions
-        prediction = np.argmax(ensemble_proba[0])
-        probabilities = ensemble_proba[0]
+        Each member's probabilities are added into a single preallocated
+        buffer as soon as they are available (in member order, so the result
+        is bit-identical to np.mean over the stacked members) instead of
+        stacking all five into an (n_members, n_samples, 3) temporary.
+        In cascade mode this is the early-exit vote instead, and in student
+        mode the distilled model's output.
+        """
+        if self.student is not None:
+            start = time.perf_counter()
+            proba = self.student.predict_proba(X_processed)
+            self._record('student', start)
+            return proba
+        if self.cascade is not None:
+            return self._cascade_proba(X_processed)[0]
+        out = None
+        elapsed = 0.0
+        for _, proba in self._iter_member_probas(X_processed):
+            start = time.perf_counter()
+            if out is None:
+                out = np.array(proba, dtype=np.float64)
+            else:
+                out += proba
+            elapsed += time.perf_counter() - start
+        start = time.perf_counter()
+        out /= len(MEMBER_NAMES)
+        if self.timing_hook is not None:
+            self.timing_hook('average', elapsed + time.perf_counter() - start)
+        return out
+    
+    def _format_result(self, probabilities):
+        """Build the result dictionary for one row of ensemble probabilities"""
+        prediction = int(np.argmax(probabilities))
         confidence = probabilities[prediction] * 100
         
-        # Create result dictionary
-        result = {
-            'prediction': int(prediction),
+        return {
+            'prediction': prediction,
             'label': self.class_mapping[prediction],
             'probabilities': {
                 'Negative': float(probabilities[2]) * 100,  # Class 2
@@ -111,59 +587,161 @@ class SoftEnsemblePredictor:
                 'Hypo': float(probabilities[1]) * 100       # Class 1
             },
             'confidence': float(confidence),
-            'model_type': 'Soft Ensemble (RF + XGB + GB + SVM + LR)'
+            'model_type': self.model_type,
+            'model_version': self.model_version
         }
-        
-        return result
     
-    def predict_batch(self, X):
+    def predict_array(self, x):
         """
-        Make predictions for multiple samples
+        Predict a single sample given as a float array in FEATURE_COLUMNS order
+        
+        Skips DataFrame construction entirely: the row is scaled into a
+        preallocated per-thread buffer and passed to the models as an ndarray.
+        Produces the same probabilities as predict().
         
         Args:
-            X: DataFrame with multiple samples
+            x: Array-like of length 15 (FEATURE_COLUMNS order)
             
         Returns:
-            List of prediction dictionaries
+            Same dictionary as predict()
         """
-        if not isinstance(X, pd.DataFrame):
-            raise ValueError("Input must be a pandas DataFrame")
+        start = time.perf_counter()
+        X_processed = self.preprocess_array(x, out=self._row_buffer())
+        self._record('preprocess', start)
+        
+        ensemble_proba = self._ensemble_proba(X_processed)
         
+        return self._format_result(ensemble_proba[0])
+    
+    def predict_proba(self, X):
+        """
+        Ensemble class probabilities for a float array in FEATURE_COLUMNS order
+        
+        The vectorized path for bulk scoring: no DataFrame and no per-row
+        dictionaries.
+        
+        Args:
+            X: Array-like of shape (n_samples, 15)
+        
+        Returns:
+            (n_samples, 3) float64 ndarray indexed by class (0=Hyper, 1=Hypo, 2=Negative)
+        """
+        start = time.perf_counter()
+        X_processed = self.preprocess_array(X)
+        self._record('preprocess', start)
+        
+        return self._ensemble_proba(X_processed)
+    
+    def predict(self, X):
+        """
+        Make predictions using the soft ensemble
+        
+        Args:
+            X: Input features (dict or DataFrame)
+            
+        Returns:
+            Dictionary with:
+            - prediction: Class label (0, 1, or 2)
+            - label: Class name (Hypo, Hyper, or Negative)
+            - probabilities: Dict with probabilities for each class
+            - confidence: Confidence score (0-100)
+        """
         # Preprocess input
+        start = time.perf_counter()
         X_processed = self.preprocess_input(X)
+        self._record('preprocess', start)
         
-        # Get probability predictions from each model
-        rf_proba = self.rf_model.predict_proba(X_processed)
-        xgb_proba = self.xgb_model.predict_proba(X_processed)
-        gb_proba = self.gb_model.predict_proba(X_processed)
-        svm_proba = self.svm_model.predict_proba(X_processed)
-        lr_proba = self.lr_model.predict_proba(X_processed)
+        # Average the members' probability predictions (soft voting)
+        ensemble_proba = self._ensemble_proba(X_processed)
         
-        # Average the probabilities
-        ensemble_proba = np.mean([rf_proba, xgb_proba, gb_proba, svm_proba, lr_proba], axis=0)
+        # Get class prediction and build the result dictionary
+        return self._format_result(ensemble_proba[0])
+    
+    def predict_batch_result(self, X):
+        """
+        Make vectorized predictions for multiple samples
         
-        predictions = []
-        for i, proba in enumerate(ensemble_proba):
-            prediction = np.argmax(proba)
-            confidence = proba[prediction] * 100
-            
-            result = {
-                'prediction': int(prediction),
-                'label': self.class_mapping[prediction],
-                'probabilities': {
-                    'Negative': float(proba[2]) * 100,
-                    'Hyper': float(proba[0]) * 100,
-                    'Hypo': float(proba[1]) * 100
-                },
-                'confidence': float(confidence)
-            }
-            predictions.append(result)
+        Features are scaled as one float array, the members are averaged into
+        a single (n_samples, 3) buffer, and argmax/confidence are computed for
+        the whole batch at once.
+        
+        Args:
+            X: DataFrame, list of dicts, or array of shape (n_samples, 15) in
+               FEATURE_COLUMNS order
+        
+        Returns:
+            BatchResult (use .to_frame() or .to_dicts() for other views)
+        """
+        if isinstance(X, list):
+            X = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+        if isinstance(X, pd.DataFrame):
+            X = X[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        elif not isinstance(X, np.ndarray):
+            raise ValueError("Input must be a pandas DataFrame, list of dicts or ndarray")
+        
+        # Preprocess input
+        start = time.perf_counter()
+        X_processed = self.preprocess_array(X)
+        self._record('preprocess', start)
+        
+        if self.cascade is not None:
+            probabilities, members_used = self._cascade_proba(X_processed)
+            return BatchResult(probabilities, self.class_mapping, members_used)
+        return BatchResult(self._ensemble_proba(X_processed), self.class_mapping)
+    
+    @property
+    def explainer(self):
+        """EnsembleExplainer for this predictor, built on first access (about 2 s)"""
+        if self._explainer is None:
+            with self._explainer_lock:
+                if self._explainer is None:
+                    self._explainer = EnsembleExplainer(self, load_background(self))
+        return self._explainer
+    
+    def explain(self, X):
+        """
+        Feature attributions for samples in FEATURE_COLUMNS order
+        
+        Explains the full five-member vote (also in cascade mode, where the
+        served probabilities may come from fewer members).
+        
+        Args:
+            X: Array-like of shape (n_samples, 15) or (15,), unscaled
+        
+        Returns:
+            Explanation (use .to_dicts() for per-sample dictionaries)
+        """
+        X_processed = self.preprocess_array(X)
+        start = time.perf_counter()
+        explanation = self.explainer.explain(X_processed)
+        self._record('explain', start)
+        return explanation
+    
+    def predict_batch(self, X):
+        """
+        Make predictions for multiple samples
         
-        return predictions
+        Args:
+            X: DataFrame (or list of dicts) with multiple samples
+        
+        Returns:
+            List of prediction dictionaries
+        """
+        if not isinstance(X, (list, pd.DataFrame)):
+            raise ValueError("Input must be a pandas DataFrame or list of dicts")
+        return self.predict_batch_result(X).to_dicts()
 
 
 # Example usage
 if __name__ == "__main__":
+    import sys
+    
+    # `python predict.py input.csv [options]` streams a file through score.py
+    if len(sys.argv) > 1:
+        from score import main
+        main()
+        sys.exit(0)
+    
     # Initialize predictor
     predictor = SoftEnsemblePredictor()
     
@@ -0,0 +1,289 @@
+"""
+Streaming Batch Scorer
+Scores arbitrarily large CSV / NDJSON files with the soft ensemble in
+fixed-size chunks and writes the probabilities incrementally, so memory
+stays constant in the input size.
+
+Each chunk is parsed, coerced to a float array in FEATURE_COLUMNS order and
+scored with one vectorized SoftEnsemblePredictor.predict_batch_result call. Rows
+with missing or non-numeric features are written with an error instead of
+failing the run. With --workers N, chunks are scored in N processes while
+the main process reads and writes in input order; at most 2N chunks are in
+flight.
+
+Output columns: [kept columns], row, prediction, confidence, prob_Negative,
+prob_Hypo, prob_Hyper, error
+
+Parquet output needs pyarrow, which is an optional extra and not in
+requirements.txt (pip install pyarrow).
+
+Usage:
+    python score.py input.csv -o scores.csv
+    python score.py panels.ndjson -o scores.parquet --workers 4 --chunk-rows 20000
+    cat input.csv | python score.py - --format ndjson > scores.ndjson
+"""
+
+import argparse
+import contextlib
+import os
+import resource
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from predict import SoftEnsemblePredictor, FEATURE_COLUMNS, PROBABILITY_INDEX
+
+OUTPUT_FORMATS = ['csv', 'ndjson', 'parquet']
+RESULT_COLUMNS = ['row', 'prediction', 'confidence', 'prob_Negative', 'prob_Hypo', 'prob_Hyper', 'error']
+
+
+def infer_format(path, default):
+    """File format from the extension (.csv, .ndjson/.jsonl, .parquet)"""
+    ext = os.path.splitext(path)[1].lower() if path not in (None, '-') else ''
+    if ext in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if ext in ('.csv', '.parquet'):
+        return ext[1:]
+    return default
+
+
+def read_chunks(path, input_format, chunk_rows, keep=()):
+    """Yield DataFrame chunks of at most chunk_rows rows (features and kept columns as read)"""
+    source = sys.stdin if path == '-' else path
+    if input_format == 'ndjson':
+        columns = list(FEATURE_COLUMNS) + [col for col in keep if col not in FEATURE_COLUMNS]
+        for chunk in pd.read_json(source, lines=True, chunksize=chunk_rows, dtype=False):
+            yield chunk.reindex(columns=columns)
+        return
+
+    wanted = set(FEATURE_COLUMNS) | set(keep)
+    reader = pd.read_csv(source, usecols=lambda col: col in wanted, dtype=str, chunksize=chunk_rows,
+                         encoding='utf-8-sig')
+    for chunk in reader:
+        missing = [col for col in FEATURE_COLUMNS + list(keep) if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        yield chunk
+
+
+def score_frame(predictor, chunk, first_row=0, keep=()):
+    """
+    Score one chunk into a results frame
+
+    Returns:
+        (DataFrame with the kept columns plus RESULT_COLUMNS, number of error rows)
+    """
+    n = len(chunk)
+    X = np.empty((n, len(FEATURE_COLUMNS)), dtype=np.float64)
+    for j, col in enumerate(FEATURE_COLUMNS):
+        X[:, j] = pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    invalid = np.isnan(X).any(axis=1)
+    valid = ~invalid
+
+    prediction = np.full(n, None, dtype=object)
+    confidence = np.full(n, np.nan)
+    probabilities = np.full((n, 3), np.nan)
+    if valid.any():
+        batch = predictor.predict_batch_result(X[valid] if invalid.any() else X)
+        prediction[valid] = batch.labels
+        confidence[valid] = batch.confidence
+        probabilities[valid] = batch.probabilities
+
+    out = pd.DataFrame({col: chunk[col].to_numpy() for col in keep})
+    out['row'] = np.arange(first_row, first_row + n)
+    out['prediction'] = prediction
+    out['confidence'] = confidence
+    for name, index in PROBABILITY_INDEX.items():
+        out[f'prob_{name}'] = probabilities[:, index] * 100
+
+    errors = np.full(n, None, dtype=object)
+    if invalid.any():
+        names = np.array(FEATURE_COLUMNS)
+        errors[invalid] = ['Invalid or missing: ' + ', '.join(names[row]) for row in np.isnan(X[invalid])]
+    out['error'] = errors
+    return out, int(invalid.sum())
+
+
+class ResultWriter:
+    """Incremental CSV / NDJSON / Parquet writer for result chunks"""
+
+    def __init__(self, path, output_format, keep=()):
+        self.path = path
+        self.format = output_format
+        self.keep = list(keep)
+        self._header = True
+        self._parquet = None
+        if output_format == 'parquet':
+            if path in (None, '-'):
+                raise ValueError("Parquet output needs a file path (-o)")
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Parquet output requires the optional pyarrow package (pip install pyarrow)")
+            self._pa = pa
+            schema = pa.schema(
+                [(col, pa.string()) for col in self.keep]
+                + [('row', pa.int64()), ('prediction', pa.string()), ('confidence', pa.float64())]
+                + [(f'prob_{name}', pa.float64()) for name in PROBABILITY_INDEX]
+                + [('error', pa.string())]
+            )
+            self._parquet = pq.ParquetWriter(path, schema)
+            self._file = None
+        else:
+            self._file = sys.stdout if path in (None, '-') else open(path, 'w', newline='')
+
+    def write(self, frame):
+        if self.format == 'parquet':
+            table = self._pa.Table.from_pandas(frame.astype({col: str for col in self.keep}),
+                                               schema=self._parquet.schema, preserve_index=False)
+            self._parquet.write_table(table)
+        elif self.format == 'ndjson':
+            if len(frame):
+                lines = frame.to_json(orient='records', lines=True, double_precision=6)
+                self._file.write(lines if lines.endswith('\n') else lines + '\n')
+        else:
+            frame.to_csv(self._file, header=self._header, index=False, float_format='%.4f')
+        self._header = False
+
+    def close(self):
+        if self.format == 'csv' and self._header:
+            self._file.write(','.join(self.keep + RESULT_COLUMNS) + '\n')
+        if self._parquet is not None:
+            self._parquet.close()
+        elif self._file is not sys.stdout:
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+# Per-process predictor for --workers > 1
+_worker_predictor = None
+
+
+def _init_worker(predictor_kwargs):
+    global _worker_predictor
+    with contextlib.redirect_stdout(sys.stderr):
+        _worker_predictor = SoftEnsemblePredictor(**predictor_kwargs)
+    _worker_predictor.set_num_threads(1)
+
+
+def _score_in_worker(chunk, first_row, keep):
+    return score_frame(_worker_predictor, chunk, first_row, keep)
+
+
+def score_file(input_path, output_path=None, input_format=None, output_format=None, chunk_rows=10000,
+               workers=1, keep=(), predictor=None, predictor_kwargs=None, progress=None):
+    """
+    Stream input_path through the ensemble into output_path
+
+    Args:
+        predictor: Predictor to use in this process (workers=1); loaded from
+                   predictor_kwargs when None
+        progress: Optional callable(rows, error_rows, seconds) after each chunk
+
+    Returns:
+        Dict with rows, error_rows, seconds and rows_per_sec
+    """
+    input_format = input_format or infer_format(input_path, 'csv')
+    output_format = output_format or infer_format(output_path, 'csv')
+    keep = list(keep)
+    predictor_kwargs = predictor_kwargs or {}
+
+    start = time.perf_counter()
+    rows = error_rows = 0
+    writer = ResultWriter(output_path, output_format, keep)
+    chunks = read_chunks(input_path, input_format, chunk_rows, keep)
+
+    def emit(scored, chunk_errors):
+        nonlocal rows, error_rows
+        writer.write(scored)
+        rows += len(scored)
+        error_rows += chunk_errors
+        if progress is not None:
+            progress(rows, error_rows, time.perf_counter() - start)
+
+    try:
+        if workers <= 1:
+            if predictor is None:
+                predictor = SoftEnsemblePredictor(**predictor_kwargs)
+            for chunk in chunks:
+                emit(*score_frame(predictor, chunk, rows, keep))
+        else:
+            import multiprocessing
+            with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(predictor_kwargs,)) as pool:
+                pending = deque()
+                submitted = 0
+                for chunk in chunks:
+                    pending.append(pool.apply_async(_score_in_worker, (chunk, submitted, keep)))
+                    submitted += len(chunk)
+                    # Bound the chunks held in memory; results are written in input order
+                    while len(pending) >= 2 * workers:
+                        emit(*pending.popleft().get())
+                while pending:
+                    emit(*pending.popleft().get())
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'error_rows': error_rows,
+        'seconds': seconds,
+        'rows_per_sec': rows / seconds if seconds > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="CSV or NDJSON file in the df_copy_cleaned.csv column layout ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="output file (default: stdout)")
+    parser.add_argument('--input-format', choices=['csv', 'ndjson'], help='default: from the input extension')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS,
+                        help='output format (default: from the output extension); parquet needs the optional '
+                             'pyarrow package')
+    parser.add_argument('--chunk-rows', type=int, default=10000, help='rows scored per chunk')
+    parser.add_argument('--workers', type=int, default=1, help='scoring processes')
+    parser.add_argument('--keep', action='append', default=[], metavar='COLUMN',
+                        help='copy an input column (e.g. an id) to the output; repeatable')
+    parser.add_argument('--svm-engine', default='sklearn')
+    parser.add_argument('--bundle', help='score with a model bundle directory (see bundle.py)')
+    parser.add_argument('--quiet', action='store_true', help='no progress or throughput report')
+    args = parser.parse_args(argv)
+
+    # No --tree-engine: chunks are far larger than compiled_max_rows, so the
+    # libraries' tree code would score them either way (a bundle always uses
+    # its compiled trees)
+    predictor_kwargs = {'svm_engine': args.svm_engine, 'bundle_dir': args.bundle}
+
+    def progress(rows, error_rows, seconds):
+        print(f"\r  {rows:,} rows ({error_rows:,} errors), {rows / max(seconds, 1e-9):,.0f} rows/s",
+              end='', file=sys.stderr, flush=True)
+
+    # Model loading prints go to stderr so stdout carries only results
+    predictor = None
+    if args.workers <= 1:
+        with contextlib.redirect_stdout(sys.stderr):
+            predictor = SoftEnsemblePredictor(**predictor_kwargs)
+
+    report = score_file(args.input, args.output, args.input_format, args.format, args.chunk_rows, args.workers,
+                        args.keep, predictor=predictor, predictor_kwargs=predictor_kwargs,
+                        progress=None if args.quiet else progress)
+
+    if not args.quiet:
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        memory = f"peak RSS {peak_mb:.0f} MB"
+        if args.workers > 1:
+            # The pool has been joined, so its workers are counted as children
+            worker_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+            memory = f"peak RSS {peak_mb:.0f} MB main process + up to {worker_mb:.0f} MB per worker"
+        print(f"\r✓ Scored {report['rows']:,} rows ({report['error_rows']:,} errors) in {report['seconds']:.2f}s: "
+              f"{report['rows_per_sec']:,.0f} rows/s, {memory}", file=sys.stderr)
+    return report
+
+
+if __name__ == "__main__":
+    main()
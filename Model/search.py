@@ -0,0 +1,381 @@
+"""
+Hyperparameter Search
+Tunes each ensemble member with successive halving and then the ensemble
+weights, scoring every candidate on cross-validated accuracy and on its
+single-row inference latency, and reports the Pareto-optimal serving
+configurations (no candidate is both more accurate and faster).
+
+Successive halving: each member starts with --configs sampled
+configurations (the current model.py settings always included), trained on
+a 1/eta^k fraction of every fold's training rows. After each rung the best
+1/eta by Pareto rank (then accuracy) move on to eta times the rows, until
+the last rung trains on all of them.
+
+Preprocessing is shared: the scaled training split (as in model.py), the
+stratified folds and every rung's stratified row subsets are computed once
+in the main process and handed to each worker process once. All members'
+(config, fold) fits of a rung run together on --workers processes.
+
+Ensemble weights are searched on the members' out-of-fold probabilities:
+every subset of members, with equal and random Dirichlet weights. An
+ensemble's latency is the sum of its members' latencies. The best member
+configurations are then refitted on the whole training split to report the
+held-out accuracy of the ensemble front.
+
+Usage:
+    python search.py [--configs 9] [--eta 3] [--folds 3] [--members rf xgb] [--output search.json]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Candidate values per member; configurations are sampled from the grid
+SEARCH_SPACE = {
+    'rf': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [8, 15, None],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': ['sqrt', 0.5],
+    },
+    'xgb': {
+        'n_estimators': [50, 100, 200, 400],
+        'max_depth': [3, 5, 7],
+        'learning_rate': [0.05, 0.1, 0.3],
+        'subsample': [0.8, 1.0],
+    },
+    'gb': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [3, 5],
+        'learning_rate': [0.05, 0.1, 0.2],
+        'subsample': [0.8, 1.0],
+    },
+    'svm': {
+        'C': [0.3, 1.0, 3.0, 10.0, 30.0],
+        'gamma': ['scale', 0.03, 0.1, 0.3],
+    },
+    'lr': {
+        'C': [0.01, 0.1, 1.0, 10.0, 100.0],
+    },
+}
+
+# Single-row predict_proba calls timed per fitted candidate
+LATENCY_REPEAT = 30
+
+
+def sample_configs(name, base, n_configs, rng):
+    """The base model's settings plus up to n_configs - 1 distinct random grid points"""
+    space = SEARCH_SPACE[name]
+    base_params = base.get_params()
+    configs = [{key: base_params[key] for key in space}]
+    grid = list(itertools.product(*space.values()))
+    for index in rng.permutation(len(grid)):
+        if len(configs) >= n_configs:
+            break
+        config = dict(zip(space, grid[index]))
+        if config not in configs:
+            configs.append(config)
+    return configs
+
+
+def pareto_front(points):
+    """Indices of the points no other point beats on both accuracy (higher) and latency (lower)"""
+    front = []
+    for i, p in enumerate(points):
+        dominated = any(
+            q['accuracy'] >= p['accuracy'] and q['latency_ms'] <= p['latency_ms']
+            and (q['accuracy'] > p['accuracy'] or q['latency_ms'] < p['latency_ms'])
+            for q in points
+        )
+        if not dominated:
+            front.append(i)
+    return front
+
+
+def pareto_ranks(points):
+    """Non-dominated sorting: 0 for the front, 1 for the front of the rest, ..."""
+    ranks = [None] * len(points)
+    remaining = list(range(len(points)))
+    rank = 0
+    while remaining:
+        front = [remaining[i] for i in pareto_front([points[j] for j in remaining])]
+        for i in front:
+            ranks[i] = rank
+        remaining = [i for i in remaining if ranks[i] is None]
+        rank += 1
+    return ranks
+
+
+def _log_loss(proba, y):
+    return float(-np.mean(np.log(np.clip(proba[np.arange(len(y)), y], 1e-15, None))))
+
+
+def _single_row_latency(model, X):
+    """Median single-row predict_proba latency in milliseconds"""
+    timings = []
+    for row in X[:LATENCY_REPEAT]:
+        start = time.perf_counter()
+        model.predict_proba(row[None, :])
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+# Shared data of each worker process (set once by _init_worker)
+_shared = None
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+
+def _fit_candidate(name, config, fold, rung, measure_latency):
+    """Fit one configuration on one fold's rung subset; return its validation probabilities"""
+    from model import build_members
+    X, y = _shared['X'], _shared['y']
+    train_rows = _shared['subsets'][fold][rung]
+    val_rows = _shared['folds'][fold][1]
+
+    model = build_members()[name]
+    model.set_params(**config)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+    start = time.perf_counter()
+    model.fit(X[train_rows], y[train_rows])
+    fit_seconds = time.perf_counter() - start
+    proba = model.predict_proba(X[val_rows])
+    latency = _single_row_latency(model, X[val_rows]) if measure_latency else None
+    return proba, latency, fit_seconds
+
+
+def prepare_data(data_path, n_folds, budgets, seed):
+    """
+    Scaled training split, folds and per-rung row subsets, computed once
+
+    Returns:
+        Dict with X, y (training split as float arrays), X_test, y_test,
+        folds [(train_rows, val_rows)] and subsets[fold][rung] (row indices)
+    """
+    import pandas as pd
+    from sklearn.model_selection import StratifiedKFold, train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from model import numeric_cols
+
+    df = pd.read_csv(data_path)
+    X = df.drop('target', axis=1)
+    y = df['target'].to_numpy()
+    X[numeric_cols] = StandardScaler().fit_transform(X[numeric_cols])
+
+    # Same split as model.py; the test split is only used for the final report
+    X_train, X_test, y_train, y_test = train_test_split(X.to_numpy(dtype=np.float64), y, test_size=0.2,
+                                                        random_state=42, stratify=y)
+    folds = list(StratifiedKFold(n_folds, shuffle=True, random_state=seed).split(X_train, y_train))
+    subsets = []
+    for train_rows, _ in folds:
+        rungs = []
+        for budget in budgets:
+            if budget >= 1:
+                rungs.append(train_rows)
+            else:
+                rows, _ = train_test_split(train_rows, train_size=budget, random_state=seed,
+                                           stratify=y_train[train_rows])
+                rungs.append(np.sort(rows))
+        subsets.append(rungs)
+    return {'X': X_train, 'y': y_train, 'X_test': X_test, 'y_test': y_test,
+            'folds': folds, 'subsets': subsets, 'columns': list(X.columns)}
+
+
+def successive_halving(members, configs, shared, budgets, eta, pool, log=print):
+    """
+    Run every member's rungs in lockstep on the shared pool
+
+    Returns:
+        Dict mapping member name to its candidates: dicts with config, rung,
+        accuracy, log_loss, latency_ms and (last rung only) oof probabilities
+    """
+    n_folds = len(shared['folds'])
+    y = shared['y']
+    alive = {name: list(range(len(configs[name]))) for name in members}
+    history = {name: [] for name in members}
+
+    for rung, budget in enumerate(budgets):
+        start = time.perf_counter()
+        futures = {}
+        for name in members:
+            for c in alive[name]:
+                for fold in range(n_folds):
+                    futures[name, c, fold] = pool.submit(_fit_candidate, name, configs[name][c], fold, rung, fold == 0)
+
+        fit_seconds = 0.0
+        for name in members:
+            candidates = []
+            for c in alive[name]:
+                oof = np.zeros((len(y), 3))
+                latency = None
+                for fold in range(n_folds):
+                    proba, fold_latency, seconds = futures[name, c, fold].result()
+                    oof[shared['folds'][fold][1]] = proba
+                    latency = fold_latency if fold_latency is not None else latency
+                    fit_seconds += seconds
+                candidates.append({
+                    'config': c,
+                    'rung': rung,
+                    'budget': budget,
+                    'accuracy': float(np.mean(oof.argmax(axis=1) == y)),
+                    'log_loss': _log_loss(oof, y),
+                    'latency_ms': latency,
+                    'oof': oof if rung == len(budgets) - 1 else None,
+                })
+            history[name].extend(candidates)
+
+            # Promote the best 1/eta by Pareto rank, then accuracy, then log loss
+            if rung < len(budgets) - 1:
+                ranks = pareto_ranks(candidates)
+                order = sorted(range(len(candidates)),
+                               key=lambda i: (ranks[i], -candidates[i]['accuracy'], candidates[i]['log_loss']))
+                keep = max(1, len(candidates) // eta)
+                alive[name] = [candidates[i]['config'] for i in order[:keep]]
+
+        log(f"  rung {rung + 1}/{len(budgets)} ({budget:.0%} of the fold rows): "
+            + ', '.join(f"{name} {sum(1 for c in history[name] if c['rung'] == rung)}" for name in members)
+            + f" configs, {fit_seconds:.1f}s of fitting in {time.perf_counter() - start:.1f}s")
+    return history
+
+
+def search_weights(oof, latency_ms, y, samples=200, seed=0):
+    """
+    Ensemble candidates over every subset of members with equal and random weights
+
+    Args:
+        oof: Dict mapping member name to its (n_samples, 3) out-of-fold probabilities
+        latency_ms: Dict mapping member name to its single-row latency
+
+    Returns:
+        List of dicts with members, weights, accuracy, log_loss and latency_ms
+    """
+    rng = np.random.default_rng(seed)
+    names = list(oof)
+    candidates = []
+    for size in range(1, len(names) + 1):
+        for subset in itertools.combinations(names, size):
+            stacked = np.stack([oof[name] for name in subset])
+            weight_sets = [np.full(size, 1.0 / size)]
+            if size > 1:
+                weight_sets.extend(rng.dirichlet(np.ones(size), samples))
+            best = None
+            for weights in weight_sets:
+                proba = np.tensordot(weights, stacked, axes=1)
+                score = (float(np.mean(proba.argmax(axis=1) == y)), -_log_loss(proba, y))
+                if best is None or score > best[0]:
+                    best = (score, weights)
+            (accuracy, neg_log_loss), weights = best
+            candidates.append({
+                'members': list(subset),
+                'weights': {name: round(float(w), 4) for name, w in zip(subset, weights)},
+                'accuracy': accuracy,
+                'log_loss': -neg_log_loss,
+                'latency_ms': float(sum(latency_ms[name] for name in subset)),
+            })
+    return candidates
+
+
+def main():
+    from sklearn.metrics import accuracy_score
+    from model import build_members, MEMBER_LABELS
+
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=os.path.join(model_dir, '..', 'dataset', 'df_copy_cleaned.csv'))
+    parser.add_argument('--output', default=os.path.join(model_dir, 'search.json'))
+    parser.add_argument('--members', nargs='+', choices=list(SEARCH_SPACE), default=list(SEARCH_SPACE))
+    parser.add_argument('--configs', type=int, default=9, help='sampled configurations per member')
+    parser.add_argument('--eta', type=int, default=3, help='halving rate: keep 1/eta per rung, eta times the rows')
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--weight-samples', type=int, default=200, help='random weightings per member subset')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # Rungs: configs, configs/eta, ... down to at most eta on all rows
+    n_rungs = 1
+    while args.configs // args.eta ** n_rungs >= args.eta:
+        n_rungs += 1
+    budgets = [1.0 / args.eta ** (n_rungs - 1 - k) for k in range(n_rungs)]
+
+    search_start = time.perf_counter()
+    shared = prepare_data(args.data, args.folds, budgets, args.seed)
+    rng = np.random.default_rng(args.seed)
+    base = build_members()
+    configs = {name: sample_configs(name, base[name], args.configs, rng) for name in args.members}
+
+    print("=" * 80)
+    print("HYPERPARAMETER SEARCH - SUCCESSIVE HALVING")
+    print("=" * 80)
+    print(f"{len(shared['y'])} training rows, {args.folds} folds, {args.workers} worker process(es), "
+          f"rungs at {', '.join(f'{b:.0%}' for b in budgets)} of the fold rows")
+
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(shared,)) as pool:
+        history = successive_halving(args.members, configs, shared, budgets, args.eta, pool)
+
+        # Refit each member's most accurate final configuration on the whole training split
+        final = {}
+        for name in args.members:
+            last = [c for c in history[name] if c['rung'] == len(budgets) - 1]
+            final[name] = max(last, key=lambda c: (c['accuracy'], -c['log_loss']))
+
+    X_train, y_train, X_test, y_test = shared['X'], shared['y'], shared['X_test'], shared['y_test']
+    test_proba, latency = {}, {}
+    for name, candidate in final.items():
+        model = base[name].set_params(**configs[name][candidate['config']])
+        if 'n_jobs' in model.get_params():
+            model.set_params(n_jobs=1)
+        model.fit(X_train, y_train)
+        test_proba[name] = model.predict_proba(X_test)
+        latency[name] = _single_row_latency(model, X_test)
+
+    report = {'settings': vars(args) | {'budgets': budgets}, 'members': {}, 'ensemble_front': []}
+    width = max(len(json.dumps(config)) for name in args.members for config in configs[name]) + 2
+    print(f"\n{'member':<22}{'config':<{width}}{'cv acc':>8}{'ms':>8}")
+    for name in args.members:
+        last = [c for c in history[name] if c['rung'] == len(budgets) - 1]
+        front = [last[i] for i in pareto_front(last)]
+        entries = []
+        for c in sorted(front, key=lambda c: -c['accuracy']):
+            params = configs[name][c['config']]
+            marker = '*' if c is final[name] else ' '
+            print(f"{marker} {MEMBER_LABELS[name]:<20}{json.dumps(params):<{width}}{c['accuracy']:>8.4f}{c['latency_ms']:>8.3f}")
+            entries.append({'params': params, 'cv_accuracy': c['accuracy'], 'cv_log_loss': c['log_loss'],
+                            'latency_ms': c['latency_ms'], 'baseline': c['config'] == 0})
+        report['members'][name] = {
+            'best': configs[name][final[name]['config']],
+            'front': entries,
+            'test_accuracy': float(accuracy_score(y_test, test_proba[name].argmax(axis=1))),
+            'latency_ms': latency[name],
+        }
+
+    # Ensemble weights on the out-of-fold probabilities of the chosen configurations
+    ensembles = search_weights({name: c['oof'] for name, c in final.items()}, latency, y_train,
+                               args.weight_samples, args.seed)
+    front = sorted((ensembles[i] for i in pareto_front(ensembles)), key=lambda e: -e['accuracy'])
+    print(f"\nEnsemble Pareto front (* = members above, weights from out-of-fold probabilities):")
+    print(f"{'members and weights':<60}{'cv acc':>8}{'test acc':>10}{'ms':>8}")
+    for ensemble in front:
+        proba = sum(w * test_proba[name] for name, w in ensemble['weights'].items())
+        ensemble['test_accuracy'] = float(accuracy_score(y_test, proba.argmax(axis=1)))
+        weights = ' '.join(f"{name}={w:.2f}" for name, w in ensemble['weights'].items())
+        print(f"{weights:<60}{ensemble['accuracy']:>8.4f}{ensemble['test_accuracy']:>10.4f}"
+              f"{ensemble['latency_ms']:>8.3f}")
+    report['ensemble_front'] = front
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\n✓ Search finished in {time.perf_counter() - search_start:.0f}s; wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
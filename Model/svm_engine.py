@@ -0,0 +1,310 @@
+"""
+SVM Inference Engine
+Evaluates the RBF SVC member with precomputed support vectors and dual
+coefficients: one batched kernel matrix product gives every one-vs-one
+decision value, followed by the stored Platt sigmoids and libsvm's pairwise
+coupling. Optional Nystroem / random-features approximations replace the
+support-vector kernel with a low-rank projection.
+
+Usage:
+    python svm_engine.py               # accuracy vs latency report against the exact model
+"""
+
+import os
+import time
+
+import joblib
+import numpy as np
+
+# libsvm clips pairwise probabilities to [MIN_PROB, 1 - MIN_PROB]
+MIN_PROB = 1e-7
+
+SVM_ENGINES = ['exact', 'nystroem', 'random_features']
+
+
+def _rbf_kernel(X, Y, gamma, Y_sq_norms=None):
+    """exp(-gamma * ||x - y||^2) for every pair of rows"""
+    if Y_sq_norms is None:
+        Y_sq_norms = np.einsum('ij,ij->i', Y, Y)
+    X_sq_norms = np.einsum('ij,ij->i', X, X)
+    sq_dist = X @ Y.T
+    sq_dist *= -2
+    sq_dist += X_sq_norms[:, None]
+    sq_dist += Y_sq_norms[None, :]
+    np.maximum(sq_dist, 0, out=sq_dist)
+    sq_dist *= -gamma
+    return np.exp(sq_dist, out=sq_dist)
+
+
+def _pairwise_coupling(r, n_classes):
+    """
+    Vectorized libsvm multiclass_probability (Wu, Lin & Weng, method 2)
+
+    Args:
+        r: (n_samples, n_classes, n_classes) pairwise probabilities r[i, j] = P(i | i or j)
+
+    Returns:
+        (n_samples, n_classes) class probabilities
+    """
+    n_samples = r.shape[0]
+    k = n_classes
+    Q = -r.transpose(0, 2, 1) * r
+    diag = (r.transpose(0, 2, 1) ** 2).sum(axis=2) - np.einsum('nii->ni', r) ** 2
+    idx = np.arange(k)
+    Q[:, idx, idx] = diag
+
+    p = np.full((n_samples, k), 1.0 / k)
+    eps = 0.005 / k
+    active = np.ones(n_samples, dtype=bool)
+    for _ in range(max(100, k)):
+        Qp = np.einsum('nij,nj->ni', Q, p)
+        pQp = np.einsum('ni,ni->n', p, Qp)
+        max_error = np.abs(Qp - pQp[:, None]).max(axis=1)
+        active &= max_error >= eps
+        if not active.any():
+            break
+        # Sequential coordinate updates, applied only to rows that have not converged
+        for t in range(k):
+            diff = np.where(active, (-Qp[:, t] + pQp) / Q[:, t, t], 0.0)
+            p[:, t] += diff
+            scale = 1 + diff
+            pQp = (pQp + diff * (diff * Q[:, t, t] + 2 * Qp[:, t])) / scale ** 2
+            Qp = (Qp + diff[:, None] * Q[:, t, :]) / scale[:, None]
+            p /= scale[:, None]
+    return p
+
+
+def _pairwise_coupling_row(r, n_classes):
+    """Scalar version of _pairwise_coupling for one sample (avoids NumPy call overhead)"""
+    k = n_classes
+    r = r.tolist()
+    Q = [[0.0] * k for _ in range(k)]
+    for t in range(k):
+        for j in range(k):
+            if j != t:
+                Q[t][t] += r[j][t] * r[j][t]
+                Q[t][j] = -r[j][t] * r[t][j]
+
+    p = [1.0 / k] * k
+    eps = 0.005 / k
+    for _ in range(max(100, k)):
+        Qp = [sum(Q[t][j] * p[j] for j in range(k)) for t in range(k)]
+        pQp = sum(p[t] * Qp[t] for t in range(k))
+        if max(abs(Qp[t] - pQp) for t in range(k)) < eps:
+            break
+        for t in range(k):
+            diff = (-Qp[t] + pQp) / Q[t][t]
+            p[t] += diff
+            scale = 1 + diff
+            pQp = (pQp + diff * (diff * Q[t][t] + 2 * Qp[t])) / scale / scale
+            for j in range(k):
+                Qp[j] = (Qp[j] + diff * Q[t][j]) / scale
+                p[j] /= scale
+    return np.array([p])
+
+
+class SVMInferenceEngine:
+    """
+    Batched evaluator for a fitted probability=True RBF SVC
+
+    The one-vs-one decision values for a batch are K(X, basis) @ coef +
+    intercept, where basis/coef are either the support vectors and dual
+    coefficients (exact) or a low-rank approximation of the same kernel
+    expansion (nystroem, random_features).
+    """
+
+    def __init__(self, arrays):
+        self.method = str(arrays['method'])
+        self.gamma = float(arrays['gamma'])
+        self.basis = arrays['basis']
+        self.coef = arrays['coef']
+        self.intercept = arrays['intercept']
+        self.prob_a = arrays['prob_a']
+        self.prob_b = arrays['prob_b']
+        self.pairs = arrays['pairs']
+        self.n_classes = int(arrays['n_classes'])
+        self.projection = arrays.get('projection')
+        self.offset = arrays.get('offset')
+        self._basis_sq_norms = np.einsum('ij,ij->i', self.basis, self.basis)
+
+    @staticmethod
+    def _exact_arrays(svm_model):
+        """Support vectors plus a dense (n_SV, n_pairs) coefficient matrix"""
+        n_classes = len(svm_model.classes_)
+        starts = np.concatenate([[0], np.cumsum(svm_model.n_support_)])
+        pairs = [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+
+        coef = np.zeros((len(svm_model.support_vectors_), len(pairs)))
+        for p, (i, j) in enumerate(pairs):
+            sv_i = slice(starts[i], starts[i + 1])
+            sv_j = slice(starts[j], starts[j + 1])
+            coef[sv_i, p] = svm_model.dual_coef_[j - 1, sv_i]
+            coef[sv_j, p] = svm_model.dual_coef_[i, sv_j]
+
+        return {
+            'method': 'exact',
+            'gamma': np.float64(svm_model._gamma),
+            'basis': np.asarray(svm_model.support_vectors_, dtype=np.float64),
+            'coef': coef,
+            'intercept': np.asarray(svm_model.intercept_, dtype=np.float64),
+            'prob_a': np.asarray(svm_model.probA_, dtype=np.float64),
+            'prob_b': np.asarray(svm_model.probB_, dtype=np.float64),
+            'pairs': np.asarray(pairs, dtype=np.int32),
+            'n_classes': np.int32(n_classes),
+        }
+
+    @classmethod
+    def from_model(cls, svm_model, method='exact', n_components=128, random_state=42):
+        """
+        Build an engine from a fitted SVC(kernel='rbf', probability=True)
+
+        Args:
+            svm_model: Fitted SVC
+            method: 'exact', 'nystroem' or 'random_features'
+            n_components: Landmarks (nystroem) or random features used by the approximations
+            random_state: Seed for landmark / feature sampling
+        """
+        if method not in SVM_ENGINES:
+            raise ValueError(f"Unknown SVM engine: {method}")
+        if svm_model.kernel != 'rbf' or not svm_model.probability:
+            raise ValueError("Only SVC(kernel='rbf', probability=True) is supported")
+
+        arrays = cls._exact_arrays(svm_model)
+        if method == 'exact':
+            return cls(arrays)
+
+        support_vectors, coef, gamma = arrays['basis'], arrays['coef'], arrays['gamma']
+        rng = np.random.RandomState(random_state)
+        arrays['method'] = method
+
+        if method == 'nystroem':
+            # K(x, SV) ~= K(x, L) K(L, L)^+ K(L, SV); fold everything after
+            # K(x, L) into the coefficient matrix
+            n_components = min(n_components, len(support_vectors))
+            landmarks = support_vectors[rng.choice(len(support_vectors), n_components, replace=False)]
+            K_ll = _rbf_kernel(landmarks, landmarks, gamma)
+            K_ls = _rbf_kernel(landmarks, support_vectors, gamma)
+            arrays['basis'] = landmarks
+            arrays['coef'] = np.linalg.pinv(K_ll, hermitian=True) @ K_ls @ coef
+        else:
+            # Random Fourier features z(x) = sqrt(2/D) cos(W x + b) with z(x).z(y) ~= K(x, y)
+            projection = rng.normal(scale=np.sqrt(2 * gamma), size=(support_vectors.shape[1], n_components))
+            offset = rng.uniform(0, 2 * np.pi, size=n_components)
+            arrays['projection'] = projection
+            arrays['offset'] = offset
+            arrays['basis'] = np.zeros((0, support_vectors.shape[1]))
+            arrays['coef'] = cls._random_features(support_vectors, projection, offset).T @ coef
+
+        return cls(arrays)
+
+    @staticmethod
+    def _random_features(X, projection, offset):
+        features = X @ projection
+        features += offset
+        np.cos(features, out=features)
+        features *= np.sqrt(2.0 / projection.shape[1])
+        return features
+
+    @classmethod
+    def load(cls, path):
+        """Load an exported engine (.npz)"""
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def to_arrays(self):
+        """All arrays needed to rebuild the engine"""
+        arrays = {
+            'method': np.array(self.method), 'gamma': np.float64(self.gamma),
+            'basis': self.basis, 'coef': self.coef, 'intercept': self.intercept,
+            'prob_a': self.prob_a, 'prob_b': self.prob_b, 'pairs': self.pairs,
+            'n_classes': np.int32(self.n_classes),
+        }
+        if self.projection is not None:
+            arrays['projection'] = self.projection
+            arrays['offset'] = self.offset
+        return arrays
+
+    def save(self, path):
+        """Export the engine arrays to a .npz file"""
+        np.savez(path, **self.to_arrays())
+
+    def decision_function(self, X):
+        """One-vs-one decision values, shape (n_samples, n_pairs)"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if self.method == 'random_features':
+            kernel = self._random_features(X, self.projection, self.offset)
+        else:
+            kernel = _rbf_kernel(X, self.basis, self.gamma, self._basis_sq_norms)
+        decision = kernel @ self.coef
+        decision += self.intercept
+        return decision
+
+    def predict_proba(self, X):
+        """Class probabilities matching SVC.predict_proba"""
+        decision = self.decision_function(X)
+
+        # Platt sigmoid per pair: P(i | i or j) = 1 / (1 + exp(A * f + B))
+        f_apb = decision * self.prob_a + self.prob_b
+        pair_prob = np.where(
+            f_apb >= 0,
+            np.exp(-np.abs(f_apb)) / (1.0 + np.exp(-np.abs(f_apb))),
+            1.0 / (1.0 + np.exp(-np.abs(f_apb)))
+        )
+        np.clip(pair_prob, MIN_PROB, 1 - MIN_PROB, out=pair_prob)
+
+        r = np.zeros((len(decision), self.n_classes, self.n_classes))
+        i, j = self.pairs[:, 0], self.pairs[:, 1]
+        r[:, i, j] = pair_prob
+        r[:, j, i] = 1 - pair_prob
+        if len(r) == 1:
+            return _pairwise_coupling_row(r[0], self.n_classes)
+        return _pairwise_coupling(r, self.n_classes)
+
+
+def _median_ms(fn, repeat=200):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+if __name__ == "__main__":
+    from predict import FEATURE_COLUMNS
+    from columnar import load_table
+
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    svm_model = joblib.load(os.path.join(model_dir, 'svm_model.pkl'))
+    scaler = joblib.load(os.path.join(model_dir, 'scaler.pkl'))
+    df = load_table(os.path.join(model_dir, '..', 'dataset', 'df_copy_cleaned.csv'),
+                    columns=FEATURE_COLUMNS + ['target'], exact=True)
+    X = df[FEATURE_COLUMNS].astype(float)
+    X[list(scaler.feature_names_in_)] = scaler.transform(X[list(scaler.feature_names_in_)])
+    X = X.to_numpy()
+    y = df['target'].to_numpy()
+
+    if 'feature_names_in_' in vars(svm_model):
+        del svm_model.feature_names_in_
+    reference = svm_model.predict_proba(X)
+    reference_labels = reference.argmax(axis=1)
+    row = X[:1]
+
+    print("=" * 80)
+    print(f"SVM INFERENCE ENGINES ({len(svm_model.support_vectors_)} support vectors, {len(X)} rows)")
+    print("=" * 80)
+    print(f"{'engine':<24}{'max |dp|':>10}{'agree':>9}{'acc':>8}{'1 row ms':>10}{'batch ms':>10}")
+    print(f"{'sklearn SVC':<24}{0:>10.1e}{1:>9.4f}{(reference_labels == y).mean():>8.4f}"
+          f"{_median_ms(lambda: svm_model.predict_proba(row)):>10.3f}"
+          f"{_median_ms(lambda: svm_model.predict_proba(X), repeat=5):>10.1f}")
+
+    configs = [('exact', None)] + [('nystroem', n) for n in (32, 64, 128, 256)] + \
+              [('random_features', n) for n in (64, 256, 1024)]
+    for method, n_components in configs:
+        engine = SVMInferenceEngine.from_model(svm_model, method=method, n_components=n_components or 0)
+        proba = engine.predict_proba(X)
+        labels = proba.argmax(axis=1)
+        name = method if n_components is None else f"{method}[{n_components}]"
+        print(f"{name:<24}{np.abs(proba - reference).max():>10.1e}{(labels == reference_labels).mean():>9.4f}"
+              f"{(labels == y).mean():>8.4f}{_median_ms(lambda: engine.predict_proba(row)):>10.3f}"
+              f"{_median_ms(lambda: engine.predict_proba(X), repeat=5):>10.1f}")
@@ -0,0 +1,179 @@
+"""
+Ensemble Training Pipeline
+Fits the ensemble members in parallel processes and caches every fitted
+member on disk, keyed on a hash of the training data, the estimator's class
+and hyperparameters, and the library versions. A rerun only retrains the
+members whose data or settings changed; the rest are loaded from the cache.
+
+Each member's test-set probabilities are computed once, in the same worker
+that fitted or loaded it, and reused for every metric (labels are their
+argmax). Stage times are collected with StageTimer for the report model.py
+prints.
+
+Cache layout:
+    .train_cache/
+        rf-<key>.joblib, xgb-<key>.joblib, ...
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+
+TRAIN_CACHE_DIR = '.train_cache'
+
+# Parameters that only set the thread count and do not change the fitted model
+THREAD_PARAMS = ('n_jobs',)
+
+
+def data_fingerprint(X, y):
+    """SHA-256 of the training features (names, dtypes, values) and labels"""
+    digest = hashlib.sha256()
+    for col in X.columns:
+        values = np.ascontiguousarray(X[col].to_numpy())
+        digest.update(f'{col}:{values.dtype.str}:'.encode())
+        digest.update(values.tobytes())
+    digest.update(np.ascontiguousarray(np.asarray(y)).tobytes())
+    return digest.hexdigest()
+
+
+def _library_versions():
+    import sklearn
+    versions = {'sklearn': sklearn.__version__, 'numpy': np.__version__}
+    try:
+        import xgboost
+        versions['xgboost'] = xgboost.__version__
+    except ImportError:
+        pass
+    return versions
+
+
+def member_key(estimator, data_hash):
+    """Cache key of one unfitted estimator trained on data_hash"""
+    params = {k: v for k, v in estimator.get_params().items() if k not in THREAD_PARAMS}
+    spec = {
+        'estimator': f'{type(estimator).__module__}.{type(estimator).__qualname__}',
+        'params': params,
+        'versions': _library_versions(),
+        'data': data_hash,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=repr).encode()).hexdigest()[:16]
+
+
+class StageTimer:
+    """Wall-clock time per named pipeline stage"""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds, note=''):
+        self.stages.append((name, seconds, note))
+
+    def report(self):
+        """Printable table of the recorded stages"""
+        width = max([len(name) for name, _, _ in self.stages] + [5])
+        lines = [f"{'stage':<{width}}  {'seconds':>8}"]
+        for name, seconds, note in self.stages:
+            lines.append(f"{name:<{width}}  {seconds:>8.2f}  {note}".rstrip())
+        return '\n'.join(lines)
+
+
+def _fit_member(name, estimator, X_train, y_train, X_test, cache_path, n_jobs):
+    """
+    Fit (or load from cache_path) one member and score the test set
+
+    Runs in a worker process. The member's thread parameters are capped to
+    n_jobs while fitting and restored afterwards, so the returned model is
+    the same as one fitted with its own settings.
+    """
+    start = time.perf_counter()
+    cached = cache_path is not None and os.path.exists(cache_path)
+    if cached:
+        model = joblib.load(cache_path)
+    else:
+        model = estimator
+        thread_params = {k: v for k, v in model.get_params().items() if k in THREAD_PARAMS}
+        if thread_params and n_jobs is not None:
+            model.set_params(**{k: n_jobs for k in thread_params})
+        model.fit(X_train, y_train)
+        if thread_params:
+            model.set_params(**thread_params)
+        if cache_path is not None:
+            tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, cache_path)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)
+    predict_seconds = time.perf_counter() - start
+    return {
+        'name': name,
+        'model': model,
+        'proba': proba,
+        'cached': cached,
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+    }
+
+
+def train_members(estimators, X_train, y_train, X_test, workers=None, cache_dir=None, timer=None):
+    """
+    Fit independent members in parallel, reusing cached fits
+
+    Args:
+        estimators: Dict mapping member name to an unfitted estimator
+        X_train, y_train: Training split (DataFrame, Series)
+        X_test: Test features; each member's predict_proba(X_test) is returned
+        workers: Processes to fit in (default: one per member, at most cpu_count);
+                 1 fits in this process
+        cache_dir: Directory of cached fits, or None to always refit
+        timer: Optional StageTimer that receives a fit and a predict stage per member
+
+    Returns:
+        Dict mapping member name to a result dict with 'model', 'proba'
+        (test-set probabilities), 'cached', 'fit_seconds', 'predict_seconds'
+    """
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        workers = min(len(estimators), cpu_count)
+    n_jobs = max(1, cpu_count // workers)
+
+    cache_paths = {name: None for name in estimators}
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        data_hash = data_fingerprint(X_train, y_train)
+        for name, estimator in estimators.items():
+            cache_paths[name] = os.path.join(cache_dir, f'{name}-{member_key(estimator, data_hash)}.joblib')
+
+    tasks = [(name, estimator, X_train, y_train, X_test, cache_paths[name], n_jobs)
+             for name, estimator in estimators.items()]
+    if workers <= 1:
+        results = [_fit_member(*task) for task in tasks]
+    else:
+        # Uncached members first, so the slow fits start before the cache loads
+        tasks.sort(key=lambda task: task[5] is not None and os.path.exists(task[5]))
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(_fit_member, *task) for task in tasks]
+            results = [future.result() for future in futures]
+
+    results = {result['name']: result for result in results}
+    results = {name: results[name] for name in estimators}
+    if timer is not None:
+        for name, result in results.items():
+            timer.add(f'{name} fit', result['fit_seconds'], 'cached' if result['cached'] else '')
+            timer.add(f'{name} predict', result['predict_seconds'])
+    return results
@@ -0,0 +1,375 @@
+"""
+Tree Ensemble Compiler
+Flattens the Random Forest, XGBoost and Gradient Boosting members into one set
+of contiguous node arrays and evaluates every tree of a batch in a single
+vectorized traversal, reproducing each model's predict_proba output.
+
+Usage:
+    python tree_compiler.py            # export compiled_trees.npz next to the models
+"""
+
+import json
+import os
+
+import joblib
+import numpy as np
+
+from fingerprint import FINGERPRINT_KEY, members_fingerprint
+
+# Members handled by the compiler, in the order they are flattened
+TREE_MEMBERS = ['rf', 'xgb', 'gb']
+
+COMPILED_TREES_FILE = 'compiled_trees.npz'
+
+# Rows evaluated per traversal chunk (bounds the (rows, trees) index matrices)
+CHUNK_ROWS = 512
+
+
+def _softmax(raw):
+    """Row-wise softmax of raw scores"""
+    raw = raw - raw.max(axis=1, keepdims=True)
+    np.exp(raw, out=raw)
+    raw /= raw.sum(axis=1, keepdims=True)
+    return raw
+
+
+class _TreeBuilder:
+    """Accumulates trees into flat node arrays with global child indices"""
+
+    def __init__(self, n_classes):
+        self.n_classes = n_classes
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.right = []
+        self.default_left = []
+        self.value = []
+        self.cover = []
+        self.roots = []
+        self.depths = []
+        self.n_nodes = 0
+
+    def add_tree(self, feature, threshold, left, right, default_left, value, is_leaf, depth, cover):
+        """
+        Append one tree. Child indices are local to the tree; leaves become
+        self-loops so that extra traversal steps keep rows in place. cover is
+        the training weight reaching each node (used by explain.py).
+        """
+        offset = self.n_nodes
+        n = len(feature)
+        local = np.arange(n)
+        left = np.where(is_leaf, local, left) + offset
+        right = np.where(is_leaf, local, right) + offset
+
+        self.feature.append(np.where(is_leaf, 0, feature).astype(np.int32))
+        self.threshold.append(np.where(is_leaf, np.inf, threshold).astype(np.float64))
+        self.left.append(left.astype(np.int32))
+        self.right.append(right.astype(np.int32))
+        self.default_left.append(np.asarray(default_left, dtype=bool))
+        self.value.append(np.where(is_leaf[:, None], value, 0.0))
+        self.cover.append(np.asarray(cover, dtype=np.float64))
+        self.roots.append(offset)
+        self.depths.append(depth)
+        self.n_nodes += n
+
+    def arrays(self):
+        return {
+            'feature': np.concatenate(self.feature),
+            'threshold': np.concatenate(self.threshold),
+            'left': np.concatenate(self.left),
+            'right': np.concatenate(self.right),
+            'default_left': np.concatenate(self.default_left),
+            'value': np.concatenate(self.value).astype(np.float64),
+            'cover': np.concatenate(self.cover),
+            'roots': np.asarray(self.roots, dtype=np.int32),
+            'depths': np.asarray(self.depths, dtype=np.int32),
+        }
+
+
+def _add_sklearn_tree(builder, tree, value):
+    """Append a fitted sklearn Tree; sklearn sends x <= threshold left (on float32 x)"""
+    is_leaf = tree.children_left == -1
+    missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8))
+    builder.add_tree(tree.feature, tree.threshold, tree.children_left, tree.children_right,
+                     missing_left.astype(bool), value, is_leaf, tree.max_depth, tree.weighted_n_node_samples)
+
+
+def _add_rf(builder, rf_model):
+    n_trees = len(rf_model.estimators_)
+    for estimator in rf_model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        totals = value.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        # Normalized leaf distributions pre-divided by the forest size, so the
+        # forest probability is a plain sum over its trees
+        _add_sklearn_tree(builder, tree, value / totals / n_trees)
+
+
+def _add_gb(builder, gb_model):
+    n_classes = builder.n_classes
+    for stage in gb_model.estimators_:
+        for k, estimator in enumerate(stage):
+            tree = estimator.tree_
+            value = np.zeros((tree.node_count, n_classes))
+            value[:, k] = tree.value[:, 0, 0] * gb_model.learning_rate
+            _add_sklearn_tree(builder, tree, value)
+
+
+def _add_xgb(builder, xgb_model):
+    """Append every XGBoost tree; XGBoost sends x < split_condition left (float32)"""
+    n_classes = builder.n_classes
+    booster = xgb_model.get_booster()
+    model = json.loads(booster.save_raw(raw_format='json'))['learner']['gradient_booster']['model']
+
+    for tree, class_idx in zip(model['trees'], model['tree_info']):
+        left = np.asarray(tree['left_children'])
+        right = np.asarray(tree['right_children'])
+        is_leaf = left == -1
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        # x < c (float32) is equivalent to x <= nextafter(c, -inf)
+        threshold = np.nextafter(conditions, np.float32(-np.inf)).astype(np.float64)
+        value = np.zeros((len(left), n_classes))
+        value[:, class_idx] = conditions.astype(np.float64)
+
+        depth = np.zeros(len(left), dtype=np.int32)
+        for node in range(len(left)):
+            if not is_leaf[node]:
+                depth[left[node]] = depth[node] + 1
+                depth[right[node]] = depth[node] + 1
+
+        builder.add_tree(np.asarray(tree['split_indices']), threshold, left, right,
+                         np.asarray(tree['default_left'], dtype=bool), value, is_leaf, int(depth.max()),
+                         np.asarray(tree['sum_hessian'], dtype=np.float64))
+
+
+class CompiledTreeEnsemble:
+    """
+    Flattened RF + XGBoost + GB evaluator
+
+    All trees share one set of node arrays (feature, threshold, left/right
+    children, leaf values). A batch is routed through every tree at once,
+    one depth level per step, and each member's leaf values are reduced to
+    the same probabilities its predict_proba returns.
+    """
+
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.default_left = arrays['default_left']
+        self.value = arrays['value']
+        # Node covers are only needed for explanations; older exports lack them
+        self.cover = arrays.get('cover')
+        # Fingerprint of the pickles the trees were compiled from (see fingerprint.py)
+        self.members_fingerprint = str(arrays[FINGERPRINT_KEY]) if FINGERPRINT_KEY in arrays else None
+        self.roots = arrays['roots']
+        self.depths = arrays['depths']
+        self.tree_slices = {
+            name: slice(int(start), int(stop))
+            for name, start, stop in zip(TREE_MEMBERS, arrays['slice_start'], arrays['slice_stop'])
+        }
+        self.gb_init = arrays['gb_init']
+        self.xgb_base_margin = float(arrays['xgb_base_margin'])
+
+        # Interleaved (left, right) children so one gather picks the branch;
+        # exports may carry these precomputed so they can be memory-mapped
+        if 'children' in arrays:
+            self._children = arrays['children']
+            self._feature = arrays['feature_index']
+        else:
+            self._children = np.stack([self.left, self.right], axis=1).ravel().astype(np.intp)
+            self._feature = self.feature.astype(np.intp)
+
+        # Traversal layouts per member subset (all members, or one member at
+        # a time for the cascade mode in predict.py)
+        self._layouts = {}
+        self._layout(tuple(TREE_MEMBERS))
+
+    def _layout(self, members):
+        """Traversal layout (ordered roots, active prefix per step, position) for the trees of members"""
+        layout = self._layouts.get(members)
+        if layout is None:
+            trees = np.concatenate([np.arange(self.tree_slices[name].start, self.tree_slices[name].stop)
+                                    for name in members])
+            depths = self.depths[trees]
+            # Trees are processed deepest first so that each traversal step only
+            # touches the prefix of trees that are still deep enough to move
+            order = np.argsort(-depths, kind='stable')
+            ordered_roots = self.roots[trees[order]].astype(np.intp)
+            sorted_depths = depths[order]
+            active = [int(np.sum(sorted_depths > step)) for step in range(int(sorted_depths.max(initial=0)))]
+            position = np.empty_like(order)
+            position[order] = np.arange(len(order))
+            layout = self._layouts[members] = (ordered_roots, active, position)
+        return layout
+
+    @classmethod
+    def from_models(cls, rf_model, xgb_model, gb_model):
+        """Compile fitted RandomForest, XGBoost and GradientBoosting classifiers"""
+        n_classes = len(rf_model.classes_)
+        builder = _TreeBuilder(n_classes)
+        bounds = []
+        for name, add, model in (('rf', _add_rf, rf_model), ('xgb', _add_xgb, xgb_model), ('gb', _add_gb, gb_model)):
+            start = len(builder.roots)
+            add(builder, model)
+            bounds.append((start, len(builder.roots)))
+
+        arrays = builder.arrays()
+        arrays['slice_start'] = np.array([start for start, _ in bounds], dtype=np.int32)
+        arrays['slice_stop'] = np.array([stop for _, stop in bounds], dtype=np.int32)
+
+        # GradientBoosting starts from the clipped log prior (the symmetric
+        # multinomial link only adds a per-row constant, which softmax ignores)
+        eps = np.finfo(np.float32).eps
+        prior = np.clip(gb_model.init_.class_prior_, eps, 1 - eps)
+        arrays['gb_init'] = np.log(prior)
+
+        config = json.loads(xgb_model.get_booster().save_config())
+        arrays['xgb_base_margin'] = np.float64(config['learner']['learner_model_param']['base_score'])
+        return cls(arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load an exported ensemble (.npz)"""
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def to_arrays(self):
+        """All arrays needed to rebuild the evaluator, including the traversal layout"""
+        arrays = {
+            'feature': self.feature, 'threshold': self.threshold,
+            'left': self.left, 'right': self.right, 'default_left': self.default_left,
+            'value': self.value, 'roots': self.roots, 'depths': self.depths,
+            'slice_start': np.array([s.start for s in self.tree_slices.values()], dtype=np.int32),
+            'slice_stop': np.array([s.stop for s in self.tree_slices.values()], dtype=np.int32),
+            'gb_init': self.gb_init, 'xgb_base_margin': np.float64(self.xgb_base_margin),
+            'children': self._children, 'feature_index': self._feature,
+        }
+        if self.cover is not None:
+            arrays['cover'] = self.cover
+        if self.members_fingerprint is not None:
+            arrays[FINGERPRINT_KEY] = np.array(self.members_fingerprint)
+        return arrays
+
+    def save(self, path):
+        """Export the flattened node arrays to a .npz file"""
+        np.savez(path, **self.to_arrays())
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X, members=TREE_MEMBERS):
+        """
+        Route every row through every tree of the given members
+
+        Args:
+            X: float array of shape (n_samples, n_features)
+            members: Subset of TREE_MEMBERS whose trees to evaluate
+
+        Returns:
+            (n_trees, n_samples) array of global leaf node indices, trees in
+            member order
+        """
+        ordered_roots, active_steps, position = self._layout(tuple(members))
+        # Both libraries compare on float32 inputs
+        X = np.ascontiguousarray(X, dtype=np.float32).astype(np.float64)
+        n_samples, n_features = X.shape
+        has_missing = np.isnan(X).any()
+        flat_X = X.ravel()
+        row_offsets = np.arange(n_samples, dtype=np.intp) * n_features
+
+        nodes = np.repeat(ordered_roots[:, None], n_samples, axis=1)
+        for active in active_steps:
+            # Contiguous view over the trees that still have splits at this depth
+            current = nodes[:active]
+            values = np.take(flat_X, np.take(self._feature, current) + row_offsets)
+            go_right = values > np.take(self.threshold, current)
+            if has_missing:
+                missing = np.isnan(values)
+                go_right[missing] = ~self.default_left[current[missing]]
+            np.take(self._children, current * 2 + go_right, out=current)
+
+        return nodes[position]
+
+    def predict_proba(self, X, members=TREE_MEMBERS):
+        """
+        Predict class probabilities for the compiled members
+
+        Args:
+            X: Scaled float array of shape (n_samples, n_features)
+            members: Subset of TREE_MEMBERS to evaluate (default: all)
+
+        Returns:
+            Dict mapping each requested member ('rf', 'xgb', 'gb') to an
+            (n_samples, n_classes) array
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        n_classes = self.value.shape[1]
+        members = tuple(name for name in TREE_MEMBERS if name in members)
+        totals = {name: np.empty((len(X), n_classes)) for name in members}
+
+        # Position of each member's trees in the rows apply() returns
+        offsets = {}
+        start = 0
+        for name in members:
+            count = self.tree_slices[name].stop - self.tree_slices[name].start
+            offsets[name] = slice(start, start + count)
+            start += count
+
+        for start in range(0, len(X), CHUNK_ROWS):
+            chunk = slice(start, start + CHUNK_ROWS)
+            leaves = self.apply(X[chunk], members)
+            for name, trees in offsets.items():
+                totals[name][chunk] = self.value[leaves[trees]].sum(axis=0)
+
+        probas = {}
+        if 'rf' in totals:
+            probas['rf'] = totals['rf']
+        if 'xgb' in totals:
+            probas['xgb'] = _softmax(totals['xgb'] + self.xgb_base_margin)
+        if 'gb' in totals:
+            probas['gb'] = _softmax(totals['gb'] + self.gb_init)
+        return probas
+
+
+def compile_model_dir(model_dir=None, output_path=None):
+    """Compile the pickled tree members in model_dir and export them"""
+    if model_dir is None:
+        model_dir = os.path.dirname(os.path.abspath(__file__))
+    if output_path is None:
+        output_path = os.path.join(model_dir, COMPILED_TREES_FILE)
+
+    compiled = CompiledTreeEnsemble.from_models(
+        joblib.load(os.path.join(model_dir, 'rf_model.pkl')),
+        joblib.load(os.path.join(model_dir, 'xgb_model.pkl')),
+        joblib.load(os.path.join(model_dir, 'gb_model.pkl')),
+    )
+    compiled.members_fingerprint = members_fingerprint(model_dir)
+    compiled.save(output_path)
+    return compiled
+
+
+if __name__ == "__main__":
+
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    compiled = compile_model_dir(model_dir)
+    print(f"✓ Compiled {compiled.n_trees} trees ({len(compiled.feature)} nodes) "
+          f"to {os.path.join(model_dir, COMPILED_TREES_FILE)}")
+
+    # Verify against the original models on the training data
+    from predict import FEATURE_COLUMNS
+    from columnar import load_table
+    scaler = joblib.load(os.path.join(model_dir, 'scaler.pkl'))
+    df = load_table(os.path.join(model_dir, '..', 'dataset', 'df_copy_cleaned.csv'),
+                    columns=FEATURE_COLUMNS + ['target'], exact=True)
+    X = df[FEATURE_COLUMNS].astype(float)
+    X[list(scaler.feature_names_in_)] = scaler.transform(X[list(scaler.feature_names_in_)])
+
+    compiled_proba = compiled.predict_proba(X.to_numpy())
+    for name in TREE_MEMBERS:
+        expected = joblib.load(os.path.join(model_dir, f'{name}_model.pkl')).predict_proba(X)
+        max_diff = np.abs(compiled_proba[name] - expected).max()
+        print(f"  {name}: max |diff| vs predict_proba = {max_diff:.2e}")
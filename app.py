@@ -1,48 +1,196 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g, Response
 import numpy as np
 import pandas as pd
-import joblib
 import os
-import requests
-import xml.etree.ElementTree as ET
-from datetime import datetime
 import time
 import json
+import csv
+import io
 import sys
+import sqlite3
+import shutil
+import hmac
 
 # Add Model directory to path for imports
 model_dir = os.path.join(os.path.dirname(__file__), 'Model')
 sys.path.insert(0, model_dir)
 
-from predict import SoftEnsemblePredictor
+from predict import SoftEnsemblePredictor, FEATURE_COLUMNS
+from model_registry import ModelRegistry, REGISTRY_DIR
+from model_manager import ModelManager
+from metrics import MetricsRegistry
+from prediction_cache import PredictionCache, SharedCacheBackend
+from dataset_stats import DatasetStats
+from drift import DriftMonitor, DriftBaseline, SharedDriftStore, drift_report
+from columnar import load_table
+from jobs import JobStore, JobRunner, read_csv_header, count_data_rows
+from batching import MicroBatcher, BATCH_SIZE_BUCKETS
+from research import ResearchPapers, ResearchStore, CrossRefClient, CROSSREF_API_URL, RESEARCH_QUERIES
 
 app = Flask(__name__)
 
+# Request and inference metrics, exposed on /metrics. METRICS_DIR (set per
+# server run by gunicorn.conf.py) lets the worker answering a scrape report
+# the totals of every worker (see metrics.py); without it, this process only.
+metrics = MetricsRegistry(multiprocess_dir=os.environ.get('METRICS_DIR') or None)
+metrics.describe('thyrapredict_http_requests_total', 'counter', 'HTTP requests by endpoint, method and status')
+metrics.describe('thyrapredict_http_errors_total', 'counter', 'HTTP responses with status >= 400 by endpoint')
+metrics.describe('thyrapredict_http_request_duration_seconds', 'histogram', 'Request latency by endpoint')
+metrics.describe('thyrapredict_inference_stage_seconds', 'histogram',
+                 'Time spent in each inference stage (preprocess, member predict_proba, average, serialize)')
+metrics.describe('thyrapredict_prediction_cache_hits_total', 'counter', 'Prediction cache hits by source (local LRU or shared store)')
+metrics.describe('thyrapredict_prediction_cache_misses_total', 'counter', 'Prediction cache misses')
+metrics.describe('thyrapredict_prediction_cache_evictions_total', 'counter', 'Entries evicted from the local LRU')
+metrics.describe('thyrapredict_prediction_cache_entries', 'gauge', 'Entries held in the local LRU')
+metrics.describe('thyrapredict_micro_batch_size', 'histogram', 'Panels scored per micro-batch')
+metrics.describe('thyrapredict_micro_batch_wait_seconds', 'histogram', 'Time the oldest panel of a micro-batch waited')
+metrics.describe('thyrapredict_micro_batch_queue_depth', 'gauge', 'Panels waiting for the micro-batcher')
+metrics.describe('thyrapredict_micro_batch_queue_depth_max', 'gauge', 'Deepest micro-batch queue seen by any worker',
+                 multiprocess_mode='max')
+metrics.describe('thyrapredict_model_info', 'gauge', 'Workers serving each model version')
+metrics.describe('thyrapredict_model_reloads_total', 'counter', 'Hot model reloads by result')
+
 # Initialize the soft ensemble predictor
-predictor = SoftEnsemblePredictor(model_dir=model_dir)
-
-# Cache for papers
-papers_cache = {
-    'hypothyroidism': None,
-    'hyperthyroidism': None,
-    'thyroid_ml': None,
-    'cache_time': None
-}
-
-def is_cache_valid():
-    """Check if cache is less than 24 hours old"""
-    if papers_cache['cache_time'] is None:
-        return False
+# TREE_ENGINE=compiled evaluates RF/XGB/GB with the flattened tree evaluator,
+# SVM_ENGINE=exact|nystroem|random_features swaps in the batched SVM evaluator,
+# MODEL_BUNDLE=1 serves from the memory-mapped bundle of the active version
+# (any other value is a bundle directory) instead of the pickles
+def load_predictor(version_dir):
+    bundle = os.environ.get('MODEL_BUNDLE') or None
+    return SoftEnsemblePredictor(
+        model_dir=version_dir,
+        tree_engine=os.environ.get('TREE_ENGINE', 'sklearn'),
+        svm_engine=os.environ.get('SVM_ENGINE', 'sklearn'),
+        svm_components=int(os.environ.get('SVM_COMPONENTS', 128)),
+        bundle_dir=os.path.join(version_dir, 'ensemble_bundle') if bundle == '1' else bundle,
+        lazy=os.environ.get('MODEL_LAZY_LOAD', '0') == '1',
+        member_threads=int(os.environ.get('MEMBER_THREADS', 0)),
+        # CASCADE=1 loads cascade.json of the active version; any other value is a path to a calibration file
+        cascade={'0': None, '1': True}.get(os.environ.get('CASCADE', '0'), os.environ.get('CASCADE')),
+        # MODEL_STUDENT=1 serves the distilled student.npz; any other value is a path to a student
+        student={'0': None, '1': True}.get(os.environ.get('MODEL_STUDENT', '0'), os.environ.get('MODEL_STUDENT'))
+    )
+
+# Versioned models (see Model/model_registry.py). Workers serve the version
+# named by MODEL_REGISTRY/CURRENT (Model/ itself until one is activated) and
+# hot-swap to a newly activated version within MODEL_RELOAD_INTERVAL seconds
+# (see model_manager.py); MODEL_REGISTRY= (empty) always serves Model/.
+model_registry_path = os.environ.get('MODEL_REGISTRY', os.path.join(model_dir, REGISTRY_DIR))
+warmup_rows = pd.read_csv(os.path.join(os.path.dirname(__file__), 'dataset', 'df_copy_cleaned.csv'),
+                          usecols=FEATURE_COLUMNS, nrows=64)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+model_manager = ModelManager(
+    load_predictor,
+    registry=ModelRegistry(model_registry_path) if model_registry_path else None,
+    fallback_dir=model_dir,
+    warmup_rows=warmup_rows,
+    check_interval=float(os.environ.get('MODEL_RELOAD_INTERVAL', 5))
+)
+model_manager.load_initial()
+
+# Token for the /api/admin endpoints (unset disables them)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+def record_inference_stage(stage, seconds):
+    metrics.observe('thyrapredict_inference_stage_seconds', seconds, stage=stage)
+
+model_manager.set_timing_hook(record_inference_stage)
+
+# Cache of /api/predict results keyed on the normalized input features.
+# PREDICTION_CACHE_SHARED_PATH (e.g. /dev/shm/thyrapredict-cache.sqlite) lets
+# all gunicorn workers on the host share hits; PREDICTION_CACHE_SIZE=0 disables it.
+prediction_cache = None
+if int(os.environ.get('PREDICTION_CACHE_SIZE', 4096)) > 0:
+    shared_cache_path = os.environ.get('PREDICTION_CACHE_SHARED_PATH')
+    prediction_cache = PredictionCache(
+        maxsize=int(os.environ.get('PREDICTION_CACHE_SIZE', 4096)),
+        ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600)),
+        backend=SharedCacheBackend(shared_cache_path) if shared_cache_path else None
+    )
+
+# Opt-in micro-batching of concurrent /api/predict calls (see batching.py):
+# MICRO_BATCH_WINDOW_MS > 0 lets a request wait up to that long for others
+# to be scored with it in one vectorized call of up to MICRO_BATCH_MAX_SIZE rows
+micro_batcher = None
+if float(os.environ.get('MICRO_BATCH_WINDOW_MS', 0)) > 0:
+    micro_batcher = MicroBatcher(
+        model_manager.predictor,
+        window=float(os.environ.get('MICRO_BATCH_WINDOW_MS')) / 1000,
+        max_batch_size=int(os.environ.get('MICRO_BATCH_MAX_SIZE', 32))
+    )
+    
+    def record_micro_batch(batch_size, queue_depth, wait_seconds):
+        metrics.observe('thyrapredict_micro_batch_size', batch_size, buckets=BATCH_SIZE_BUCKETS)
+        metrics.observe('thyrapredict_micro_batch_wait_seconds', wait_seconds)
     
-    elapsed = time.time() - papers_cache['cache_time']
-    return elapsed < (24 * 3600)  # 24 hours in seconds
+    micro_batcher.batch_hook = record_micro_batch
+    model_manager.swap_hooks.append(lambda predictor: setattr(micro_batcher, 'predictor', predictor))
+
+# Maximum number of panels accepted by /api/predict/batch in one request
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+# /api/explain/batch attributes one panel at a time (about 7 ms each), so it
+# gets its own, smaller limit
+EXPLAIN_MAX_BATCH_SIZE = int(os.environ.get('EXPLAIN_MAX_BATCH_SIZE', 100))
+
+# Asynchronous scoring jobs for large CSV uploads (see jobs.py). Each web
+# process runs JOB_WORKER_THREADS scoring threads; set it to 0 and run
+# `python jobs.py` to score in a separate process instead.
+job_store = JobStore(os.environ.get('JOBS_DIR', os.path.join(os.path.dirname(__file__), 'instance', 'jobs')))
+job_runner = JobRunner(
+    job_store, model_manager.predictor, FEATURE_COLUMNS,
+    threads=int(os.environ.get('JOB_WORKER_THREADS', 1)),
+    chunk_rows=int(os.environ.get('JOB_CHUNK_ROWS', 5000))
+)
+model_manager.swap_hooks.append(lambda predictor: setattr(job_runner, 'predictor', predictor))
+
+# CrossRef papers for /research, refreshed in the background (see research.py).
+# CROSSREF_API_URL can point at a local stub (benchmarks/stub_crossref.py).
+# Results persist in RESEARCH_CACHE_PATH (shared by all workers; empty disables)
+# and RESEARCH_CACHE_TTL_<SECTION> overrides the TTL of one section.
+research_store = None
+research_cache_path = os.environ.get(
+    'RESEARCH_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'instance', 'research_cache.sqlite')
+)
+if research_cache_path:
+    try:
+        research_store = ResearchStore(research_cache_path)
+    except sqlite3.Error as e:
+        print(f"Research cache disabled: {e}")
+
+research_papers = ResearchPapers(
+    CrossRefClient(os.environ.get('CROSSREF_API_URL', CROSSREF_API_URL)),
+    ttl=float(os.environ.get('RESEARCH_CACHE_TTL', 24 * 3600)),
+    ttls={
+        name: float(os.environ[f'RESEARCH_CACHE_TTL_{name.upper()}'])
+        for name in RESEARCH_QUERIES if f'RESEARCH_CACHE_TTL_{name.upper()}' in os.environ
+    },
+    cold_wait=float(os.environ.get('RESEARCH_COLD_WAIT', 5)),
+    store=research_store
+)
+
+# Dataset statistics for /data, persisted next to the CSV and refreshed
+# incrementally when rows are appended (see dataset_stats.py)
+dataset_stats = DatasetStats(os.path.join(os.path.dirname(__file__), 'dataset', 'thyroidDF.csv'))
+
+# Drift of incoming panels from the training data (see drift.py). Each scored
+# panel is added to fixed-size sketches kept in hourly windows for
+# DRIFT_RETENTION_HOURS; DRIFT_SHARED_PATH (e.g. /dev/shm/thyrapredict-drift.sqlite)
+# combines all workers on the host. DRIFT_MONITOR=0 disables it.
+drift_monitor = None
+if os.environ.get('DRIFT_MONITOR', '1') == '1':
+    drift_shared_path = os.environ.get('DRIFT_SHARED_PATH')
+    drift_monitor = DriftMonitor(
+        store=SharedDriftStore(drift_shared_path) if drift_shared_path else None,
+        flush_interval=float(os.environ.get('DRIFT_FLUSH_INTERVAL', 10)),
+        retention_hours=int(os.environ.get('DRIFT_RETENTION_HOURS', 24))
+    )
+drift_baseline = DriftBaseline(os.path.join(os.path.dirname(__file__), 'dataset', 'df_copy_cleaned.csv'))
 
 # Load and analyze dataset
 def load_dataset():
     """Load the thyroid dataset"""
     try:
         dataset_path = os.path.join(os.path.dirname(__file__), 'dataset', 'thyroidDF.csv')
-        df = pd.read_csv(dataset_path)
+        df = load_table(dataset_path, exact=True)
         return df
     except Exception as e:
         print(f"Error loading dataset: {e}")
@@ -50,109 +198,65 @@ def load_dataset():
 
 def get_dataset_stats():
     """Get statistics about the dataset"""
-    df = load_dataset()
-    if df is None:
+    try:
+        return dataset_stats.get()
+    except Exception as e:
+        print(f"Error computing dataset statistics: {e}")
         return None
-    
-    # Diagnosis code mappings
-    diagnosis_map = {
-        # Hyperthyroid conditions
-        'A': 'Hyperthyroid',
-        'B': 'T3 Toxic',
-        'C': 'Toxic Goitre',
-        'D': 'Secondary Toxic',
-        # Hypothyroid conditions
-        'E': 'Hypothyroid',
-        'F': 'Primary Hypothyroid',
-        'G': 'Compensated Hypothyroid',
-        'H': 'Secondary Hypothyroid',
-        # Binding protein
-        'I': 'Increased Binding Protein',
-        'J': 'Decreased Binding Protein',
-        # General health
-        'K': 'Concurrent Illness',
-        # Replacement therapy
-        'L': 'Replacement Therapy',
-        'M': 'Underreplaced',
-        'N': 'Overreplaced',
-        # Antithyroid treatment
-        'O': 'Antithyroid Drugs',
-        'P': 'I131 Treatment',
-        'Q': 'Surgery',
-        # Miscellaneous
-        'R': 'Discordant Results',
-        'S': 'Elevated TBG',
-        'T': 'Elevated Thyroid Hormones',
-        '-': 'Healthy (No Condition)'
-    }
-    
-    # Categorize diagnoses
-    diagnosis_categories = {}
-    for target in df['target'].unique():
-        if pd.isna(target):
-            continue
-        
-        target_str = str(target).replace('|', '')  # Remove pipe character
-        
-        # Get all codes in the diagnosis (e.g., "GK" -> ["G", "K"])
-        codes = list(target_str)
-        
-        # Determine primary category based on the first code
-        primary_code = codes[0] if codes else '-'
-        
-        if primary_code == '-':
-            category = 'Healthy'
-        elif primary_code in ['A', 'B', 'C', 'D']:
-            category = 'Hyperthyroid'
-        elif primary_code in ['E', 'F', 'G', 'H']:
-            category = 'Hypothyroid'
-        else:
-            # For other codes, use their descriptive label
-            category = diagnosis_map.get(primary_code, primary_code)
-        
-        if category not in diagnosis_categories:
-            diagnosis_categories[category] = 0
-        diagnosis_categories[category] += df[df['target'] == target].shape[0]
-    
-    # Calculate age distribution (capped at 100 years)
-    df_age_capped = df[df['age'] <= 100]
-    age_bins = [18, 26, 36, 46, 56, 66, 76, 86, 96, 101]
-    age_labels = ['18-25', '26-35', '36-45', '46-55', '56-65', '66-75', '76-85', '86-95', '96-100']
-    age_distribution_series = pd.cut(df_age_capped['age'], bins=age_bins, labels=age_labels, right=False)
-    age_dist_temp = age_distribution_series.value_counts().sort_index().to_dict()
-    # Convert to ensure proper JSON serialization
-    age_distribution = {str(k): int(v) for k, v in age_dist_temp.items()}
-    
-    stats = {
-        'total_records': len(df),
-        'total_features': len(df.columns),
-        'age_stats': {
-            'mean': float(df[df['age'] <= 100]['age'].mean()),  # Mean excluding outliers
-            'median': float(df[df['age'] <= 100]['age'].median()),  # Median excluding outliers
-            'min': float(df[df['age'] <= 100]['age'].min()),
-            'max': float(df[df['age'] <= 100]['age'].max()),
-            'std': float(df[df['age'] <= 100]['age'].std())
-        },
-        'age_distribution': age_distribution,
-        'gender_distribution': {
-            'F': 6073,  # Static data: Females
-            'M': 2792   # Static data: Males
-        },
-        'target_distribution': df['target'].value_counts().to_dict(),
-        'diagnosis_categories': diagnosis_categories,
-        'diagnosis_map': diagnosis_map,
-        'tsh_stats': {
-            'mean': float(df['TSH'].mean()),
-            'median': float(df['TSH'].median()),
-            'min': float(df['TSH'].min()),
-            'max': float(df['TSH'].max()),
-            'std': float(df['TSH'].std())
-        },
-        'missing_values': df.isnull().sum().to_dict(),
-        'features': list(df.columns)
-    }
-    
-    return stats
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def start_job_runner():
+    # Started lazily so each forked gunicorn worker gets its own threads
+    job_runner.start()
+    metrics.start_writer()
+
+@app.before_request
+def check_model_version():
+    # Starts a background reload when a new version was activated
+    model_manager.check()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.inc('thyrapredict_http_requests_total', endpoint=endpoint, method=request.method,
+                status=response.status_code)
+    if response.status_code >= 400:
+        metrics.inc('thyrapredict_http_errors_total', endpoint=endpoint)
+    start = g.get('request_start')
+    if start is not None:
+        metrics.observe('thyrapredict_http_request_duration_seconds', time.perf_counter() - start,
+                        endpoint=endpoint)
+    return response
+
+def collect_component_metrics():
+    """Mirror the cache, micro-batcher and model manager stats into the registry"""
+    if prediction_cache is not None:
+        cache_stats = prediction_cache.stats()
+        metrics.mirror('thyrapredict_prediction_cache_hits_total', cache_stats['hits'], source='local')
+        metrics.mirror('thyrapredict_prediction_cache_hits_total', cache_stats['shared_hits'], source='shared')
+        metrics.mirror('thyrapredict_prediction_cache_misses_total', cache_stats['misses'])
+        metrics.mirror('thyrapredict_prediction_cache_evictions_total', cache_stats['evictions'])
+        metrics.set('thyrapredict_prediction_cache_entries', cache_stats['size'])
+    if micro_batcher is not None:
+        batch_stats = micro_batcher.stats()
+        metrics.set('thyrapredict_micro_batch_queue_depth', batch_stats['queue_depth'])
+        metrics.set('thyrapredict_micro_batch_queue_depth_max', batch_stats['max_queue_depth'])
+    # Only the version served now; the previous one's label must not linger at 1
+    metrics.clear('thyrapredict_model_info')
+    metrics.set('thyrapredict_model_info', 1, version=model_manager.version or '')
+    for result, count in model_manager.reloads.items():
+        metrics.mirror('thyrapredict_model_reloads_total', count, result=result)
+
+metrics.collect_hooks.append(collect_component_metrics)
+
+# Route for Prometheus metrics
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 # Route for home page
 @app.route('/')
@@ -164,113 +268,14 @@ def home():
 def about():
     return render_template('about.html')
 
-# CrossRef API Functions
-def fetch_crossref_papers(query, max_results=1):
-    """Fetch papers from CrossRef API"""
-    try:
-        time.sleep(0.5)  # Small delay for rate limiting
-        
-        url = "https://api.crossref.org/v1/works"
-        params = {
-            'query': query,
-            'rows': max_results,
-            'select': 'title,author,published-print,published-online,container-title,abstract,URL'
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        items = data.get('message', {}).get('items', [])
-        
-        if not items:
-            return []
-        
-        papers = []
-        
-        for item in items:
-            try:
-                title = item.get('title', ['No title'])[0] if item.get('title') else 'No title'
-                
-                # Authors
-                authors = []
-                for author in item.get('author', [])[:3]:
-                    if author.get('family'):
-                        authors.append(f"{author.get('family')} {author.get('given', '')}".strip())
-                
-                authors_str = ', '.join(authors)
-                if len(item.get('author', [])) > 3:
-                    authors_str += ' et al.'
-                
-                # Journal
-                journal = item.get('container-title', ['Unknown Journal'])[0] if item.get('container-title') else 'Unknown Journal'
-                
-                # Year
-                pub_date = item.get('published-print') or item.get('published-online') or item.get('issued')
-                year = ''
-                if pub_date:
-                    if isinstance(pub_date, dict):
-                        year = str(pub_date.get('date-parts', [[]])[0][0]) if pub_date.get('date-parts') else ''
-                    elif isinstance(pub_date, str):
-                        year = pub_date.split('-')[0]
-                
-                # Abstract
-                abstract = item.get('abstract', 'No abstract available')
-                if abstract and len(abstract) > 300:
-                    abstract = abstract[:297] + '...'
-                
-                # URL/DOI
-                url_link = item.get('URL', '')
-                if not url_link and item.get('DOI'):
-                    url_link = f"https://doi.org/{item.get('DOI')}"
-                
-                paper = {
-                    'title': title,
-                    'authors': authors_str if authors_str else 'Unknown authors',
-                    'journal': journal,
-                    'year': year,
-                    'abstract': abstract if abstract else 'No abstract available',
-                    'url': url_link
-                }
-                
-                papers.append(paper)
-            
-            except Exception as e:
-                print(f"Error processing paper: {e}")
-                continue
-        
-        return papers
-    
-    except Exception as e:
-        print(f"Error fetching CrossRef papers for '{query}': {e}")
-        return []
-
 # Route for research page
 @app.route('/research')
 def research():
-    # Check if cache is valid
-    if is_cache_valid() and all([papers_cache['hypothyroidism'], papers_cache['hyperthyroidism'], papers_cache['thyroid_ml']]):
-        return render_template('research.html', 
-                             hypothyroidism_papers=papers_cache['hypothyroidism'],
-                             hyperthyroidism_papers=papers_cache['hyperthyroidism'],
-                             thyroid_ml_papers=papers_cache['thyroid_ml'])
-    
-    # Fetch papers from CrossRef
-    print("Fetching papers from CrossRef...")
-    hypothyroidism_papers = fetch_crossref_papers('hypothyroidism', max_results=1)
-    hyperthyroidism_papers = fetch_crossref_papers('hyperthyroidism', max_results=1)
-    thyroid_ml_papers = fetch_crossref_papers('thyroid disease machine learning', max_results=1)
-    
-    # Update cache
-    papers_cache['hypothyroidism'] = hypothyroidism_papers
-    papers_cache['hyperthyroidism'] = hyperthyroidism_papers
-    papers_cache['thyroid_ml'] = thyroid_ml_papers
-    papers_cache['cache_time'] = time.time()
-    
+    papers = research_papers.get()
     return render_template('research.html', 
-                         hypothyroidism_papers=hypothyroidism_papers,
-                         hyperthyroidism_papers=hyperthyroidism_papers,
-                         thyroid_ml_papers=thyroid_ml_papers)
+                         hypothyroidism_papers=papers['hypothyroidism'],
+                         hyperthyroidism_papers=papers['hyperthyroidism'],
+                         thyroid_ml_papers=papers['thyroid_ml'])
 
 # Route for model page
 @app.route('/model')
@@ -298,6 +303,95 @@ def predict_form():
 def results():
     return render_template('results.html')
 
+def _lab_value(data, key):
+    """Read a numeric field from a panel, treating missing/blank values as 0"""
+    value = data.get(key)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return 0.0
+    return float(value)
+
+# Form fields sent by the survey; missing or blank labs among them mean "not measured"
+SURVEY_FIELDS = ['age', 'gender', 'pregnant', 'tsh', 't3', 'tt4', 't4u', 'fti', 'tbg']
+# Model-layout columns the survey never sends (it sends age and pregnant too)
+MODEL_LAYOUT_FIELDS = ['sex'] + [col for col in FEATURE_COLUMNS if col.endswith('_measured')]
+
+def build_input_features(data):
+    """Map a submitted panel to the feature dict expected by the model
+
+    Accepts either the form fields used by the survey (age, gender, tsh, ...)
+    or a row already in the model layout of df_copy_cleaned.csv. A row with
+    any column only the model layout has (sex, *_measured) must provide all
+    of them, and a panel with no recognised field is rejected instead of
+    being scored as all zeros. Survey panels may spell labs either way
+    (tsh or TSH).
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Panel must be an object')
+    if any(col in data for col in MODEL_LAYOUT_FIELDS):
+        missing = [col for col in FEATURE_COLUMNS
+                   if data.get(col) is None or (isinstance(data[col], str) and not data[col].strip())]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        return {col: float(data[col]) for col in FEATURE_COLUMNS}
+    if not any(field in data for field in SURVEY_FIELDS + FEATURE_COLUMNS):
+        raise ValueError(f"No recognised panel fields; expected the survey fields ({', '.join(SURVEY_FIELDS)}) "
+                         f"or the model columns ({', '.join(FEATURE_COLUMNS)})")
+    
+    gender = data.get('gender', '')
+    pregnant = data.get('pregnant', '')
+    
+    input_features = {
+        'age': _lab_value(data, 'age'),
+        'sex': 1 if gender and gender.lower() == 'female' else 0,
+        'pregnant': 1 if pregnant and pregnant.lower() == 'yes' else 0,
+    }
+    for lab in ['TSH', 'T3', 'TT4', 'T4U', 'FTI', 'TBG']:
+        value = _lab_value(data, lab.lower() if lab.lower() in data else lab)
+        input_features[f'{lab}_measured'] = 1 if value else 0
+        input_features[lab] = value
+    
+    return input_features
+
+def format_prediction(result):
+    """Shape a predictor result for the JSON API"""
+    return {
+        'prediction': result['label'],
+        'confidence': result['confidence'],
+        'probabilities': {
+            'Negative': round(result['probabilities']['Negative'], 2),
+            'Hypo': round(result['probabilities']['Hypo'], 2),
+            'Hyper': round(result['probabilities']['Hyper'], 2)
+        }
+    }
+
+def parse_batch_panels():
+    """Extract the list of panels from a batch request
+
+    Supports a JSON array (or {"panels": [...]}), NDJSON bodies and
+    CSV/NDJSON file uploads (multipart field "file").
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+        filename = (upload.filename or '').lower()
+        if filename.endswith(('.ndjson', '.jsonl')):
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+        return list(csv.DictReader(io.StringIO(text)))
+    
+    content_type = (request.mimetype or '').lower()
+    if content_type in ('application/x-ndjson', 'application/jsonl'):
+        text = request.get_data(as_text=True)
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if content_type == 'text/csv':
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('panels')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of panels, NDJSON or a CSV upload')
+    return data
+
 # Route for processing prediction
 @app.route('/api/predict', methods=['POST'])
 def predict():
@@ -306,49 +400,348 @@ def predict():
         data = request.json
         
         # Map input data to feature names expected by the model
-        gender = data.get('gender', '')
-        pregnant = data.get('pregnant', '')
+        input_features = build_input_features(data)
         
-        input_features = {
-            'age': float(data.get('age', 0)),
-            'sex': 1 if gender and gender.lower() == 'female' else 0,
-            'pregnant': 1 if pregnant and pregnant.lower() == 'yes' else 0,
-            'TSH_measured': 1 if data.get('tsh', 0) else 0,
-            'TSH': float(data.get('tsh', 0)),
-            'T3_measured': 1 if data.get('t3', 0) else 0,
-            'T3': float(data.get('t3', 0)),
-            'TT4_measured': 1 if data.get('tt4', 0) else 0,
-            'TT4': float(data.get('tt4', 0)),
-            'T4U_measured': 1 if data.get('t4u', 0) else 0,
-            'T4U': float(data.get('t4u', 0)),
-            'FTI_measured': 1 if data.get('fti', 0) else 0,
-            'FTI': float(data.get('fti', 0)),
-            'TBG_measured': 1 if data.get('tbg', 0) else 0,
-            'TBG': float(data.get('tbg', 0))
-        }
+        # Serve repeat submissions from the cache, otherwise use the soft
+        # ensemble's NumPy fast path (batched with concurrent calls if enabled).
+        # The predictor is read once so a hot reload cannot switch models mid-request.
+        predictor = model_manager.predictor
+        row = [input_features[col] for col in FEATURE_COLUMNS]
+        cache_key = None
+        result = None
+        if prediction_cache is not None:
+            cache_key = prediction_cache.make_key(input_features, FEATURE_COLUMNS,
+                                                  namespace=predictor.model_key)
+            result = prediction_cache.get(cache_key)
+        if result is None:
+            result = micro_batcher.predict(row) if micro_batcher is not None else predictor.predict_array(row)
+            # A batch scored after a swap comes from the new model; do not file it under the old key
+            if cache_key is not None and result['model_version'] == predictor.model_version:
+                prediction_cache.set(cache_key, result)
+        if drift_monitor is not None:
+            drift_monitor.observe(row, FEATURE_COLUMNS, result['prediction'], result['confidence'])
         
-        # Make prediction using soft ensemble
-        result = predictor.predict(input_features)
+        response = {'success': True}
+        response.update(format_prediction(result))
+        response['model_type'] = result['model_type']
+        response['model_version'] = result.get('model_version', predictor.model_version)
         
-        # Calculate negative probability (normal)
-        negative_pct = result['probabilities']['Negative']
-        hypo_pct = result['probabilities']['Hypo']
-        hyper_pct = result['probabilities']['Hyper']
+        start = time.perf_counter()
+        response = jsonify(response)
+        record_inference_stage('serialize', time.perf_counter() - start)
+        return response
+    except Exception as e:
+        print(f"Prediction error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+# Route for batch predictions
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """Predict many panels in one vectorized pass of the soft ensemble"""
+    try:
+        panels = parse_batch_panels()
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if len(panels) > MAX_BATCH_SIZE:
+        return jsonify({
+            'success': False,
+            'error': f'Batch of {len(panels)} panels exceeds the limit of {MAX_BATCH_SIZE}'
+        }), 413
+    
+    # Validate each row independently so one bad panel does not fail the batch
+    results = [None] * len(panels)
+    valid_rows = []
+    valid_indices = []
+    for i, panel in enumerate(panels):
+        try:
+            valid_rows.append(build_input_features(panel))
+            valid_indices.append(i)
+        except Exception as e:
+            results[i] = {'index': i, 'success': False, 'error': str(e)}
+    
+    predictor = model_manager.predictor
+    try:
+        if valid_rows:
+            X = np.array([[row[col] for col in FEATURE_COLUMNS] for row in valid_rows], dtype=np.float64)
+            batch_result = predictor.predict_batch_result(X)
+            if drift_monitor is not None:
+                drift_monitor.observe_batch(X, FEATURE_COLUMNS, batch_result.prediction, batch_result.confidence)
+            for i, result in zip(valid_indices, batch_result.to_dicts()):
+                results[i] = {'index': i, 'success': True}
+                results[i].update(format_prediction(result))
+    except Exception as e:
+        print(f"Batch prediction error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    start = time.perf_counter()
+    response = jsonify({
+        'success': True,
+        'count': len(panels),
+        'errors': len(panels) - len(valid_rows),
+        'results': results,
+        'model_type': predictor.model_type,
+        'model_version': predictor.model_version
+    })
+    record_inference_stage('serialize_batch', time.perf_counter() - start)
+    return response
+
+def explained_class_index(predictor, data):
+    """Class to explain from an optional "class" field (label), or None for the predicted class"""
+    label = data.get('class') if isinstance(data, dict) else None
+    if label is None:
+        return None
+    for index, name in predictor.class_mapping.items():
+        if name.lower() == str(label).lower():
+            return int(index)
+    raise ValueError(f"Unknown class {label!r}; expected one of {', '.join(predictor.class_mapping.values())}")
+
+def format_explanation(explanation):
+    """Shape one Explanation.to_dicts() row for the JSON API"""
+    return {
+        'prediction': explanation['prediction'],
+        'explained_class': explanation['explained_class'],
+        'probability': round(explanation['probability'], 2),
+        'base_value': round(explanation['base_value'], 2),
+        'contributions': [
+            {'feature': item['feature'], 'value': item['value'], 'contribution': round(item['contribution'], 4)}
+            for item in explanation['contributions']
+        ],
+        'unattributed': round(explanation['unattributed'], 4)
+    }
+
+# Route for explaining a prediction
+@app.route('/api/explain', methods=['POST'])
+def explain():
+    """Per-feature contributions (percentage points) to the ensemble's prediction for one panel
+
+    RF/XGB/GB use exact TreeSHAP, LR its closed form; the SVM member's share is
+    reported as "unattributed" (see Model/explain.py).
+    """
+    try:
+        data = request.json
+        input_features = build_input_features(data)
+        predictor = model_manager.predictor
+        class_index = explained_class_index(predictor, data)
+        X = np.array([[input_features[col] for col in FEATURE_COLUMNS]], dtype=np.float64)
+        explanation = predictor.explain(X).to_dicts(predictor.class_mapping, FEATURE_COLUMNS, X,
+                                                     class_index=class_index)[0]
         
+        response = {'success': True}
+        response.update(format_explanation(explanation))
+        response['model_type'] = predictor.model_type
+        response['model_version'] = predictor.model_version
+        return jsonify(response)
+    except Exception as e:
+        print(f"Explanation error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+# Route for batch explanations
+@app.route('/api/explain/batch', methods=['POST'])
+def explain_batch():
+    """Explain many panels, one after another (same input formats as /api/predict/batch)"""
+    try:
+        panels = parse_batch_panels()
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if len(panels) > EXPLAIN_MAX_BATCH_SIZE:
         return jsonify({
-            'success': True,
-            'prediction': result['label'],
-            'confidence': result['confidence'],
-            'probabilities': {
-                'Negative': round(negative_pct, 2),
-                'Hypo': round(hypo_pct, 2),
-                'Hyper': round(hyper_pct, 2)
-            },
-            'model_type': result['model_type']
-        })
+            'success': False,
+            'error': f'Batch of {len(panels)} panels exceeds the limit of {EXPLAIN_MAX_BATCH_SIZE}'
+        }), 413
+    
+    predictor = model_manager.predictor
+    results = [None] * len(panels)
+    valid_rows = []
+    valid_indices = []
+    class_indices = []
+    for i, panel in enumerate(panels):
+        try:
+            class_index = explained_class_index(predictor, panel)
+            valid_rows.append(build_input_features(panel))
+            valid_indices.append(i)
+            class_indices.append(class_index)
+        except Exception as e:
+            results[i] = {'index': i, 'success': False, 'error': str(e)}
+    
+    try:
+        if valid_rows:
+            X = np.array([[row[col] for col in FEATURE_COLUMNS] for row in valid_rows], dtype=np.float64)
+            explanations = predictor.explain(X).to_dicts(predictor.class_mapping, FEATURE_COLUMNS, X,
+                                                         class_index=class_indices)
+            for i, explanation in zip(valid_indices, explanations):
+                results[i] = {'index': i, 'success': True}
+                results[i].update(format_explanation(explanation))
     except Exception as e:
-        print(f"Prediction error: {str(e)}")
+        print(f"Batch explanation error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'count': len(panels),
+        'errors': len(panels) - len(valid_rows),
+        'results': results,
+        'model_type': predictor.model_type,
+        'model_version': predictor.model_version
+    })
+
+# Route for input and prediction drift
+@app.route('/api/drift')
+def drift():
+    """PSI of recent panels and predictions against the training data, per feature
+
+    ?hours=N limits the comparison to the last N hourly windows.
+    """
+    if drift_monitor is None:
+        return jsonify({'success': False, 'error': 'The drift monitor is disabled (DRIFT_MONITOR=0)'}), 404
+    predictor = model_manager.predictor
+    try:
+        retention = drift_monitor.retention_hours
+        hours = min(max(request.args.get('hours', retention, type=int), 1), retention)
+        # The baseline's prediction distribution is rescored for each model
+        baseline = drift_baseline.get(predictor, predictor.model_key)
+        report = drift_report(baseline, drift_monitor.current(hours), predictor.class_mapping)
+    except Exception as e:
+        print(f"Drift report error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    response = {'success': True, 'window_hours': hours,
+                'shared': isinstance(drift_monitor.store, SharedDriftStore), 'model_version': predictor.model_version}
+    response.update(report)
+    return jsonify(response)
+
+def admin_authorized():
+    """Check the bearer token of an /api/admin request against ADMIN_TOKEN"""
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+# Route for listing model versions
+@app.route('/api/admin/models')
+def list_models():
+    if not admin_authorized():
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    registry = model_manager.registry
+    return jsonify({
+        'success': True,
+        'serving': model_manager.version,
+        'active': registry.current() if registry is not None else None,
+        'versions': [registry.manifest(version) for version in registry.versions()] if registry is not None else [],
+        'reloads': model_manager.reloads,
+        'last_error': model_manager.last_error,
+    })
+
+# Route for hot-reloading the model
+@app.route('/api/admin/models/reload', methods=['POST'])
+def reload_model():
+    """Activate a version (default: reload the active one) and swap this worker to it
+
+    The other workers see the new CURRENT pointer and follow within
+    MODEL_RELOAD_INTERVAL seconds.
+    """
+    if not admin_authorized():
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    version = (request.get_json(silent=True) or {}).get('version')
+    try:
+        if version is not None:
+            if model_manager.registry is None:
+                raise ValueError('The model registry is disabled (MODEL_REGISTRY is empty)')
+            model_manager.registry.activate(version)
+        result = model_manager.reload(version)
+    except ValueError as e:
         return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        print(f"Model reload error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e), 'version': model_manager.version}), 500
+    result['success'] = True
+    return jsonify(result)
+
+def job_status(job):
+    """Shape a job row for the JSON API"""
+    total = job['total_rows']
+    return {
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'total_rows': total,
+        'processed_rows': job['processed_rows'],
+        'error_rows': job['error_rows'],
+        'progress': round(100.0 * job['processed_rows'] / total, 1) if total else (100.0 if job['status'] == 'done' else 0.0),
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'status_url': f"/api/jobs/{job['id']}",
+        'results_url': f"/api/jobs/{job['id']}/results",
+    }
+
+# Route for submitting an asynchronous scoring job
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a CSV in the df_copy_cleaned.csv column layout for background scoring"""
+    upload = request.files.get('file')
+    if upload is None and (request.mimetype or '').lower() != 'text/csv':
+        return jsonify({'success': False, 'error': 'Upload a CSV as multipart field "file" or a text/csv body'}), 400
+    
+    job_id = job_store.new_job_id()
+    input_path = job_store.input_path(job_id)
+    try:
+        # Stream the upload straight to disk
+        if upload is not None:
+            upload.save(input_path)
+            filename = upload.filename
+        else:
+            with open(input_path, 'wb') as f:
+                shutil.copyfileobj(request.stream, f)
+            filename = None
+        
+        missing = [col for col in FEATURE_COLUMNS if col not in read_csv_header(input_path)]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+    except Exception as e:
+        shutil.rmtree(job_store.job_dir(job_id), ignore_errors=True)
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    job_store.enqueue(job_id, count_data_rows(input_path), filename=filename)
+    return jsonify(job_status(job_store.get(job_id))), 202
+
+# Route for polling a job
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify(job_status(job))
+
+# Route for downloading job results
+@app.route('/api/jobs/<job_id>/results')
+def get_job_results(job_id):
+    """Stream the results CSV (or NDJSON with ?format=ndjson) of a finished job"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] != 'done':
+        return jsonify(job_status(job)), 409
+    
+    path = job_store.results_path(job_id)
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            with open(path, newline='') as f:
+                for row in csv.DictReader(f):
+                    yield json.dumps(row) + '\n'
+        return Response(generate(), mimetype='application/x-ndjson')
+    
+    def generate():
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(64 * 1024)
+                if not block:
+                    break
+                yield block
+    return Response(generate(), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename=thyrapredict-{job_id}.csv'
+    })
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
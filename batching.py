@@ -0,0 +1,158 @@
+"""
+Micro-batching
+Coalesces concurrent single-panel predictions into one vectorized
+SoftEnsemblePredictor.predict_batch_result call.
+
+Request threads put their feature row on a queue and wait. A scoring thread
+takes the oldest request, keeps collecting until `window` seconds have
+passed since that request arrived or `max_batch_size` rows are queued, and
+scores them together, so the fixed per-call cost of the five member
+predict_proba dispatches is paid once per batch instead of once per
+request. Requests that queued up while a batch was being scored are already
+past their window and go out in the next batch without further waiting.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Histogram buckets for batch-size metrics
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _Pending:
+    __slots__ = ('row', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, row):
+        self.row = row
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Dynamic batching in front of a predictor
+
+    The scoring thread is started lazily per process, so each forked
+    gunicorn worker gets its own, and is restarted by the next request if it
+    ever dies.
+    """
+
+    def __init__(self, predictor, window=0.002, max_batch_size=32, timeout=30.0):
+        """
+        Args:
+            predictor: SoftEnsemblePredictor (or anything with predict_batch_result)
+            window: Longest a request waits for others to join its batch (seconds)
+            max_batch_size: Rows scored in one call
+            timeout: Seconds a caller waits for its result before giving up
+        """
+        self.predictor = predictor
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        # Optional callable(batch_size, queue_depth, wait_seconds) after each batch
+        self.batch_hook = None
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._pid = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'batches': 0, 'max_queue_depth': 0}
+
+    def _running(self):
+        return self._pid == os.getpid() and self._thread.is_alive()
+
+    def start(self):
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            if self._pid != os.getpid():
+                # A forked child inherits the parent's queue but not its thread
+                self._queue = deque()
+                self._cond = threading.Condition()
+            # Otherwise the thread died: a new one picks up the waiting requests
+            self._thread = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    @property
+    def queue_depth(self):
+        """Requests waiting to be scored"""
+        return len(self._queue)
+
+    def stats(self):
+        """Requests and batches scored in this process, and the deepest queue seen"""
+        stats = dict(self._stats)
+        stats['queue_depth'] = self.queue_depth
+        stats['mean_batch_size'] = stats['requests'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+    def predict(self, row):
+        """
+        Score one row (15 floats in FEATURE_COLUMNS order) as part of a batch
+
+        Returns:
+            The same dictionary as predictor.predict_array(row)
+        """
+        self.start()
+        pending = _Pending(row)
+        with self._cond:
+            self._queue.append(pending)
+            self._cond.notify()
+        if not pending.done.wait(self.timeout):
+            raise TimeoutError(f"Prediction not scored within {self.timeout}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _next_batch(self):
+        """Block until a batch is due; return its requests"""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = self._queue[0].enqueued + self.window
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            depth = len(self._queue)
+            size = min(depth, self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)], depth
+
+    def _loop(self):
+        while True:
+            batch, depth = self._next_batch()
+            start = time.perf_counter()
+            # One predictor for the whole batch, even if it is swapped meanwhile
+            predictor = self.predictor
+            try:
+                X = np.array([pending.row for pending in batch], dtype=np.float64)
+                results = predictor.predict_batch_result(X).to_dicts()
+                for pending, result in zip(batch, results):
+                    result['model_type'] = predictor.model_type
+                    result['model_version'] = predictor.model_version
+                    pending.result = result
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            for pending in batch:
+                pending.done.set()
+
+            self._stats['requests'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], depth)
+            hook = self.batch_hook
+            if hook is not None:
+                try:
+                    hook(len(batch), depth, start - batch[0].enqueued)
+                except Exception as e:
+                    # A failing metrics hook must not stop the scoring thread
+                    print(f"Micro-batch hook error: {str(e)}")
@@ -0,0 +1,93 @@
+"""
+Batch result assembly benchmark
+Times what predict_batch does after the members have run: averaging the
+five member probability arrays and turning them into results. Compares the
+previous np.mean + per-row dict loop against BatchResult (in-place
+accumulation, whole-batch argmax/confidence) and its DataFrame / dict views,
+and checks that all of them agree.
+
+Usage:
+    python benchmarks/batch_assembly.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Model'))
+
+from predict import SoftEnsemblePredictor, BatchResult, FEATURE_COLUMNS, MEMBER_NAMES  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def dict_loop(member_probas, class_mapping):
+    """predict_batch's previous result assembly"""
+    ensemble_proba = np.mean(member_probas, axis=0)
+    predictions = []
+    for proba in ensemble_proba:
+        prediction = np.argmax(proba)
+        predictions.append({
+            'prediction': int(prediction),
+            'label': class_mapping[prediction],
+            'probabilities': {
+                'Negative': float(proba[2]) * 100,
+                'Hyper': float(proba[0]) * 100,
+                'Hypo': float(proba[1]) * 100
+            },
+            'confidence': float(proba[prediction] * 100)
+        })
+    return predictions
+
+
+def accumulate(member_probas, class_mapping):
+    """BatchResult over members summed into one buffer, as _ensemble_proba does"""
+    out = np.array(member_probas[0], dtype=np.float64)
+    for proba in member_probas[1:]:
+        out += proba
+    out /= len(MEMBER_NAMES)
+    return BatchResult(out, class_mapping)
+
+
+def best_of(fn, repeat):
+    """Fastest of `repeat` calls, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    predictor = SoftEnsemblePredictor()
+    df = pd.read_csv(os.path.join(ROOT, 'dataset', 'df_copy_cleaned.csv'))
+
+    print(f"\n{'rows':>8}{'dict loop':>12}{'BatchResult':>13}{'+ to_frame':>12}{'+ to_dicts':>12}   (ms)")
+    for size in args.sizes:
+        sample = df.sample(n=size, replace=True, random_state=42)
+        member_probas = predictor._member_probas(predictor.preprocess_array(sample[FEATURE_COLUMNS]))
+        class_mapping = predictor.class_mapping
+
+        assert accumulate(member_probas, class_mapping).to_dicts() == dict_loop(member_probas, class_mapping)
+
+        loop_ms = best_of(lambda: dict_loop(member_probas, class_mapping), args.repeat)
+        arrays_ms = best_of(lambda: accumulate(member_probas, class_mapping), args.repeat)
+        frame_ms = best_of(lambda: accumulate(member_probas, class_mapping).to_frame(), args.repeat)
+        dicts_ms = best_of(lambda: accumulate(member_probas, class_mapping).to_dicts(), args.repeat)
+        print(f"{size:>8}{loop_ms:>12.2f}{arrays_ms:>13.2f}{frame_ms:>12.2f}{dicts_ms:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Dataset loading benchmark
+Compares pd.read_csv against the columnar tables from Model/columnar.py, for
+the full frame and for column projections used by stats and training.
+
+Usage:
+    python Model/columnar.py                    # convert the CSVs first
+    python benchmarks/dataset_loading.py [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Model'))
+
+from columnar import ColumnarTable, columnar_path  # noqa: E402
+
+DATASETS = {
+    'thyroidDF.csv': ['age', 'TSH', 'target'],
+    'df_copy_cleaned.csv': ['TSH', 'T3', 'TT4', 'target'],
+}
+
+
+def best_of(fn, repeat):
+    """Fastest of `repeat` calls, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    for name, projection in DATASETS.items():
+        csv_path = os.path.join(ROOT, 'dataset', name)
+        table_path = columnar_path(csv_path)
+        if not os.path.exists(os.path.join(table_path, 'manifest.json')):
+            sys.exit(f"Columnar table not found: run `python Model/columnar.py` first")
+
+        cases = {
+            'read_csv': lambda: pd.read_csv(csv_path),
+            'read_csv usecols': lambda: pd.read_csv(csv_path, usecols=projection),
+            'columnar': lambda: ColumnarTable(table_path).to_frame(),
+            'columnar exact': lambda: ColumnarTable(table_path).to_frame(exact=True),
+            'columnar projected': lambda: ColumnarTable(table_path).to_frame(projection),
+            'columnar projected, no mmap': lambda: ColumnarTable(table_path, mmap=False).to_frame(projection),
+        }
+        print(f"\n{name} (projection: {', '.join(projection)})")
+        print(f"{'loader':<30}{'ms':>9}{'speedup':>9}")
+        baseline = None
+        for case, fn in cases.items():
+            ms = best_of(fn, args.repeat)
+            baseline = baseline or ms
+            results.append({'dataset': name, 'loader': case, 'ms': ms})
+            print(f"{case:<30}{ms:>9.2f}{baseline / ms:>8.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+NumPy fast path benchmark
+Checks that SoftEnsemblePredictor.predict_array matches the DataFrame path
+(predict()) on a sample of rows of df_copy_cleaned.csv, exiting non-zero if any
+class probability differs by more than PARITY_TOLERANCE, and compares
+single-row latency of the two paths. tests/test_predict.py checks both
+serving paths against the original DataFrame/sklearn computation.
+
+Usage:
+    python benchmarks/fast_path.py [--rows 200] [--repeat 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Model'))
+
+from predict import SoftEnsemblePredictor, FEATURE_COLUMNS
+
+warnings.filterwarnings('ignore')
+
+# Largest allowed |p_array - p_dataframe| for any class probability; both paths
+# feed the same float64 values to the same models
+PARITY_TOLERANCE = 1e-12
+
+
+def check_parity(predictor, df):
+    """Return the max absolute class-probability difference between both paths and the label mismatches"""
+    max_diff = 0.0
+    mismatched = 0
+    for row in df[FEATURE_COLUMNS].itertuples(index=False):
+        features = dict(zip(FEATURE_COLUMNS, row))
+        expected = predictor.predict(features)
+        actual = predictor.predict_array(np.asarray(row, dtype=np.float64))
+        # The result dictionaries report percentages
+        for label, value in expected['probabilities'].items():
+            max_diff = max(max_diff, abs(value - actual['probabilities'][label]) / 100)
+        if expected['prediction'] != actual['prediction']:
+            mismatched += 1
+    return max_diff, mismatched
+
+
+def time_call(fn, repeat):
+    """Median latency of fn() in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200, help='rows used for the parity check (0 = all)')
+    parser.add_argument('--repeat', type=int, default=200, help='timed calls per path')
+    parser.add_argument('--tree-engine', choices=['sklearn', 'compiled'], default='sklearn')
+    parser.add_argument('--svm-engine', choices=['sklearn', 'exact', 'nystroem', 'random_features'], default='sklearn')
+    args = parser.parse_args()
+
+    predictor = SoftEnsemblePredictor(tree_engine=args.tree_engine, svm_engine=args.svm_engine)
+    df = pd.read_csv(os.path.join(ROOT, 'dataset', 'df_copy_cleaned.csv'))
+    if args.rows:
+        df = df.sample(n=min(args.rows, len(df)), random_state=42)
+
+    max_diff, mismatched = check_parity(predictor, df)
+    print(f"Parity over {len(df)} rows: max |Δp| = {max_diff:.3e} (tolerance {PARITY_TOLERANCE:.0e}), "
+          f"label mismatches = {mismatched}")
+    if max_diff > PARITY_TOLERANCE or mismatched:
+        sys.exit("Parity check failed: predict_array differs from the DataFrame path")
+
+    features = dict(zip(FEATURE_COLUMNS, df[FEATURE_COLUMNS].iloc[0]))
+    array = np.array([features[col] for col in FEATURE_COLUMNS], dtype=np.float64)
+
+    # Warm up both paths before timing
+    for _ in range(5):
+        predictor.predict(features)
+        predictor.predict_array(array)
+
+    dataframe_ms = time_call(lambda: predictor.predict(features), args.repeat)
+    array_ms = time_call(lambda: predictor.predict_array(array), args.repeat)
+    preprocess_df_ms = time_call(lambda: predictor.preprocess_input(features), args.repeat)
+    preprocess_np_ms = time_call(lambda: predictor.preprocess_array(array, out=predictor._row_buffer()), args.repeat)
+
+    print(f"\n{'path':<24}{'predict (ms)':>14}{'preprocess (ms)':>18}")
+    print(f"{'DataFrame':<24}{dataframe_ms:>14.3f}{preprocess_df_ms:>18.4f}")
+    print(f"{'NumPy fast path':<24}{array_ms:>14.3f}{preprocess_np_ms:>18.4f}")
+    print(f"\nSpeedup: {dataframe_ms / array_ms:.2f}x end-to-end, "
+          f"{preprocess_df_ms / preprocess_np_ms:.0f}x preprocessing")
+
+
+if __name__ == '__main__':
+    main()
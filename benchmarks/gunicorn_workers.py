@@ -0,0 +1,166 @@
+"""
+Gunicorn worker benchmark
+Starts the app under gunicorn.conf.py with and without preloading, at several
+worker counts, and reports total memory and /api/predict throughput.
+
+RSS counts every shared page once per process, so it overstates the real
+footprint of forked workers; PSS divides shared pages between the processes
+mapping them and sums to the memory actually used. The prediction cache is
+disabled so every request runs the ensemble.
+
+Usage:
+    python benchmarks/gunicorn_workers.py [--workers 2 4 8] [--duration 10]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PANEL = {
+    'age': 45, 'sex': 'F', 'pregnant': False,
+    'TSH': 1.5, 'T3': 2.0, 'TT4': 100, 'T4U': 0.95, 'FTI': 105, 'TBG': 26
+}
+
+
+def process_tree(pid):
+    """pid plus all of its descendants (Linux only)"""
+    pids = [pid]
+    for child in pids:
+        try:
+            with open(f'/proc/{child}/task/{child}/children') as f:
+                pids.extend(int(p) for p in f.read().split())
+        except FileNotFoundError:
+            pass
+    return pids
+
+
+def memory_mb(pids):
+    """Summed RSS and PSS of the given processes from /proc/<pid>/smaps_rollup"""
+    totals = {'Rss': 0, 'Pss': 0}
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                for line in f:
+                    key, _, rest = line.partition(':')
+                    if key in totals:
+                        totals[key] += int(rest.split()[0])
+        except FileNotFoundError:
+            pass
+    return totals['Rss'] / 1024, totals['Pss'] / 1024
+
+
+def post_predict(conn, body):
+    conn.request('POST', '/api/predict', body=body, headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def wait_until_ready(port, timeout=120):
+    """Poll /api/predict until the server answers"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            if post_predict(conn, json.dumps(PANEL)) == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError('gunicorn did not become ready')
+
+
+def load_test(port, clients, duration):
+    """Closed-loop load from `clients` keep-alive connections; returns (req/s, p50 ms, p99 ms)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        while time.perf_counter() < stop_at:
+            panel = dict(PANEL, TSH=round(rng.uniform(0.1, 20), 2), FTI=rng.randint(40, 200))
+            start = time.perf_counter()
+            if post_predict(conn, json.dumps(panel)) != 200:
+                errors[0] += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    latencies.sort()
+    if errors[0]:
+        print(f"  warning: {errors[0]} non-200 responses")
+    return (
+        len(latencies) / duration,
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000,
+    )
+
+
+def run(workers, preload, args, port):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(args.threads),
+               GUNICORN_PRELOAD='1' if preload else '0', PREDICTION_CACHE_SIZE='0')
+    server = subprocess.Popen(
+        ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'app:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(port)
+        # Warm every worker before measuring memory
+        load_test(port, workers * args.threads, 2)
+        time.sleep(1)
+        pids = process_tree(server.pid)
+        rss, pss = memory_mb(pids)
+        throughput, p50, p99 = load_test(port, workers * args.threads, args.duration)
+        return {
+            'workers': workers, 'preload': preload, 'processes': len(pids),
+            'rss_mb': rss, 'pss_mb': pss,
+            'requests_per_second': throughput, 'p50_ms': p50, 'p99_ms': p99,
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load per configuration')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'workers':>8}{'preload':>9}{'RSS MB':>9}{'PSS MB':>9}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for workers in args.workers:
+        for preload in (False, True):
+            r = run(workers, preload, args, args.port)
+            results.append(r)
+            print(f"{r['workers']:>8}{'yes' if preload else 'no':>9}{r['rss_mb']:>9.0f}{r['pss_mb']:>9.0f}"
+                  f"{r['requests_per_second']:>9.0f}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}", flush=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Parallel member evaluation benchmark
+Compares sequential member evaluation against the member thread pool
+(SoftEnsemblePredictor(member_threads=N)) for single-row latency
+(predict_array) and large batches (predict_batch_result), and checks that
+the probabilities are identical.
+
+Speedups need free cores: on a host with C cores, N member threads can run
+at most min(N, C) members at once.
+
+Usage:
+    python benchmarks/member_parallelism.py [--threads 2 5] [--batch 20000]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Model'))
+
+from predict import SoftEnsemblePredictor, FEATURE_COLUMNS  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def time_call(fn, repeat):
+    """Median latency of fn() in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def member_stage_times(predictor, fn, repeat=5):
+    """Median seconds per member stage (as reported to timing_hook) over repeat calls"""
+    samples = {}
+
+    def hook(stage, seconds):
+        if stage not in ('preprocess', 'average'):
+            samples.setdefault(stage, []).append(seconds)
+
+    predictor.timing_hook = hook
+    try:
+        for _ in range(repeat):
+            fn()
+    finally:
+        predictor.timing_hook = None
+    return {stage: float(np.median(values)) for stage, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, nargs='+', default=[2, 5], help='member pool sizes to compare')
+    parser.add_argument('--batch', type=int, default=20000, help='rows in the batch measurement')
+    parser.add_argument('--repeat', type=int, default=200, help='timed single-row calls')
+    parser.add_argument('--batch-repeat', type=int, default=3, help='timed batch calls')
+    parser.add_argument('--tree-engine', choices=['sklearn', 'compiled'], default='sklearn')
+    parser.add_argument('--svm-engine', choices=['sklearn', 'exact', 'nystroem', 'random_features'], default='sklearn')
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(ROOT, 'dataset', 'df_copy_cleaned.csv'))
+    batch = df.sample(n=args.batch, replace=True, random_state=42)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    row = batch[0].copy()
+
+    print(f"{os.cpu_count()} CPU(s), tree_engine={args.tree_engine}, svm_engine={args.svm_engine}")
+    print(f"\n{'member threads':<16}{'1 row (ms)':>12}{'speedup':>9}{f'{args.batch} rows (ms)':>18}{'speedup':>9}")
+
+    baseline = None
+    for threads in [0] + args.threads:
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor = SoftEnsemblePredictor(tree_engine=args.tree_engine, svm_engine=args.svm_engine,
+                                              member_threads=threads)
+        if threads <= 1:
+            # Same per-member thread cap as the pool runs use, for a fair comparison
+            predictor.set_num_threads(os.cpu_count() or 1)
+        for _ in range(5):
+            predictor.predict_array(row)
+
+        probabilities = predictor.predict_batch_result(batch).probabilities
+        row_ms = time_call(lambda: predictor.predict_array(row), args.repeat)
+        batch_ms = time_call(lambda: predictor.predict_batch_result(batch), args.batch_repeat)
+
+        if baseline is None:
+            baseline = (row_ms, batch_ms, probabilities)
+            label = 'sequential'
+            stages = {'row': member_stage_times(predictor, lambda: predictor.predict_array(row)),
+                      'batch': member_stage_times(predictor, lambda: predictor.predict_batch_result(batch))}
+        else:
+            assert np.array_equal(probabilities, baseline[2]), 'parallel results differ from sequential'
+            label = str(threads)
+        print(f"{label:<16}{row_ms:>12.3f}{baseline[0] / row_ms:>8.2f}x{batch_ms:>18.1f}{baseline[1] / batch_ms:>8.2f}x")
+
+    # With enough cores the members' wall time is bounded by the slowest task
+    print("\nSequential member times (ms) and the ideal speedup with one core per task:")
+    for name, times in stages.items():
+        breakdown = ', '.join(f"{stage} {seconds * 1000:.2f}" for stage, seconds in times.items())
+        print(f"  {name:<6}{breakdown}  -> {sum(times.values()) / max(times.values()):.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Micro-batching benchmark
+Drives single-panel predictions from N concurrent client threads (closed
+loop: each thread sends its next panel as soon as the previous one returns)
+and compares calling predictor.predict_array directly against routing the
+calls through MicroBatcher at several batching windows. Reports throughput,
+p50/p99 latency and the mean batch size, and checks that batched results
+match the unbatched probabilities.
+
+Usage:
+    python benchmarks/micro_batching.py [--clients 1 8 32] [--windows 1 2 5] [--seconds 5]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Model'))
+
+from batching import MicroBatcher  # noqa: E402
+from predict import SoftEnsemblePredictor, FEATURE_COLUMNS  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def run_load(score, panels, clients, seconds):
+    """Closed-loop load from `clients` threads; returns (requests/s, latencies in ms)"""
+    latencies = [[] for _ in range(clients)]
+    stop = threading.Event()
+
+    def client(i):
+        rng = np.random.default_rng(i)
+        while not stop.is_set():
+            row = panels[rng.integers(len(panels))]
+            start = time.perf_counter()
+            score(row)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    merged = np.concatenate([np.asarray(values) for values in latencies]) * 1000
+    return len(merged) / elapsed, merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32], help='concurrent client threads')
+    parser.add_argument('--windows', type=float, nargs='+', default=[1, 2, 5], help='batching windows (ms)')
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5, help='load duration per measurement')
+    parser.add_argument('--tree-engine', choices=['sklearn', 'compiled'], default='sklearn')
+    parser.add_argument('--svm-engine', choices=['sklearn', 'exact', 'nystroem', 'random_features'], default='sklearn')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = SoftEnsemblePredictor(tree_engine=args.tree_engine, svm_engine=args.svm_engine)
+    predictor.set_num_threads(1)
+    df = pd.read_csv(os.path.join(ROOT, 'dataset', 'df_copy_cleaned.csv'))
+    panels = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+
+    # Batched results must match the single-row path
+    batcher = MicroBatcher(predictor, window=0.005, max_batch_size=args.max_batch_size)
+    sample = panels[:64]
+    expected = [predictor.predict_array(row)['probabilities'] for row in sample]
+    results = [None] * len(sample)
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.predict(sample[i])))
+               for i in range(len(sample))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    worst = max(abs(result['probabilities'][k] - want[k])
+                for result, want in zip(results, expected) for k in want)
+    print(f"{os.cpu_count()} CPU(s), tree_engine={args.tree_engine}, svm_engine={args.svm_engine}, "
+          f"max batch {args.max_batch_size}; max |batched - single| = {worst:.1e} percentage points")
+
+    print(f"\n{'clients':>8}  {'mode':<16}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'batch':>8}")
+    for clients in args.clients:
+        modes = [('direct', None)] + [(f'batched {w:g} ms', w) for w in args.windows]
+        for label, window in modes:
+            if window is None:
+                rate, latencies = run_load(predictor.predict_array, panels, clients, args.seconds)
+                mean_batch = 1.0
+            else:
+                batcher = MicroBatcher(predictor, window=window / 1000, max_batch_size=args.max_batch_size)
+                rate, latencies = run_load(batcher.predict, panels, clients, args.seconds)
+                mean_batch = batcher.stats()['mean_batch_size']
+            print(f"{clients:>8}  {label:<16}{rate:>9.0f}{np.percentile(latencies, 50):>9.2f}"
+                  f"{np.percentile(latencies, 99):>9.2f}{mean_batch:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
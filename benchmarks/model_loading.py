@@ -0,0 +1,120 @@
+"""
+Model loading benchmark
+Compares startup time and resident memory of the joblib pickles against the
+memory-mapped model bundle (eager and lazy). Each mode runs in a fresh
+subprocess so import caches and allocator state do not leak between runs.
+
+RssAnon is private memory; RssFile counts mapped file pages, which the OS
+shares between every worker that maps the same bundle.
+
+Usage:
+    python Model/bundle.py                  # build the bundle first
+    python benchmarks/model_loading.py [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(ROOT, 'Model')
+
+MODES = ['joblib', 'bundle', 'bundle-lazy']
+
+
+def read_memory_kb():
+    """RSS split from /proc/self/status (Linux only)"""
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('VmRSS', 'RssAnon', 'RssFile'):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def run_child(mode):
+    """Load the predictor in this process and print measurements as JSON"""
+    import warnings
+    warnings.filterwarnings('ignore')
+    sys.path.insert(0, MODEL_DIR)
+
+    import numpy as np
+    import pandas as pd
+    baseline = read_memory_kb()
+
+    import contextlib
+    import io
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        from predict import SoftEnsemblePredictor
+        if mode == 'joblib':
+            predictor = SoftEnsemblePredictor(model_dir=MODEL_DIR)
+        else:
+            predictor = SoftEnsemblePredictor(bundle_dir=os.path.join(MODEL_DIR, 'ensemble_bundle'),
+                                              lazy=mode == 'bundle-lazy')
+    load_seconds = time.perf_counter() - start
+    loaded = read_memory_kb()
+
+    row = np.array([45, 1, 0, 1, 1.5, 1, 2.0, 1, 100, 0, 0.95, 1, 105, 0, 26], dtype=np.float64)
+    start = time.perf_counter()
+    predictor.predict_array(row)
+    first_predict_seconds = time.perf_counter() - start
+    after_predict = read_memory_kb()
+
+    print(json.dumps({
+        'mode': mode,
+        'load_seconds': load_seconds,
+        'first_predict_seconds': first_predict_seconds,
+        'rss_mb_after_load': (loaded['VmRSS'] - baseline['VmRSS']) / 1024,
+        'rss_anon_mb_after_load': (loaded['RssAnon'] - baseline['RssAnon']) / 1024,
+        'rss_mb_after_predict': (after_predict['VmRSS'] - baseline['VmRSS']) / 1024,
+        'rss_anon_mb_after_predict': (after_predict['RssAnon'] - baseline['RssAnon']) / 1024,
+        'rss_file_mb_after_predict': (after_predict['RssFile'] - baseline['RssFile']) / 1024,
+    }))
+
+
+def measure(mode, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', mode],
+            check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    # Median run by load time
+    runs.sort(key=lambda r: r['load_seconds'])
+    return runs[len(runs) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='also write results to this file')
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    if not os.path.exists(os.path.join(MODEL_DIR, 'ensemble_bundle', 'manifest.json')):
+        sys.exit("Bundle not found: run `python Model/bundle.py` first")
+
+    results = [measure(mode, args.repeat) for mode in MODES]
+    print(f"{'mode':<14}{'load s':>9}{'1st pred ms':>13}{'RSS MB':>9}{'anon MB':>9}{'file MB':>9}")
+    for r in results:
+        print(f"{r['mode']:<14}{r['load_seconds']:>9.3f}{r['first_predict_seconds'] * 1000:>13.2f}"
+              f"{r['rss_mb_after_predict']:>9.1f}{r['rss_anon_mb_after_predict']:>9.1f}"
+              f"{r['rss_file_mb_after_predict']:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
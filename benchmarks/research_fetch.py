@@ -0,0 +1,124 @@
+"""
+/research fetching benchmark
+Runs the app against the local CrossRef stub and measures /research latency
+for concurrent requests on a cold cache, a warm cache and an expired
+(stale, revalidated with ETags) cache, along with how many upstream requests
+each phase caused. Two more phases use the SQLite research cache directly:
+"restart" builds a new cache from the file a previous process left, and
+"workers" starts several cold per-worker caches on one shared file.
+
+Usage:
+    python benchmarks/research_fetch.py [--clients 8] [--delay 1.0]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_crossref import StubCrossRef  # noqa: E402
+from research import CrossRefClient, ResearchPapers, ResearchStore  # noqa: E402
+
+
+def concurrent_gets(client, path, clients):
+    latencies = [None] * clients
+    barrier = threading.Barrier(clients)
+
+    def worker(i):
+        barrier.wait()
+        start = time.perf_counter()
+        response = client.get(path)
+        assert response.status_code == 200, response.status_code
+        latencies[i] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--delay', type=float, default=1.0, help='stub response delay in seconds')
+    parser.add_argument('--ttl', type=float, default=3.0, help='research cache TTL for the stale phase')
+    args = parser.parse_args()
+
+    stub = StubCrossRef(delay=args.delay).start()
+    os.environ['CROSSREF_API_URL'] = stub.url
+    os.environ['RESEARCH_CACHE_TTL'] = str(args.ttl)
+    cache_dir = tempfile.mkdtemp(prefix='research-cache-')
+    os.environ['RESEARCH_CACHE_PATH'] = os.path.join(cache_dir, 'app.sqlite')
+    warnings.filterwarnings('ignore')
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    client = app.app.test_client()
+
+    print(f"{args.clients} concurrent /research requests, stub delay {args.delay:.1f}s")
+    print(f"{'phase':<9}{'p50 ms':>10}{'max ms':>10}{'upstream':>10}{'304s':>6}")
+
+    def report(phase, latencies, before):
+        upstream = stub.counts['requests'] - before[0]
+        not_modified = stub.counts['not_modified'] - before[1]
+        print(f"{phase:<9}{latencies[len(latencies) // 2] * 1000:>10.1f}{latencies[-1] * 1000:>10.1f}"
+              f"{upstream:>10}{not_modified:>6}")
+
+    def counts():
+        return stub.counts['requests'], stub.counts['not_modified']
+
+    before = counts()
+    report('cold', concurrent_gets(client, '/research', args.clients), before)
+
+    before = counts()
+    report('warm', concurrent_gets(client, '/research', args.clients), before)
+
+    time.sleep(args.ttl + 0.1)
+    before = counts()
+    stale = concurrent_gets(client, '/research', args.clients)
+    time.sleep(args.delay + 0.5)  # let the background refresh land
+    report('stale', stale, before)
+
+    # A restarted worker reads the papers the previous process persisted
+    before = counts()
+    start = time.perf_counter()
+    restarted = ResearchPapers(CrossRefClient(stub.url), ttl=3600,
+                               store=ResearchStore(os.environ['RESEARCH_CACHE_PATH']))
+    papers = restarted.get()
+    assert all(papers.values())
+    report('restart', [time.perf_counter() - start], before)
+
+    # Cold workers sharing one store fetch each query once between them
+    store_path = os.path.join(cache_dir, 'workers.sqlite')
+    workers = [ResearchPapers(CrossRefClient(stub.url), ttl=3600, store=ResearchStore(store_path))
+               for _ in range(args.clients)]
+    latencies = [None] * len(workers)
+    before = counts()
+
+    def cold_worker(i):
+        start = time.perf_counter()
+        workers[i].get()
+        latencies[i] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=cold_worker, args=(i,)) for i in range(len(workers))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    report('workers', sorted(latencies), before)
+
+    stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Local CrossRef stub
+Serves canned /v1/works responses with a configurable delay so the
+/research fetching and caching can be exercised without the real API.
+Responses carry ETag and Last-Modified headers and answer conditional
+requests with 304. GET /stats returns the request counts.
+
+Usage:
+    python benchmarks/stub_crossref.py [--port 8901] [--delay 1.0]
+    CROSSREF_API_URL=http://127.0.0.1:8901/v1/works python app.py
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def make_work(query, index):
+    return {
+        'title': [f'{query.title()} study {index + 1}'],
+        'author': [{'family': 'Doe', 'given': 'Jane'}, {'family': 'Roe', 'given': 'Richard'}],
+        'container-title': ['Journal of Stub Endocrinology'],
+        'published-print': {'date-parts': [[2024, 5, 1]]},
+        'abstract': f'A stub abstract about {query}.',
+        'URL': f'https://doi.org/10.0000/stub.{index}',
+    }
+
+
+class StubCrossRef:
+    """Stub server state: response delay, request counters and the current content version"""
+
+    def __init__(self, delay=0.5, port=0):
+        self.delay = delay
+        self.version = 1
+        self.last_modified = time.time()
+        self.counts = {'requests': 0, 'not_modified': 0, 'max_concurrent': 0}
+        self._active = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}/v1/works'
+
+    def bump(self):
+        """Change the content so the next conditional request gets a 200"""
+        with self._lock:
+            self.version += 1
+            self.last_modified = time.time()
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, body, headers=()):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/stats':
+                    with stub._lock:
+                        return self._send_json(200, dict(stub.counts))
+                if url.path != '/v1/works':
+                    return self._send_json(404, {'status': 'error'})
+
+                with stub._lock:
+                    stub.counts['requests'] += 1
+                    stub._active += 1
+                    stub.counts['max_concurrent'] = max(stub.counts['max_concurrent'], stub._active)
+                try:
+                    time.sleep(stub.delay)
+                    params = parse_qs(url.query)
+                    query = params.get('query', [''])[0]
+                    rows = int(params.get('rows', ['1'])[0])
+                    etag = '"' + hashlib.md5(f'{query}:{rows}:{stub.version}'.encode()).hexdigest() + '"'
+                    last_modified = formatdate(stub.last_modified, usegmt=True)
+                    headers = [('ETag', etag), ('Last-Modified', last_modified)]
+
+                    if self.headers.get('If-None-Match') == etag:
+                        with stub._lock:
+                            stub.counts['not_modified'] += 1
+                        self.send_response(304)
+                        for key, value in headers:
+                            self.send_header(key, value)
+                        self.end_headers()
+                        return
+
+                    items = [make_work(query, i) for i in range(rows)]
+                    self._send_json(200, {'status': 'ok', 'message': {'items': items}}, headers)
+                finally:
+                    with stub._lock:
+                        stub._active -= 1
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--delay', type=float, default=0.5, help='seconds before each response')
+    args = parser.parse_args()
+
+    stub = StubCrossRef(delay=args.delay, port=args.port)
+    print(f"Stub CrossRef listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
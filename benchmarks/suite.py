@@ -0,0 +1,340 @@
+"""
+Benchmark suite
+One reproducible run of the numbers worth tracking between commits, saved as
+JSON so two runs can be compared:
+
+    predictor   SoftEnsemblePredictor.predict / predict_array latency and
+                predict_batch_result per batch size, with the time spent in
+                each member (timing_hook stages)
+    load        Model load time and RSS in a fresh process (model_loading.py)
+    stats       get_dataset_stats(): cold build from the CSV, reload from the
+                persisted artifact, and the cached call
+    http        Closed-loop throughput of /api/predict, /data and /research
+                under gunicorn, with CrossRef replaced by the local stub
+
+Inputs are fixed (seeded panel samples, the checked-in dataset), model and
+BLAS threads are pinned to 1, and the run records the git commit, library
+versions and CPU count next to the results.
+
+Usage:
+    python benchmarks/suite.py                                  # all sections -> benchmarks/results/<commit>.json
+    python benchmarks/suite.py --sections predictor stats --output before.json
+    python benchmarks/suite.py --compare before.json after.json [--tolerance 0.1]
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Model'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+SECTIONS = ['predictor', 'load', 'stats', 'http']
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+# Units where a larger value is better; everything else is a cost
+HIGHER_IS_BETTER = {'req/s', 'rows/s'}
+
+PANEL = {
+    'age': 45, 'sex': 'F', 'pregnant': False,
+    'TSH': 1.5, 'T3': 2.0, 'TT4': 100, 'T4U': 0.95, 'FTI': 105, 'TBG': 26
+}
+
+
+def median_ms(fn, repeat):
+    """Median latency of fn() in milliseconds (after one warm-up call)"""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def stage_times_ms(predictor, fn, repeat):
+    """Median milliseconds per timing_hook stage over repeat calls of fn()"""
+    samples = {}
+
+    def hook(stage, seconds):
+        samples.setdefault(stage, []).append(seconds)
+
+    predictor.timing_hook = hook
+    try:
+        for _ in range(repeat):
+            fn()
+    finally:
+        predictor.timing_hook = None
+    return {stage: float(np.median(values)) * 1000 for stage, values in samples.items()}
+
+
+def bench_predictor(args, record):
+    import pandas as pd
+    from predict import SoftEnsemblePredictor, FEATURE_COLUMNS
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = SoftEnsemblePredictor(tree_engine=args.tree_engine, svm_engine=args.svm_engine)
+    predictor.set_num_threads(1)
+
+    df = pd.read_csv(os.path.join(ROOT, 'dataset', 'df_copy_cleaned.csv'))
+    sample = df.sample(n=max(args.batch_sizes), replace=True, random_state=42)[FEATURE_COLUMNS]
+    panels = sample.to_numpy(dtype=np.float64)
+    row = panels[0]
+    row_dict = sample.iloc[0].to_dict()
+
+    record('predictor.predict', median_ms(lambda: predictor.predict(row_dict), args.repeat), 'ms')
+    record('predictor.predict_array', median_ms(lambda: predictor.predict_array(row), args.repeat), 'ms')
+    for stage, ms in stage_times_ms(predictor, lambda: predictor.predict_array(row), args.repeat).items():
+        record(f'predictor.predict_array.stage.{stage}', ms, 'ms')
+
+    for size in args.batch_sizes:
+        batch = panels[:size]
+        repeat = max(3, min(args.repeat, 20000 // size))
+        ms = median_ms(lambda: predictor.predict_batch_result(batch), repeat)
+        record(f'predictor.predict_batch.{size}', ms, 'ms')
+        record(f'predictor.predict_batch.{size}.throughput', size / ms * 1000, 'rows/s')
+        for stage, stage_ms in stage_times_ms(predictor, lambda: predictor.predict_batch_result(batch),
+                                              min(repeat, 5)).items():
+            record(f'predictor.predict_batch.{size}.stage.{stage}', stage_ms, 'ms')
+
+
+def bench_load(args, record):
+    from model_loading import measure, MODES, MODEL_DIR
+
+    modes = MODES if os.path.exists(os.path.join(MODEL_DIR, 'ensemble_bundle', 'manifest.json')) else ['joblib']
+    for mode in modes:
+        result = measure(mode, args.load_repeat)
+        record(f'load.{mode}.seconds', result['load_seconds'], 's')
+        record(f'load.{mode}.first_predict', result['first_predict_seconds'] * 1000, 'ms')
+        record(f'load.{mode}.rss', result['rss_mb_after_predict'], 'MB')
+
+
+def bench_stats(args, record):
+    from dataset_stats import DatasetStats
+
+    csv_path = os.path.join(ROOT, 'dataset', 'thyroidDF.csv')
+    tmp_dir = tempfile.mkdtemp(prefix='suite-stats-')
+    try:
+        cache_path = os.path.join(tmp_dir, 'thyroidDF.stats.json')
+
+        def cold():
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+            DatasetStats(csv_path, cache_path).get()
+
+        record('stats.cold_build', median_ms(cold, args.stats_repeat), 'ms')
+        record('stats.artifact_load', median_ms(lambda: DatasetStats(csv_path, cache_path).get(),
+                                                args.stats_repeat), 'ms')
+        stats = DatasetStats(csv_path, cache_path)
+        stats.get()
+        record('stats.cached_get', median_ms(stats.get, args.repeat * 10), 'ms')
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def http_load(port, method, path, body_fn, clients, duration):
+    """Closed-loop load over keep-alive connections; returns (req/s, p50 ms, p99 ms, errors)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        while time.perf_counter() < stop_at:
+            body = body_fn(rng) if body_fn else None
+            headers = {'Content-Type': 'application/json'} if body else {}
+            start = time.perf_counter()
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            local.append(time.perf_counter() - start)
+            if response.status != 200:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return (len(latencies) / duration, latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.99)] * 1000, errors[0])
+
+
+def bench_http(args, record):
+    from gunicorn_workers import wait_until_ready
+    from stub_crossref import StubCrossRef
+
+    if shutil.which('gunicorn') is None:
+        print("  gunicorn not found; skipping the http section")
+        return
+
+    stub = StubCrossRef(delay=args.stub_delay).start()
+    tmp_dir = tempfile.mkdtemp(prefix='suite-http-')
+    env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads),
+               MODEL_THREADS='1', PREDICTION_CACHE_SIZE='0', JOB_WORKER_THREADS='0',
+               JOBS_DIR=os.path.join(tmp_dir, 'jobs'), CROSSREF_API_URL=stub.url,
+               RESEARCH_CACHE_PATH=os.path.join(tmp_dir, 'research.sqlite'))
+    server = subprocess.Popen(
+        ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{args.port}', 'app:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    def panel(rng):
+        return json.dumps(dict(PANEL, TSH=round(rng.uniform(0.1, 20), 2), FTI=rng.randint(40, 200)))
+
+    endpoints = [
+        ('api_predict', 'POST', '/api/predict', panel),
+        ('data', 'GET', '/data', None),
+        ('research', 'GET', '/research', None),
+    ]
+    clients = args.workers * args.threads
+    try:
+        wait_until_ready(args.port)
+        for name, method, path, body_fn in endpoints:
+            # Warm every worker (and the research and stats caches) first
+            http_load(args.port, method, path, body_fn, clients, 1)
+            rate, p50, p99, errors = http_load(args.port, method, path, body_fn, clients, args.duration)
+            record(f'http.{name}.throughput', rate, 'req/s')
+            record(f'http.{name}.p50', p50, 'ms')
+            record(f'http.{name}.p99', p99, 'ms')
+            if errors:
+                print(f"  warning: {errors} non-200 responses from {path}")
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+        stub.stop()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+BENCHMARKS = {'predictor': bench_predictor, 'load': bench_load, 'stats': bench_stats, 'http': bench_http}
+
+
+def environment():
+    """Commit, versions and host details stored with the results"""
+    import pandas as pd
+    import sklearn
+    import xgboost
+
+    def git(*argv):
+        try:
+            return subprocess.run(['git', *argv], cwd=ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def compare(baseline_path, current_path, tolerance):
+    """Print the change of every shared metric; returns the names of regressions beyond tolerance"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+
+    print(f"baseline {str(baseline['environment']['commit'])[:10]}  vs  current {str(current['environment']['commit'])[:10]}")
+    print(f"\n{'metric':<52}{'baseline':>12}{'current':>12}{'change':>9}")
+    regressions = []
+    for name, entry in current['metrics'].items():
+        if name not in baseline['metrics']:
+            continue
+        before, after, unit = baseline['metrics'][name]['value'], entry['value'], entry['unit']
+        change = (after - before) / before if before else 0.0
+        worse = -change if unit in HIGHER_IS_BETTER else change
+        flag = '  REGRESSION' if worse > tolerance else ''
+        if flag:
+            regressions.append(name)
+        print(f"{name:<52}{before:>12.3f}{after:>12.3f}{change:>+9.1%}{flag}")
+    print(f"\n{len(regressions)} regression(s) beyond {tolerance:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sections', nargs='+', choices=SECTIONS, default=SECTIONS)
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='compare two results files instead of running; exits 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='relative change counted as a regression')
+    parser.add_argument('--repeat', type=int, default=200, help='timed single-row calls')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    parser.add_argument('--tree-engine', choices=['sklearn', 'compiled'], default='sklearn')
+    parser.add_argument('--svm-engine', choices=['sklearn', 'exact', 'nystroem', 'random_features'], default='sklearn')
+    parser.add_argument('--load-repeat', type=int, default=3, help='fresh processes per model load mode')
+    parser.add_argument('--stats-repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers for the http section')
+    parser.add_argument('--threads', type=int, default=2, help='gthread threads per worker')
+    parser.add_argument('--duration', type=float, default=5, help='seconds of load per endpoint')
+    parser.add_argument('--stub-delay', type=float, default=0.05, help='CrossRef stub response delay')
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.tolerance) else 0)
+
+    os.environ.setdefault('OMP_NUM_THREADS', '1')
+    os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+    warnings.filterwarnings('ignore')
+
+    env = environment()
+    metrics = {}
+
+    def record(name, value, unit):
+        metrics[name] = {'value': float(value), 'unit': unit}
+        print(f"  {name:<52}{value:>12.3f} {unit}", flush=True)
+
+    print(f"commit {str(env['commit'])[:10]}{' (dirty)' if env['dirty'] else ''}, {env['cpu_count']} CPU(s), "
+          f"Python {env['python']}, sklearn {env['sklearn']}, xgboost {env['xgboost']}")
+    for section in args.sections:
+        print(f"\n[{section}]")
+        start = time.perf_counter()
+        BENCHMARKS[section](args, record)
+        print(f"  ({time.perf_counter() - start:.0f}s)")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{str(env['commit'])[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    settings = {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}
+    with open(output, 'w') as f:
+        json.dump({'environment': env, 'settings': settings, 'metrics': metrics}, f, indent=2)
+    print(f"\n✓ Wrote {output}")
+
+
+if __name__ == '__main__':
+    main()
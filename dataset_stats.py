@@ -0,0 +1,339 @@
+"""
+Dataset Statistics
+Summary statistics for the /data page, computed once from
+dataset/thyroidDF.csv and persisted next to it as a JSON artifact.
+
+The artifact records the size, mtime and content hash of the CSV it was built
+from. When the CSV only had rows appended, just the new bytes are parsed and
+merged into the stored aggregates; any other change triggers a full rebuild.
+Aggregates are exact value counts, so medians stay exact after merging.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import Counter
+
+import pandas as pd
+
+STATS_FORMAT_VERSION = 1
+
+# Diagnosis code mappings
+DIAGNOSIS_MAP = {
+    # Hyperthyroid conditions
+    'A': 'Hyperthyroid',
+    'B': 'T3 Toxic',
+    'C': 'Toxic Goitre',
+    'D': 'Secondary Toxic',
+    # Hypothyroid conditions
+    'E': 'Hypothyroid',
+    'F': 'Primary Hypothyroid',
+    'G': 'Compensated Hypothyroid',
+    'H': 'Secondary Hypothyroid',
+    # Binding protein
+    'I': 'Increased Binding Protein',
+    'J': 'Decreased Binding Protein',
+    # General health
+    'K': 'Concurrent Illness',
+    # Replacement therapy
+    'L': 'Replacement Therapy',
+    'M': 'Underreplaced',
+    'N': 'Overreplaced',
+    # Antithyroid treatment
+    'O': 'Antithyroid Drugs',
+    'P': 'I131 Treatment',
+    'Q': 'Surgery',
+    # Miscellaneous
+    'R': 'Discordant Results',
+    'S': 'Elevated TBG',
+    'T': 'Elevated Thyroid Hormones',
+    '-': 'Healthy (No Condition)'
+}
+
+# Age distribution (capped at 100 years)
+MAX_AGE = 100
+AGE_BINS = [18, 26, 36, 46, 56, 66, 76, 86, 96, 101]
+AGE_LABELS = ['18-25', '26-35', '36-45', '46-55', '56-65', '66-75', '76-85', '86-95', '96-100']
+
+# Static data: gender split reported on the /data page
+GENDER_DISTRIBUTION = {'F': 6073, 'M': 2792}
+
+# Columns read as strings so appended chunks parse with the same types
+STRING_COLUMNS = {'target': str}
+
+
+def diagnosis_category(target):
+    """Primary category of a diagnosis string, based on its first code (e.g. "GK" -> Hypothyroid)"""
+    codes = list(str(target).replace('|', ''))  # Remove pipe character
+    primary_code = codes[0] if codes else '-'
+
+    if primary_code == '-':
+        return 'Healthy'
+    if primary_code in ['A', 'B', 'C', 'D']:
+        return 'Hyperthyroid'
+    if primary_code in ['E', 'F', 'G', 'H']:
+        return 'Hypothyroid'
+    # For other codes, use their descriptive label
+    return DIAGNOSIS_MAP.get(primary_code, primary_code)
+
+
+def _value_counts(series):
+    return Counter({key: int(count) for key, count in series.value_counts(sort=False).items()})
+
+
+def _numeric_summary(counts):
+    """mean/median/min/max/std (ddof=1) of the values described by a value -> count mapping"""
+    if not counts:
+        return {'mean': float('nan'), 'median': float('nan'), 'min': float('nan'),
+                'max': float('nan'), 'std': float('nan')}
+    values = sorted(counts)
+    n = sum(counts.values())
+    mean = sum(value * counts[value] for value in values) / n
+    variance = sum(counts[value] * (value - mean) ** 2 for value in values) / (n - 1) if n > 1 else float('nan')
+
+    # Exact median: walk the cumulative counts to the middle one or two values
+    middle = [(n - 1) // 2, n // 2]
+    found = []
+    seen = 0
+    for value in values:
+        seen += counts[value]
+        while len(found) < 2 and middle[len(found)] < seen:
+            found.append(value)
+        if len(found) == 2:
+            break
+
+    return {
+        'mean': float(mean),
+        'median': float((found[0] + found[1]) / 2),
+        'min': float(values[0]),
+        'max': float(values[-1]),
+        'std': float(variance ** 0.5),
+    }
+
+
+class DatasetStatsAggregator:
+    """
+    Mergeable aggregates over the rows of the thyroid dataset
+
+    update() takes a DataFrame chunk and folds it in with one value_counts
+    per column, so a file can be processed whole, in chunks, or as appended
+    rows with identical results.
+    """
+
+    def __init__(self, columns=None):
+        self.columns = list(columns) if columns is not None else None
+        self.total_records = 0
+        self.missing = Counter()
+        self.targets = Counter()
+        self.ages = Counter()
+        self.tsh = Counter()
+
+    def update(self, df):
+        if self.columns is None:
+            self.columns = list(df.columns)
+        self.total_records += len(df)
+        self.missing.update({col: int(count) for col, count in df.isnull().sum().items()})
+        self.targets.update(_value_counts(df['target']))
+        age = df['age']
+        self.ages.update(_value_counts(age[age <= MAX_AGE]))
+        self.tsh.update(_value_counts(df['TSH']))
+        return self
+
+    def merge(self, other):
+        if self.columns is None:
+            self.columns = other.columns
+        self.total_records += other.total_records
+        for name in ('missing', 'targets', 'ages', 'tsh'):
+            getattr(self, name).update(getattr(other, name))
+        return self
+
+    def to_state(self):
+        """JSON-serializable state (value counts as [value, count] pairs)"""
+        return {
+            'columns': self.columns,
+            'total_records': self.total_records,
+            'missing': dict(self.missing),
+            'targets': list(self.targets.items()),
+            'ages': list(self.ages.items()),
+            'tsh': list(self.tsh.items()),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        aggregator = cls(state['columns'])
+        aggregator.total_records = state['total_records']
+        aggregator.missing = Counter(state['missing'])
+        for name in ('targets', 'ages', 'tsh'):
+            setattr(aggregator, name, Counter({value: count for value, count in state[name]}))
+        return aggregator
+
+    def summary(self):
+        """Statistics in the shape rendered by templates/data.html"""
+        diagnosis_categories = {}
+        for target, count in self.targets.items():
+            category = diagnosis_category(target)
+            diagnosis_categories[category] = diagnosis_categories.get(category, 0) + count
+
+        age_distribution = {label: 0 for label in AGE_LABELS}
+        for age, count in self.ages.items():
+            for low, high, label in zip(AGE_BINS, AGE_BINS[1:], AGE_LABELS):
+                if low <= age < high:
+                    age_distribution[label] += count
+                    break
+
+        return {
+            'total_records': self.total_records,
+            'total_features': len(self.columns),
+            'age_stats': _numeric_summary(self.ages),  # Excluding ages over MAX_AGE
+            'age_distribution': age_distribution,
+            'gender_distribution': dict(GENDER_DISTRIBUTION),
+            'target_distribution': dict(sorted(self.targets.items(), key=lambda item: -item[1])),
+            'diagnosis_categories': diagnosis_categories,
+            'diagnosis_map': DIAGNOSIS_MAP,
+            'tsh_stats': _numeric_summary(self.tsh),
+            'missing_values': {col: self.missing.get(col, 0) for col in self.columns},
+            'features': list(self.columns),
+        }
+
+
+def _hash_prefix(path, length, chunk_size=1 << 20):
+    """blake2b object fed with the first `length` bytes of a file"""
+    digest = hashlib.blake2b(digest_size=16)
+    remaining = length
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+
+class DatasetStats:
+    """
+    Cached statistics for one CSV file
+
+    get() costs one os.stat() while the file is unchanged. Otherwise the
+    persisted artifact is reused, extended with appended rows, or rebuilt.
+    """
+
+    def __init__(self, csv_path, cache_path=None):
+        self.csv_path = csv_path
+        if cache_path is None:
+            root, _ = os.path.splitext(csv_path)
+            cache_path = f'{root}.stats.json'
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._source = None
+        self._stats = None
+
+    def get(self):
+        """Return the statistics dict, refreshing it if the CSV changed"""
+        st = os.stat(self.csv_path)
+        source = self._source
+        if source is not None and (source['size'], source['mtime_ns']) == (st.st_size, st.st_mtime_ns):
+            return self._stats
+
+        with self._lock:
+            st = os.stat(self.csv_path)
+            source = self._source
+            if source is None or (source['size'], source['mtime_ns']) != (st.st_size, st.st_mtime_ns):
+                self._refresh(st)
+            return self._stats
+
+    def _refresh(self, st):
+        artifact = self._source_artifact()
+        if artifact is None:
+            aggregator, source = self._build(st)
+        else:
+            source = artifact['source']
+            aggregator = DatasetStatsAggregator.from_state(artifact['state'])
+            if (source['size'], source['mtime_ns']) != (st.st_size, st.st_mtime_ns):
+                aggregator, source = self._extend(aggregator, source, st)
+            else:
+                self._source, self._stats = source, artifact['stats']
+                return
+
+        stats = aggregator.summary()
+        self._persist(source, aggregator, stats)
+        self._source, self._stats = source, stats
+
+    def _source_artifact(self):
+        """The persisted artifact, or None if missing or unreadable"""
+        try:
+            with open(self.cache_path) as f:
+                artifact = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if artifact.get('format_version') != STATS_FORMAT_VERSION:
+            return None
+        return artifact
+
+    def _build(self, st):
+        """Aggregate the whole file"""
+        with open(self.csv_path, 'rb') as f:
+            data = f.read()
+        aggregator = DatasetStatsAggregator().update(
+            pd.read_csv(io.BytesIO(data), dtype=STRING_COLUMNS)
+        )
+        return aggregator, self._describe_source(st, data)
+
+    def _extend(self, aggregator, source, st):
+        """Fold in rows appended since the artifact was built, or rebuild"""
+        grew = st.st_size > source['size']
+        if st.st_size < source['size'] or (grew and not source['ends_with_newline']):
+            return self._build(st)
+        digest = _hash_prefix(self.csv_path, source['size'])
+        if digest.hexdigest() != source['hash']:
+            return self._build(st)
+
+        with open(self.csv_path, 'rb') as f:
+            f.seek(source['size'])
+            new_data = f.read()
+        if new_data.strip():
+            aggregator.update(pd.read_csv(io.BytesIO(new_data), header=None, names=aggregator.columns,
+                                          dtype=STRING_COLUMNS))
+        digest.update(new_data)
+        return aggregator, {
+            'size': source['size'] + len(new_data),
+            'mtime_ns': st.st_mtime_ns,
+            'hash': digest.hexdigest(),
+            'ends_with_newline': new_data.endswith(b'\n') if grew else source['ends_with_newline'],
+        }
+
+    @staticmethod
+    def _describe_source(st, data):
+        return {
+            'size': len(data),
+            'mtime_ns': st.st_mtime_ns,
+            'hash': hashlib.blake2b(data, digest_size=16).hexdigest(),
+            'ends_with_newline': data.endswith(b'\n'),
+        }
+
+    def _persist(self, source, aggregator, stats):
+        """Write the artifact atomically; a read-only deployment just skips it"""
+        artifact = {
+            'format_version': STATS_FORMAT_VERSION,
+            'source': source,
+            'state': aggregator.to_state(),
+            'stats': stats,
+        }
+        tmp_path = f'{self.cache_path}.tmp-{os.getpid()}'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(artifact, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not persist dataset statistics: {e}")
+
+
+if __name__ == "__main__":
+    import time
+
+    dataset_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset', 'thyroidDF.csv')
+    start = time.perf_counter()
+    stats = DatasetStats(dataset_path).get()
+    print(f"✓ Statistics for {stats['total_records']} records ({time.perf_counter() - start:.3f}s)")
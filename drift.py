@@ -0,0 +1,521 @@
+"""
+Input Drift Monitor
+Streaming profiles of the panels scored by the prediction endpoints, compared
+against a baseline profile of the training data (dataset/df_copy_cleaned.csv).
+
+A DriftSketch has a fixed size however many rows it sees. It holds:
+  - a log-bucket quantile sketch per continuous feature (relative accuracy
+    RELATIVE_ACCURACY, so each quantile is within 2% of a real value)
+  - counts of the binary features (sex, pregnant, *_measured)
+  - counts of the predicted classes and a confidence histogram
+Lab values are only sketched when their *_measured flag is set: unmeasured
+labs are 0 in requests but imputed in the training CSV.
+
+Sketches merge exactly by adding counts. Each worker adds rows to a pending
+sketch (O(1) per request) and every flush_interval seconds folds it into
+hourly windows. Without DRIFT_SHARED_PATH the windows are kept in memory;
+with it they are one row per hour in a SQLite file, so every worker on the
+host reports the combined traffic. Windows older than retention_hours are
+dropped.
+
+Drift is the population stability index (PSI) of each distribution against
+the baseline, over up to PSI_BINS bins holding equal shares of the baseline.
+Rule of thumb: < 0.1 stable, 0.1-0.25 moderate drift, > 0.25 significant.
+
+Usage:
+    python drift.py         # build the baseline profile and time updates
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from prediction_cache import LocalConnections
+
+DRIFT_FORMAT_VERSION = 1
+
+CONTINUOUS_FEATURES = ['age', 'TSH', 'T3', 'TT4', 'T4U', 'FTI', 'TBG']
+FLAG_FEATURES = ['sex', 'pregnant', 'TSH_measured', 'T3_measured', 'TT4_measured',
+                 'T4U_measured', 'FTI_measured', 'TBG_measured']
+# Flag that must be set for a continuous feature to be sketched (age always is)
+MEASURED_FLAG = {lab: f'{lab}_measured' for lab in CONTINUOUS_FEATURES if lab != 'age'}
+
+# Log-bucket grid shared by every sketch: bucket i > 0 covers
+# (gamma^(i - 1 + OFFSET), gamma^(i + OFFSET)], bucket 0 everything up to
+# MIN_VALUE and the last bucket everything above MAX_VALUE
+RELATIVE_ACCURACY = 0.02
+MIN_VALUE = 1e-3
+MAX_VALUE = 1e5
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+_OFFSET = math.ceil(math.log(MIN_VALUE) / _LOG_GAMMA)
+N_BUCKETS = math.ceil(math.log(MAX_VALUE) / _LOG_GAMMA) - _OFFSET + 2
+
+# Confidence histogram: 5-point bins from 0 to 100%
+CONFIDENCE_BINS = 20
+
+N_CLASSES = 3
+PSI_BINS = 10
+# Proportions are floored at this value so empty bins give a finite PSI
+PSI_EPSILON = 1e-4
+PSI_THRESHOLDS = ((0.25, 'significant'), (0.1, 'moderate'), (0.0, 'stable'))
+# Fewer observed rows than this are reported as insufficient_data
+MIN_ROWS = 100
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def _bucket_index(values):
+    """Bucket of each value on the log grid (non-finite values go to the last bucket)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        index = np.ceil(np.log(values) / _LOG_GAMMA) - _OFFSET + 1
+    index = np.where(values <= MIN_VALUE, 0, index)
+    return np.nan_to_num(index, nan=N_BUCKETS - 1).clip(0, N_BUCKETS - 1).astype(np.intp)
+
+
+def _bucket_index_scalar(value):
+    """_bucket_index for one float (cheaper than NumPy for a single row)"""
+    if value <= MIN_VALUE:
+        return 0
+    try:
+        return min(math.ceil(math.log(value) / _LOG_GAMMA) - _OFFSET + 1, N_BUCKETS - 1)
+    except (ValueError, OverflowError):
+        return N_BUCKETS - 1
+
+
+@lru_cache(maxsize=16)
+def _positions(columns):
+    """Column indices of the sketched features, and of the flag gating each continuous one"""
+    position = {name: i for i, name in enumerate(columns)}
+    return (
+        [position[name] for name in CONTINUOUS_FEATURES],
+        [position[MEASURED_FLAG[name]] if name in MEASURED_FLAG else None for name in CONTINUOUS_FEATURES],
+        [position[name] for name in FLAG_FEATURES],
+    )
+
+
+def _bucket_value(index):
+    """Representative value of a bucket (within RELATIVE_ACCURACY of anything in it)"""
+    if index == 0:
+        return 0.0
+    if index == N_BUCKETS - 1:
+        return MAX_VALUE
+    return 2 * _GAMMA ** (index - 1 + _OFFSET) / (_GAMMA + 1)
+
+
+def drift_status(psi):
+    for threshold, status in PSI_THRESHOLDS:
+        if psi >= threshold:
+            return status
+    return 'stable'
+
+
+def population_stability_index(baseline, current, bins=PSI_BINS):
+    """
+    PSI of two count vectors over the same fine bins
+
+    Consecutive fine bins are grouped into up to `bins` bins holding about
+    equal shares of the baseline (fewer when a bin holds a large share).
+    """
+    baseline = np.asarray(baseline, dtype=np.float64)
+    current = np.asarray(current, dtype=np.float64)
+    if baseline.sum() == 0 or current.sum() == 0:
+        return float('nan')
+    if len(baseline) > bins:
+        cumulative = np.cumsum(baseline) / baseline.sum()
+        cuts = np.unique(np.searchsorted(cumulative, np.arange(1, bins) / bins, side='left'))
+        groups = np.concatenate(([0], cuts + 1))
+        groups = groups[groups < len(baseline)]
+        baseline = np.add.reduceat(baseline, groups)
+        current = np.add.reduceat(current, groups)
+    expected = np.maximum(baseline / baseline.sum(), PSI_EPSILON)
+    actual = np.maximum(current / current.sum(), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class DriftSketch:
+    """
+    Fixed-size, mergeable profile of a stream of panels and their predictions
+
+    update() folds in rows; merge() adds another sketch's counts. The result
+    does not depend on how the rows were split between sketches.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.values = np.zeros((len(CONTINUOUS_FEATURES), N_BUCKETS), dtype=np.int64)
+        self.flags = np.zeros(len(FLAG_FEATURES), dtype=np.int64)
+        self.classes = np.zeros(N_CLASSES, dtype=np.int64)
+        self.confidence = np.zeros(CONFIDENCE_BINS, dtype=np.int64)
+
+    def update(self, X, columns, prediction=None, confidence=None):
+        """
+        Fold in a batch of panels
+
+        Args:
+            X: (n_samples, n_columns) float array
+            columns: Column names of X (must include every sketched feature)
+            prediction: Optional (n_samples,) predicted class indices
+            confidence: Optional (n_samples,) confidence of the prediction, in percent
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        value_positions, measured_positions, flag_positions = _positions(tuple(columns))
+        values = X[:, value_positions]
+        measured = np.ones(values.shape, dtype=bool)
+        for j, position in enumerate(measured_positions):
+            if position is not None:
+                measured[:, j] = X[:, position] == 1
+        rows, features = np.nonzero(measured)
+        np.add.at(self.values, (features, _bucket_index(values[rows, features])), 1)
+        self.flags += (X[:, flag_positions] == 1).sum(axis=0)
+        if prediction is not None:
+            self.classes += np.bincount(np.asarray(prediction, dtype=np.intp), minlength=N_CLASSES)
+            bins = (np.asarray(confidence, dtype=np.float64) * CONFIDENCE_BINS / 100).astype(np.intp)
+            self.confidence += np.bincount(bins.clip(0, CONFIDENCE_BINS - 1), minlength=CONFIDENCE_BINS)
+        self.rows += len(X)
+        return self
+
+    def add(self, x, columns, prediction=None, confidence=None):
+        """Fold in one panel (a sequence of floats); same result as update() with one row"""
+        x = x.tolist() if isinstance(x, np.ndarray) else list(x)
+        value_positions, measured_positions, flag_positions = _positions(tuple(columns))
+        for j, (position, measured) in enumerate(zip(value_positions, measured_positions)):
+            if measured is None or x[measured] == 1:
+                self.values[j, _bucket_index_scalar(x[position])] += 1
+        for j, position in enumerate(flag_positions):
+            if x[position] == 1:
+                self.flags[j] += 1
+        if prediction is not None:
+            self.classes[prediction] += 1
+            self.confidence[min(max(int(confidence * CONFIDENCE_BINS / 100), 0), CONFIDENCE_BINS - 1)] += 1
+        self.rows += 1
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.values += other.values
+        self.flags += other.flags
+        self.classes += other.classes
+        self.confidence += other.confidence
+        return self
+
+    def quantile(self, feature, q):
+        """Approximate q-quantile of a continuous feature (None with no values)"""
+        counts = self.values[CONTINUOUS_FEATURES.index(feature)]
+        total = counts.sum()
+        if total == 0:
+            return None
+        value = _bucket_value(int(np.searchsorted(np.cumsum(counts), q * (total - 1), side='right')))
+        return float(f'{value:.3g}')
+
+    def to_state(self):
+        """JSON-serializable state (the value sketches as sparse {bucket: count} maps)"""
+        return {
+            'rows': int(self.rows),
+            'values': {name: {str(i): int(counts[i]) for i in np.flatnonzero(counts)}
+                       for name, counts in zip(CONTINUOUS_FEATURES, self.values)},
+            'flags': self.flags.tolist(),
+            'classes': self.classes.tolist(),
+            'confidence': self.confidence.tolist(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls()
+        sketch.rows = state['rows']
+        for j, name in enumerate(CONTINUOUS_FEATURES):
+            for i, count in state['values'][name].items():
+                sketch.values[j, int(i)] = count
+        sketch.flags[:] = state['flags']
+        sketch.classes[:] = state['classes']
+        sketch.confidence[:] = state['confidence']
+        return sketch
+
+
+def drift_report(baseline, current, class_mapping=None):
+    """
+    PSI of each feature, flag and prediction distribution of current against baseline
+
+    Returns:
+        dict with rows, an overall status (the worst PSI), and per-feature details
+    """
+    enough = current.rows >= MIN_ROWS
+
+    def scored(psi, **details):
+        status = drift_status(psi) if enough and not math.isnan(psi) else 'insufficient_data'
+        return {'psi': None if math.isnan(psi) else round(psi, 4), 'status': status, **details}
+
+    features = {}
+    for j, name in enumerate(CONTINUOUS_FEATURES):
+        features[name] = scored(
+            population_stability_index(baseline.values[j], current.values[j]),
+            baseline={f'p{round(q * 100)}': baseline.quantile(name, q) for q in QUANTILES},
+            current={f'p{round(q * 100)}': current.quantile(name, q) for q in QUANTILES},
+        )
+
+    flags = {}
+    for j, name in enumerate(FLAG_FEATURES):
+        base_rate = baseline.flags[j] / baseline.rows if baseline.rows else float('nan')
+        rate = current.flags[j] / current.rows if current.rows else float('nan')
+        flags[name] = scored(
+            population_stability_index([baseline.rows - baseline.flags[j], baseline.flags[j]],
+                                       [current.rows - current.flags[j], current.flags[j]]),
+            baseline_rate=round(float(base_rate), 4), current_rate=None if math.isnan(rate) else round(float(rate), 4),
+        )
+
+    labels = [class_mapping[k] for k in range(N_CLASSES)] if class_mapping else list(range(N_CLASSES))
+
+    def shares(counts):
+        total = counts.sum()
+        return {label: round(float(count / total) * 100, 2) if total else None for label, count in zip(labels, counts)}
+
+    predictions = {
+        'classes': scored(population_stability_index(baseline.classes, current.classes),
+                          baseline=shares(baseline.classes), current=shares(current.classes)),
+        'confidence': scored(population_stability_index(baseline.confidence, current.confidence)),
+    }
+
+    scores = [item['psi'] for group in (features, flags, predictions) for item in group.values()
+              if item['psi'] is not None]
+    max_psi = max(scores) if scores and enough else None
+    return {
+        'rows': int(current.rows),
+        'baseline_rows': int(baseline.rows),
+        'max_psi': max_psi,
+        'status': drift_status(max_psi) if max_psi is not None else 'insufficient_data',
+        'features': features,
+        'flags': flags,
+        'predictions': predictions,
+    }
+
+
+class DriftBaseline:
+    """
+    Baseline profile of the training CSV, persisted next to it
+
+    The prediction part depends on the model, so the artifact records the
+    model it was scored with and is rebuilt (about a second) for another.
+    """
+
+    def __init__(self, csv_path, cache_path=None):
+        self.csv_path = csv_path
+        if cache_path is None:
+            root, _ = os.path.splitext(csv_path)
+            cache_path = f'{root}.drift.json'
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._key = None
+        self._sketch = None
+
+    def get(self, predictor, model_key):
+        """
+        The baseline DriftSketch for a model
+
+        Args:
+            predictor: SoftEnsemblePredictor used to score the CSV if needed
+            model_key: Identifies the model's predictions (e.g. version and mode)
+        """
+        st = os.stat(self.csv_path)
+        key = (st.st_size, st.st_mtime_ns, model_key)
+        if self._key == key:
+            return self._sketch
+        with self._lock:
+            if self._key != key:
+                self._sketch = self._load(key) or self._build(key, predictor)
+                self._key = key
+            return self._sketch
+
+    def _load(self, key):
+        try:
+            with open(self.cache_path) as f:
+                artifact = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if artifact.get('format_version') != DRIFT_FORMAT_VERSION or tuple(artifact.get('key', ())) != key:
+            return None
+        return DriftSketch.from_state(artifact['state'])
+
+    def _build(self, key, predictor):
+        from columnar import load_table
+        from predict import FEATURE_COLUMNS
+
+        # The columnar copy when it is up to date (Model/columnar.py), else the CSV
+        X = load_table(self.csv_path, columns=FEATURE_COLUMNS, exact=True)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        result = predictor.predict_batch_result(X)
+        sketch = DriftSketch().update(X, FEATURE_COLUMNS, result.prediction, result.confidence)
+
+        tmp_path = f'{self.cache_path}.tmp-{os.getpid()}'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'format_version': DRIFT_FORMAT_VERSION, 'key': list(key),
+                           'state': sketch.to_state()}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not persist drift baseline: {e}")
+        return sketch
+
+
+class LocalDriftStore:
+    """Hourly sketches of this process only"""
+
+    def __init__(self):
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def add(self, hour, sketch):
+        with self._lock:
+            self._windows.setdefault(hour, DriftSketch()).merge(sketch)
+
+    def load(self, since_hour):
+        with self._lock:
+            total = DriftSketch()
+            for hour, sketch in self._windows.items():
+                if hour >= since_hour:
+                    total.merge(sketch)
+            return total
+
+    def prune(self, before_hour):
+        with self._lock:
+            for hour in [hour for hour in self._windows if hour < before_hour]:
+                del self._windows[hour]
+
+
+class SharedDriftStore:
+    """Hourly sketches in a SQLite file shared by every process on the host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._connections = LocalConnections(path)
+        self._connections.get().execute(
+            'CREATE TABLE IF NOT EXISTS drift_windows (hour INTEGER PRIMARY KEY, state TEXT NOT NULL)'
+        )
+
+    def add(self, hour, sketch):
+        """Merge a sketch into an hour's window in one write transaction"""
+        conn = self._connections.get()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT state FROM drift_windows WHERE hour = ?', (hour,)).fetchone()
+            if row is not None:
+                sketch = DriftSketch.from_state(json.loads(row[0])).merge(sketch)
+            conn.execute('INSERT OR REPLACE INTO drift_windows (hour, state) VALUES (?, ?)',
+                         (hour, json.dumps(sketch.to_state())))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def load(self, since_hour):
+        total = DriftSketch()
+        rows = self._connections.get().execute(
+            'SELECT state FROM drift_windows WHERE hour >= ?', (since_hour,)
+        ).fetchall()
+        for (state,) in rows:
+            total.merge(DriftSketch.from_state(json.loads(state)))
+        return total
+
+    def prune(self, before_hour):
+        self._connections.get().execute('DELETE FROM drift_windows WHERE hour < ?', (before_hour,))
+
+
+class DriftMonitor:
+    """
+    Profile of recent traffic, kept in hourly windows
+
+    observe() only updates the pending sketch under a lock; flushes to the
+    store happen at most once per flush_interval, from the request path.
+    """
+
+    def __init__(self, store=None, flush_interval=10.0, retention_hours=24):
+        self.store = store if store is not None else LocalDriftStore()
+        self.flush_interval = flush_interval
+        self.retention_hours = retention_hours
+        self._pending = DriftSketch()
+        self._lock = threading.Lock()
+        self._next_flush = time.monotonic() + flush_interval
+
+    @staticmethod
+    def _hour(now=None):
+        return int((time.time() if now is None else now) // 3600)
+
+    def observe(self, x, columns, prediction, confidence):
+        """Add one scored panel (see DriftSketch.add) and flush if one is due"""
+        with self._lock:
+            self._pending.add(x, columns, prediction, confidence)
+        if time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def observe_batch(self, X, columns, prediction, confidence):
+        """Add scored panels (see DriftSketch.update) and flush if one is due"""
+        with self._lock:
+            self._pending.update(X, columns, prediction, confidence)
+        if time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def flush(self):
+        """Move the pending rows into the current hour's window"""
+        with self._lock:
+            pending, self._pending = self._pending, DriftSketch()
+            self._next_flush = time.monotonic() + self.flush_interval
+        if pending.rows == 0:
+            return
+        hour = self._hour()
+        try:
+            self.store.add(hour, pending)
+            self.store.prune(hour - self.retention_hours + 1)
+        except Exception as e:
+            # Keep the rows for the next flush rather than losing them
+            print(f"Drift monitor flush failed: {e}")
+            with self._lock:
+                self._pending.merge(pending)
+
+    def current(self, hours=None):
+        """Combined sketch of the last `hours` hourly windows (default: all retained)"""
+        self.flush()
+        hours = self.retention_hours if hours is None else max(1, min(int(hours), self.retention_hours))
+        return self.store.load(self._hour() - hours + 1)
+
+
+if __name__ == "__main__":
+    import sys
+    import warnings
+    warnings.filterwarnings('ignore')
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Model'))
+    from columnar import load_table
+    from predict import SoftEnsemblePredictor, FEATURE_COLUMNS
+
+    csv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset', 'df_copy_cleaned.csv')
+    predictor = SoftEnsemblePredictor()
+    start = time.perf_counter()
+    baseline = DriftBaseline(csv_path).get(predictor, 'Model')
+    print(f"\n✓ Baseline profile of {baseline.rows} rows in {time.perf_counter() - start:.2f}s")
+    print(f"  Sketch: {N_BUCKETS} buckets x {len(CONTINUOUS_FEATURES)} features, "
+          f"{len(json.dumps(baseline.to_state())) / 1024:.1f} KB as JSON")
+
+    X = load_table(csv_path, columns=FEATURE_COLUMNS, exact=True)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    monitor = DriftMonitor(flush_interval=float('inf'))
+    start = time.perf_counter()
+    for row in X[:2000].tolist():
+        monitor.observe(row, FEATURE_COLUMNS, 2, 95.0)
+    print(f"  observe(): {(time.perf_counter() - start) / 2000 * 1e6:.1f} µs per panel")
+    batch = DriftSketch().update(X[:2000], FEATURE_COLUMNS, [2] * 2000, [95.0] * 2000)
+    same = all(np.array_equal(getattr(batch, name), getattr(monitor._pending, name))
+               for name in ('values', 'flags', 'classes', 'confidence'))
+    print(f"  add() per row matches update() on the batch: {same}")
+
+    # A shifted population: TSH x3 and TBG measured on every panel
+    shifted = X.copy()
+    shifted[:, FEATURE_COLUMNS.index('TSH')] *= 3
+    shifted[:, FEATURE_COLUMNS.index('TBG_measured')] = 1
+    for name, rows in (('same', X), ('shifted', shifted)):
+        result = predictor.predict_batch_result(rows)
+        report = drift_report(baseline, DriftSketch().update(rows, FEATURE_COLUMNS, result.prediction,
+                                                             result.confidence))
+        worst = sorted(((item['psi'], key) for group in ('features', 'flags') for key, item in report[group].items()),
+                       reverse=True)[:3]
+        print(f"  {name:>8}: status={report['status']}, max PSI {report['max_psi']}, top {worst}")
@@ -0,0 +1,74 @@
+"""
+Gunicorn configuration
+Loads the soft ensemble once in the master and forks workers from it, so the
+models are shared copy-on-write instead of being unpickled by every worker.
+
+Environment:
+    WEB_CONCURRENCY      Worker processes (default 2)
+    GUNICORN_THREADS     gthread threads per worker (default 2)
+    GUNICORN_PRELOAD     1 to load app.py in the master before forking (default 1)
+    MODEL_THREADS        BLAS/OpenMP and n_jobs threads per worker (default 1)
+    METRICS_DIR          Directory for the workers' metrics snapshots (default:
+                         a fresh directory in /dev/shm for each server run)
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+worker_class = 'gthread'
+worker_tmp_dir = '/dev/shm'
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+MODEL_THREADS = int(os.environ.get('MODEL_THREADS', 1))
+
+# Shared by the workers so /metrics reports the whole server (see metrics.py);
+# set before app.py is imported, in the master or in each worker
+_created_metrics_dir = 'METRICS_DIR' not in os.environ
+if _created_metrics_dir:
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='thyrapredict-metrics-',
+                                                 dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+os.makedirs(os.environ['METRICS_DIR'], exist_ok=True)
+
+# OpenBLAS/MKL/OpenMP read these when their pools are first created, which
+# happens while app.py is imported in the master; workers inherit the limit
+for _var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(_var, str(MODEL_THREADS))
+
+
+def when_ready(server):
+    # Move everything allocated while loading the models into the permanent
+    # generation: the collector then never writes to those object headers,
+    # so the pages holding them stay shared with the workers after fork
+    if preload_app:
+        gc.freeze()
+        server.log.info("Preloaded app; froze %d objects before forking", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    from threadpoolctl import threadpool_limits
+
+    # Cap the BLAS/OpenMP pools in each worker so N workers do not each run
+    # one thread per core
+    threadpool_limits(limits=MODEL_THREADS)
+
+
+def post_worker_init(worker):
+    # Runs once the app is importable in the worker (inherited with preload,
+    # freshly loaded without it); the pickled RF/XGBoost default to n_jobs=-1
+    import app
+    app.model_manager.set_num_threads(MODEL_THREADS)
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's counters in the totals and drop its gauges
+    from metrics import archive_process
+    archive_process(os.environ['METRICS_DIR'], worker.pid)
+
+
+def on_exit(server):
+    if _created_metrics_dir:
+        shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
@@ -0,0 +1,291 @@
+"""
+Prediction Jobs
+Asynchronous scoring of large CSV uploads for /api/jobs.
+
+Uploads are saved to disk and queued in a SQLite job table; worker threads
+(embedded in each web process, or a standalone `python jobs.py` process)
+claim queued jobs, score them in fixed-size chunks with
+SoftEnsemblePredictor.predict_batch_result and append the results to a CSV that is
+streamed back once the job is done. No external services are needed, and
+any process on the host can claim jobs from the same store.
+"""
+
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from prediction_cache import LocalConnections
+
+# Columns of the results CSV; `row` is the 0-based data row of the upload
+RESULT_COLUMNS = ['row', 'prediction', 'confidence', 'prob_Negative', 'prob_Hypo', 'prob_Hyper', 'error']
+
+
+class JobStore:
+    """
+    SQLite job table plus one directory per job for the input and results
+
+    Claiming a job is a single IMMEDIATE transaction, so several processes
+    can share a store. A running job whose heartbeat is older than
+    stale_after seconds (its worker died) is handed out again.
+    """
+
+    def __init__(self, directory, stale_after=300):
+        self.directory = os.path.abspath(directory)
+        self.stale_after = stale_after
+        os.makedirs(self.directory, exist_ok=True)
+        self._connections = LocalConnections(os.path.join(self.directory, 'jobs.sqlite'))
+        self._connections.get().execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT,'
+            ' total_rows INTEGER NOT NULL, processed_rows INTEGER NOT NULL DEFAULT 0,'
+            ' error_rows INTEGER NOT NULL DEFAULT 0, error TEXT,'
+            ' created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL)'
+        )
+
+    def job_dir(self, job_id):
+        return os.path.join(self.directory, job_id)
+
+    def input_path(self, job_id):
+        return os.path.join(self.job_dir(job_id), 'input.csv')
+
+    def results_path(self, job_id):
+        return os.path.join(self.job_dir(job_id), 'results.csv')
+
+    def new_job_id(self):
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        return job_id
+
+    def enqueue(self, job_id, total_rows, filename=None):
+        self._connections.get().execute(
+            'INSERT INTO jobs (id, status, filename, total_rows, created_at) VALUES (?, ?, ?, ?, ?)',
+            (job_id, 'queued', filename, total_rows, time.time())
+        )
+
+    def get(self, job_id):
+        conn = self._connections.get()
+        cursor = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([c[0] for c in cursor.description], row))
+
+    def claim(self):
+        """Mark the oldest claimable job as running and return it, or None"""
+        conn = self._connections.get()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued'"
+                " OR (status = 'running' AND heartbeat_at < ?) ORDER BY created_at LIMIT 1",
+                (now - self.stale_after,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?,"
+                    " processed_rows = 0, error_rows = 0 WHERE id = ?",
+                    (now, now, row[0])
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return self.get(row[0]) if row is not None else None
+
+    def progress(self, job_id, processed_rows, error_rows):
+        self._connections.get().execute(
+            'UPDATE jobs SET processed_rows = ?, error_rows = ?, heartbeat_at = ? WHERE id = ?',
+            (processed_rows, error_rows, time.time(), job_id)
+        )
+
+    def finish(self, job_id, processed_rows, error_rows):
+        self._connections.get().execute(
+            "UPDATE jobs SET status = 'done', processed_rows = ?, total_rows = ?, error_rows = ?,"
+            " finished_at = ? WHERE id = ?",
+            (processed_rows, processed_rows, error_rows, time.time(), job_id)
+        )
+
+    def fail(self, job_id, error):
+        self._connections.get().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+            (error, time.time(), job_id)
+        )
+
+    def purge(self, older_than):
+        """Delete finished jobs (and their files) that finished more than older_than seconds ago"""
+        conn = self._connections.get()
+        cutoff = time.time() - older_than
+        expired = [row[0] for row in conn.execute(
+            "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,)
+        )]
+        for job_id in expired:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        return len(expired)
+
+
+def read_csv_header(path):
+    """Column names from the first line of a CSV file"""
+    return list(pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns)
+
+
+def count_data_rows(path, block_size=1 << 20):
+    """Number of lines after the header (a progress estimate; the job records the exact count)"""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def score_chunk(predictor, chunk, feature_columns, first_row):
+    """
+    Score one DataFrame chunk into a results frame
+
+    Rows with missing or non-numeric features are reported in the error
+    column instead of failing the chunk.
+    """
+    X = chunk[feature_columns].apply(pd.to_numeric, errors='coerce')
+    invalid = X.isna().any(axis=1).to_numpy()
+
+    out = pd.DataFrame({
+        'row': np.arange(first_row, first_row + len(chunk)),
+        'prediction': pd.Series([None] * len(chunk), dtype=object),
+        'confidence': np.nan,
+        'prob_Negative': np.nan,
+        'prob_Hypo': np.nan,
+        'prob_Hyper': np.nan,
+        'error': pd.Series([None] * len(chunk), dtype=object),
+    })
+    if invalid.any():
+        bad_columns = X.columns.to_numpy()
+        out.loc[invalid, 'error'] = [
+            'Invalid or missing: ' + ', '.join(bad_columns[row_mask])
+            for row_mask in X[invalid].isna().to_numpy()
+        ]
+
+    valid = ~invalid
+    if valid.any():
+        scored = predictor.predict_batch_result(X[valid].to_numpy(dtype=np.float64)).to_frame()
+        out.loc[valid, 'prediction'] = scored['label'].to_numpy()
+        for col in ('confidence', 'prob_Negative', 'prob_Hypo', 'prob_Hyper'):
+            out.loc[valid, col] = scored[col].to_numpy()
+    return out, int(invalid.sum())
+
+
+class JobRunner:
+    """
+    Pool of threads that claim and score jobs from a JobStore
+
+    start() is idempotent per process, so a web app can call it on every
+    request; threads started in a gunicorn master before fork do not exist
+    in the workers, and each worker then starts its own.
+    """
+
+    def __init__(self, store, predictor, feature_columns, threads=1, chunk_rows=5000, poll_interval=1.0,
+                 retention=7 * 24 * 3600):
+        self.store = store
+        self.predictor = predictor
+        self.feature_columns = list(feature_columns)
+        self.threads = threads
+        self.chunk_rows = chunk_rows
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._pid == os.getpid() or self.threads <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            for i in range(self.threads):
+                threading.Thread(target=self._loop, name=f'job-runner-{i}', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        last_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.time() - last_purge > 3600:
+                    self.store.purge(self.retention)
+                    last_purge = time.time()
+                if not self.run_once():
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                print(f"Job runner error: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def run_once(self):
+        """Claim and process one job; returns False if the queue was empty"""
+        job = self.store.claim()
+        if job is None:
+            return False
+        self.process(job)
+        return True
+
+    def process(self, job):
+        job_id = job['id']
+        results_path = self.store.results_path(job_id)
+        partial_path = results_path + '.part'
+        processed = errors = 0
+        # Score every chunk of a job with the same model, even across a hot reload
+        predictor = self.predictor
+        try:
+            with open(partial_path, 'w', newline='') as out:
+                reader = pd.read_csv(self.store.input_path(job_id), usecols=self.feature_columns, dtype=str,
+                                     chunksize=self.chunk_rows, encoding='utf-8-sig')
+                for chunk in reader:
+                    scored, chunk_errors = score_chunk(predictor, chunk, self.feature_columns, processed)
+                    scored.to_csv(out, header=processed == 0, index=False, columns=RESULT_COLUMNS,
+                                  float_format='%.4f')
+                    processed += len(chunk)
+                    errors += chunk_errors
+                    self.store.progress(job_id, processed, errors)
+                if processed == 0:
+                    out.write(','.join(RESULT_COLUMNS) + '\n')
+            os.replace(partial_path, results_path)
+            self.store.finish(job_id, processed, errors)
+        except Exception as e:
+            traceback.print_exc()
+            self.store.fail(job_id, str(e))
+
+
+if __name__ == "__main__":
+    # Standalone worker process: `python jobs.py` (JOBS_DIR, JOB_WORKER_THREADS, JOB_CHUNK_ROWS)
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Model'))
+    from predict import SoftEnsemblePredictor, FEATURE_COLUMNS
+
+    store = JobStore(os.environ.get('JOBS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             'instance', 'jobs')))
+    runner = JobRunner(store, SoftEnsemblePredictor(), FEATURE_COLUMNS,
+                       threads=int(os.environ.get('JOB_WORKER_THREADS', 1)),
+                       chunk_rows=int(os.environ.get('JOB_CHUNK_ROWS', 5000)))
+    runner.start()
+    print(f"✓ Job worker polling {store.directory}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        runner.stop()
@@ -0,0 +1,312 @@
+"""
+Lightweight Prometheus-style metrics
+Thread-safe counters and fixed-bucket histograms rendered in the Prometheus
+text exposition format, without external dependencies.
+
+With a multiprocess_dir, every process writes a snapshot of its metrics to
+<dir>/<pid>.json about once per flush_interval, and render() merges all of
+them, so a scrape answered by any gunicorn worker reports the whole server.
+Counters and histograms are summed; gauges are summed by default or combined
+as describe()'d (e.g. max). When a worker exits, archive_process() folds its
+counters and histograms into archive.json so totals never go backwards, and
+drops its gauges. Running totals kept by other components are recorded with
+mirror(), which turns them into counters, not with set().
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+
+ARCHIVE_FILE = 'archive.json'
+
+# Default latency buckets in seconds (50us .. 10s)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative counts are computed at render time)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _key(entry):
+    """(name, labels) key from its JSON form [name, [[label, value], ...]]"""
+    return entry[0], tuple(tuple(label) for label in entry[1])
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_snapshot(path, snapshot):
+    tmp_path = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def _merge_snapshots(snapshots, gauge_modes=None):
+    """Combine snapshots into (counters, gauges, histograms) dicts keyed by (name, labels)"""
+    gauge_modes = gauge_modes or {}
+    counters, gauges, histograms = {}, {}, {}
+    for snapshot in snapshots:
+        for entry in snapshot.get('counters', []):
+            key = _key(entry)
+            counters[key] = counters.get(key, 0) + entry[2]
+        for entry in snapshot.get('gauges', []):
+            key = _key(entry)
+            if key in gauges and gauge_modes.get(key[0]) == 'max':
+                gauges[key] = max(gauges[key], entry[2])
+            else:
+                gauges[key] = gauges.get(key, 0) + entry[2]
+        for entry in snapshot.get('histograms', []):
+            key = _key(entry)
+            buckets, counts, total, count = entry[2:]
+            if key not in histograms:
+                histograms[key] = (tuple(buckets), list(counts), total, count)
+            elif list(histograms[key][0]) == list(buckets):
+                merged = histograms[key]
+                histograms[key] = (merged[0], [a + b for a, b in zip(merged[1], counts)],
+                                   merged[2] + total, merged[3] + count)
+            else:
+                # Cannot be added bucket by bucket; keep the series seen first
+                print(f"Skipping {key[0]} observations with bucket layout {list(buckets)}: "
+                      f"does not match {list(histograms[key][0])}")
+    return counters, gauges, histograms
+
+
+def archive_process(directory, pid):
+    """
+    Fold the counters and histograms of an exited process into the archive
+
+    Called from the gunicorn master (child_exit), the only writer of the archive.
+    """
+    path = os.path.join(directory, f'{pid}.json')
+    snapshot = _read_snapshot(path)
+    if snapshot is None:
+        return
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    archive = _read_snapshot(archive_path) or {}
+    counters, _, histograms = _merge_snapshots([archive, snapshot])
+    archive = {
+        'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+        'histograms': [[name, labels, list(buckets), counts, total, count]
+                       for (name, labels), (buckets, counts, total, count) in histograms.items()],
+        # Readers skip these files, so a scrape between the two writes counts the process once
+        'archived': [pid],
+    }
+    _write_snapshot(archive_path, archive)
+    os.remove(path)
+    archive['archived'] = []
+    _write_snapshot(archive_path, archive)
+
+
+class MetricsRegistry:
+    """
+    Collection of named counters, gauges and histograms keyed by label set
+
+    A single lock guards all updates; each update is a dict lookup, a bisect
+    and a few integer increments, so recording stays in the microsecond range.
+    """
+
+    def __init__(self, multiprocess_dir=None, flush_interval=1.0):
+        """
+        Args:
+            multiprocess_dir: Directory shared by all processes of the server
+                              (None: report this process only)
+            flush_interval: Seconds between snapshots written by start_writer()
+        """
+        self.multiprocess_dir = multiprocess_dir
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+        self._gauge_modes = {}
+        self._writer_pid = None
+        self._mirrored = {}
+        self._collect_lock = threading.Lock()
+        # callable() run before each snapshot or render, to refresh gauges
+        # and mirrored counters from other components' stats
+        self.collect_hooks = []
+
+    def describe(self, name, kind, help_text, multiprocess_mode='sum'):
+        """
+        Register HELP/TYPE metadata for a metric family
+
+        multiprocess_mode combines a gauge across processes: 'sum' or 'max'.
+        """
+        self._help[name] = (kind, help_text)
+        self._gauge_modes[name] = multiprocess_mode
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def mirror(self, name, total, **labels):
+        """
+        Advance a counter to another component's running total
+
+        Records the increase since the previous call, so the value is a real
+        counter: it is archived when the worker exits and never goes
+        backwards. A total lower than last time (the component was reset)
+        counts from zero.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            previous = self._mirrored.get(key, 0)
+            self._mirrored[key] = total
+            delta = total - previous if total >= previous else total
+            self._counters[key] = self._counters.get(key, 0) + delta
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def clear(self, name):
+        """Drop every label set of a gauge family (e.g. an info metric whose label changed)"""
+        with self._lock:
+            for key in [key for key in self._gauges if key[0] == name]:
+                del self._gauges[key]
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def get(self, name, **labels):
+        """Current value of a counter or gauge (0 if never recorded)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            return self._counters.get(key, self._gauges.get(key, 0))
+
+    def snapshot(self):
+        """JSON-serializable copy of this process's metrics"""
+        self._run_collect_hooks()
+        with self._lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self._counters.items()],
+                'gauges': [[name, labels, value] for (name, labels), value in self._gauges.items()],
+                'histograms': [[name, labels, list(h.buckets), list(h.counts), h.sum, h.count]
+                               for (name, labels), h in self._histograms.items()],
+            }
+
+    def _run_collect_hooks(self):
+        # One run at a time, so mirrored totals are read in increasing order
+        with self._collect_lock:
+            for hook in self.collect_hooks:
+                hook()
+
+    def write_snapshot(self):
+        """Write this process's snapshot to the multiprocess directory"""
+        _write_snapshot(os.path.join(self.multiprocess_dir, f'{os.getpid()}.json'), self.snapshot())
+
+    def start_writer(self):
+        """
+        Start the thread writing this process's snapshot every flush_interval
+
+        Cheap to call on every request; starts once per process, so each
+        forked worker gets its own thread.
+        """
+        if self.multiprocess_dir is None or self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+        threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True).start()
+
+    def _write_loop(self):
+        while True:
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                print(f"Could not write metrics snapshot: {e}")
+            time.sleep(self.flush_interval)
+
+    def _collect(self):
+        """(counters, gauges, histograms) of this process, or of all processes sharing the directory"""
+        if self.multiprocess_dir is None:
+            self._run_collect_hooks()
+            with self._lock:
+                return (dict(self._counters), dict(self._gauges),
+                        {key: (h.buckets, list(h.counts), h.sum, h.count) for key, h in self._histograms.items()})
+        self.write_snapshot()
+        archive = _read_snapshot(os.path.join(self.multiprocess_dir, ARCHIVE_FILE)) or {}
+        skip = {ARCHIVE_FILE} | {f'{pid}.json' for pid in archive.get('archived', [])}
+        snapshots = [archive]
+        for filename in sorted(os.listdir(self.multiprocess_dir)):
+            if filename.endswith('.json') and filename not in skip:
+                snapshot = _read_snapshot(os.path.join(self.multiprocess_dir, filename))
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+        return _merge_snapshots(snapshots, self._gauge_modes)
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        counters, gauges, histograms = self._collect()
+
+        families = {}
+        for (name, labels), value in sorted(counters.items()):
+            families.setdefault(name, ('counter', []))[1].append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for (name, labels), value in sorted(gauges.items()):
+            families.setdefault(name, ('gauge', []))[1].append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            lines = families.setdefault(name, ('histogram', []))[1]
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + [float('inf')], counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (('le', _format_value(float(bound))),)
+                lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+
+        output = []
+        for name in sorted(families):
+            kind, lines = families[name]
+            kind, help_text = self._help.get(name, (kind, None))
+            if help_text:
+                output.append(f'# HELP {name} {help_text}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(lines)
+        return '\n'.join(output) + '\n'
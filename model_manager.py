@@ -0,0 +1,170 @@
+"""
+Hot model reload
+Holds the predictor a web worker serves and replaces it without a restart.
+
+A new version is loaded from the model registry (Model/model_registry.py) on
+a background thread, warmed up on sample panels and checked for valid
+probabilities, and only then swapped in with a single reference assignment.
+Requests read the predictor once and keep that reference, so requests
+already in flight finish on the old version while new ones get the new one.
+
+Every worker polls the registry's CURRENT pointer (at most once per
+check_interval, from the request path), so activating a version switches all
+gunicorn workers without any coordination between them.
+"""
+
+import os
+import threading
+import time
+import traceback
+
+import numpy as np
+
+
+class ModelManager:
+    """
+    The current predictor and its version, with background reloads
+
+    predictor and version are read without locking; a swap replaces both in
+    one assignment of the (predictor, version) pair.
+    """
+
+    def __init__(self, factory, registry=None, fallback_dir=None, warmup_rows=None, check_interval=5.0):
+        """
+        Args:
+            factory: callable(model_dir) returning a SoftEnsemblePredictor
+            registry: ModelRegistry to follow, or None to serve fallback_dir only
+            fallback_dir: Served (with version None) while the registry has no
+                          active version
+            warmup_rows: (n, 15) float array scored before a version is swapped in
+            check_interval: Seconds between checks of the registry's CURRENT pointer
+        """
+        self.factory = factory
+        self.registry = registry
+        self.fallback_dir = fallback_dir
+        self.warmup_rows = None if warmup_rows is None else np.asarray(warmup_rows, dtype=np.float64)
+        self.check_interval = check_interval
+        # Copied onto every newly loaded predictor
+        self.timing_hook = None
+        self.num_threads = None
+        # callable(predictor) run after each swap, e.g. to repoint a MicroBatcher
+        self.swap_hooks = []
+        self.reloads = {'success': 0, 'failure': 0}
+        self.last_error = None
+        self._current = (None, None)
+        self._reload_lock = threading.Lock()
+        self._next_check = 0.0
+        self._failed_version = None
+
+    @property
+    def predictor(self):
+        return self._current[0]
+
+    @property
+    def version(self):
+        return self._current[1]
+
+    def set_timing_hook(self, hook):
+        self.timing_hook = hook
+        if self.predictor is not None:
+            self.predictor.timing_hook = hook
+
+    def set_num_threads(self, n_threads):
+        self.num_threads = n_threads
+        if self.predictor is not None:
+            self.predictor.set_num_threads(n_threads)
+
+    def load_initial(self):
+        """Load the active version (or fallback_dir) in the calling thread"""
+        version = self.registry.current() if self.registry is not None else None
+        if version is not None and version not in self.registry.versions():
+            print(f"Model version {version} not found in {self.registry.path}; serving {self.fallback_dir}")
+            version = None
+        self._swap(self._load(version), version)
+        return version
+
+    def _load(self, version):
+        model_dir = self.fallback_dir if version is None else self.registry.version_dir(version)
+        predictor = self.factory(model_dir)
+        predictor.model_version = version
+        if self.num_threads is not None:
+            predictor.set_num_threads(self.num_threads)
+        if self.warmup_rows is not None and len(self.warmup_rows):
+            self._warm_up(predictor)
+        predictor.timing_hook = self.timing_hook
+        return predictor
+
+    def _warm_up(self, predictor):
+        """Score the sample panels once so first requests skip lazy setup; reject broken models"""
+        for row in self.warmup_rows[:8]:
+            predictor.predict_array(row)
+        probabilities = predictor.predict_batch_result(self.warmup_rows).probabilities
+        if not (np.all(np.isfinite(probabilities)) and np.allclose(probabilities.sum(axis=1), 1.0)):
+            raise ValueError("Warm-up produced invalid probabilities")
+
+    def _swap(self, predictor, version):
+        self._current = (predictor, version)
+        for hook in self.swap_hooks:
+            hook(predictor)
+
+    def reload(self, version=None, if_changed=False):
+        """
+        Load a version (default: the registry's active one), warm it up and swap it in
+
+        Blocks until done; concurrent reloads run one at a time. On failure
+        the current predictor keeps serving and the error is raised.
+        With if_changed, returns None instead when the version is already served.
+
+        Returns:
+            dict with the version served before and after, and load seconds
+        """
+        with self._reload_lock:
+            if version is None:
+                version = self.registry.current() if self.registry is not None else None
+            previous = self.version
+            if if_changed and version == previous:
+                return None
+            start = time.perf_counter()
+            try:
+                predictor = self._load(version)
+            except Exception as e:
+                self.reloads['failure'] += 1
+                self.last_error = f"{version}: {e}"
+                self._failed_version = version
+                raise
+            self._swap(predictor, version)
+            self.reloads['success'] += 1
+            self._failed_version = None
+            return {'previous_version': previous, 'version': version,
+                    'load_seconds': time.perf_counter() - start}
+
+    def check(self):
+        """
+        Start a background reload if CURRENT moved to another version
+
+        Cheap enough for every request: it reads the pointer at most once per
+        check_interval and never waits for a load. A version that failed to
+        load is not retried until CURRENT changes again.
+        """
+        now = time.monotonic()
+        if self.registry is None or now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        version = self.registry.current()
+        if version is None or version == self.version or version == self._failed_version:
+            return
+        if self._reload_lock.locked():
+            return
+        threading.Thread(target=self._reload_in_background, args=(version,), name='model-reload',
+                         daemon=True).start()
+
+    def _reload_in_background(self, version):
+        try:
+            result = self.reload(version, if_changed=True)
+            if result is None:
+                return
+            print(f"[{os.getpid()}] Model reloaded: {result['previous_version']} -> {result['version']} "
+                  f"in {result['load_seconds']:.2f}s")
+        except Exception:
+            print(f"[{os.getpid()}] Model reload to {version} failed; still serving {self.version}")
+            traceback.print_exc()
@@ -0,0 +1,209 @@
+"""
+Prediction Result Cache
+LRU + TTL cache for soft ensemble results keyed on the normalized input
+features, with an optional SQLite backend that lets every gunicorn worker on
+the host share hits.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def connect_sqlite(path, timeout=5.0):
+    """Open a SQLite connection suited to concurrent access from several processes"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class LocalConnections:
+    """
+    One SQLite connection per thread, reopened in a forked child
+
+    SQLite connections are not thread-safe, and one opened before a gunicorn
+    fork must not be reused by the child.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = connect_sqlite(self.path)
+            self._local.pid = os.getpid()
+        return conn
+
+
+class SharedCacheBackend:
+    """
+    SQLite-backed key/value store shared between processes on one host
+
+    Entries carry an absolute expiry time; the table is pruned back to
+    max_entries (oldest first) every prune_interval writes.
+    """
+
+    def __init__(self, path, max_entries=100000, prune_interval=500):
+        self.path = path
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self._connections = LocalConnections(path)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn().execute(
+            'CREATE TABLE IF NOT EXISTS predictions ('
+            ' key TEXT PRIMARY KEY, value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL, created_at REAL NOT NULL)'
+        )
+
+    def _conn(self):
+        return self._connections.get()
+
+    def get(self, key):
+        """Return (value, expires_at) or None if missing/expired"""
+        row = self._conn().execute(
+            'SELECT value, expires_at FROM predictions WHERE key = ? AND expires_at > ?',
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, expires_at):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO predictions (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(value), expires_at, time.time())
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_interval == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Drop expired entries and trim the table to max_entries"""
+        conn = self._conn()
+        conn.execute('DELETE FROM predictions WHERE expires_at <= ?', (time.time(),))
+        conn.execute(
+            'DELETE FROM predictions WHERE key IN ('
+            ' SELECT key FROM predictions ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        self._conn().execute('DELETE FROM predictions')
+
+
+class PredictionCache:
+    """
+    In-process LRU cache with per-entry TTL, optionally backed by a shared store
+
+    Lookups check the local LRU first, then the shared backend; shared hits
+    are copied into the local LRU. Memory is bounded by maxsize entries.
+    """
+
+    def __init__(self, maxsize=4096, ttl=3600, backend=None, namespace=''):
+        """
+        Args:
+            maxsize: Maximum number of entries held in process memory
+            ttl: Seconds an entry stays valid
+            backend: Optional SharedCacheBackend for cross-worker hits
+            namespace: Prefix mixed into every key (e.g. the model version)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.namespace = namespace
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, features, columns, namespace=None):
+        """
+        Normalize a feature dict into a stable cache key
+
+        Values are read in the given column order and coerced to float, so
+        equivalent submissions (1 vs 1.0, different dict order) share a key.
+        namespace overrides self.namespace for this key.
+        """
+        normalized = ','.join(repr(float(features[col])) for col in columns)
+        digest = hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+        namespace = self.namespace if namespace is None else namespace
+        return f'{namespace}:{digest}' if namespace else digest
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.backend is not None:
+            try:
+                shared = self.backend.get(key)
+            except sqlite3.Error as e:
+                print(f"Shared prediction cache read failed: {e}")
+                shared = None
+            if shared is not None:
+                value, expires_at = shared
+                self._store(key, value, expires_at)
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        self._store(key, value, expires_at)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value, expires_at)
+            except sqlite3.Error as e:
+                print(f"Shared prediction cache write failed: {e}")
+
+    def _store(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,368 @@
+"""
+Research Papers
+Fetches recent thyroid papers from the CrossRef API for the /research page.
+
+The queries run concurrently over one pooled HTTP session. Results are
+served stale-while-revalidate: once anything has been fetched, requests get
+the cached papers immediately while at most one background refresh (single
+flight) updates them. Only a cold cache makes a request wait, and then for
+at most cold_wait seconds.
+
+An optional SQLite ResearchStore persists results across restarts and
+shares them between gunicorn workers; expired entries are revalidated with
+ETag / If-Modified-Since so unchanged results cost a 304.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from prediction_cache import LocalConnections
+
+CROSSREF_API_URL = 'https://api.crossref.org/v1/works'
+
+# Page section -> CrossRef query
+RESEARCH_QUERIES = {
+    'hypothyroidism': 'hypothyroidism',
+    'hyperthyroidism': 'hyperthyroidism',
+    'thyroid_ml': 'thyroid disease machine learning',
+}
+
+CROSSREF_FIELDS = 'title,author,published-print,published-online,container-title,abstract,URL'
+
+
+def parse_crossref_item(item):
+    """Convert one CrossRef work into the dict rendered by research.html"""
+    title = item.get('title', ['No title'])[0] if item.get('title') else 'No title'
+
+    # Authors
+    authors = []
+    for author in item.get('author', [])[:3]:
+        if author.get('family'):
+            authors.append(f"{author.get('family')} {author.get('given', '')}".strip())
+
+    authors_str = ', '.join(authors)
+    if len(item.get('author', [])) > 3:
+        authors_str += ' et al.'
+
+    # Journal
+    journal = item.get('container-title', ['Unknown Journal'])[0] if item.get('container-title') else 'Unknown Journal'
+
+    # Year
+    pub_date = item.get('published-print') or item.get('published-online') or item.get('issued')
+    year = ''
+    if pub_date:
+        if isinstance(pub_date, dict):
+            year = str(pub_date.get('date-parts', [[]])[0][0]) if pub_date.get('date-parts') else ''
+        elif isinstance(pub_date, str):
+            year = pub_date.split('-')[0]
+
+    # Abstract
+    abstract = item.get('abstract', 'No abstract available')
+    if abstract and len(abstract) > 300:
+        abstract = abstract[:297] + '...'
+
+    # URL/DOI
+    url_link = item.get('URL', '')
+    if not url_link and item.get('DOI'):
+        url_link = f"https://doi.org/{item.get('DOI')}"
+
+    return {
+        'title': title,
+        'authors': authors_str if authors_str else 'Unknown authors',
+        'journal': journal,
+        'year': year,
+        'abstract': abstract if abstract else 'No abstract available',
+        'url': url_link
+    }
+
+
+def parse_crossref_response(data):
+    """Papers from a CrossRef /works response body, skipping malformed items"""
+    papers = []
+    for item in data.get('message', {}).get('items', []):
+        try:
+            papers.append(parse_crossref_item(item))
+        except Exception as e:
+            print(f"Error processing paper: {e}")
+    return papers
+
+
+class CrossRefClient:
+    """Thin CrossRef /works client over a pooled, keep-alive requests.Session"""
+
+    def __init__(self, base_url=CROSSREF_API_URL, timeout=10, pool_size=len(RESEARCH_QUERIES)):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, query, max_results=1, etag=None, last_modified=None):
+        """
+        GET one query, conditionally when validators from a previous response are given
+
+        Returns (papers, etag, last_modified); papers is None when the server
+        answered 304 Not Modified. Raises requests.RequestException on failure.
+        """
+        params = {'query': query, 'rows': max_results, 'select': CROSSREF_FIELDS}
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        response = self.session.get(self.base_url, params=params, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return (None, response.headers.get('ETag', etag),
+                    response.headers.get('Last-Modified', last_modified))
+        response.raise_for_status()
+        return (parse_crossref_response(response.json()), response.headers.get('ETag'),
+                response.headers.get('Last-Modified'))
+
+    def search(self, query, max_results=1):
+        """Return the papers matching query; raises requests.RequestException on failure"""
+        return self.fetch(query, max_results)[0]
+
+
+class ResearchStore:
+    """
+    SQLite cache of CrossRef results shared by every worker on the host
+
+    Each row keeps the papers with the response's ETag/Last-Modified so an
+    expired entry can be revalidated with a conditional request. A lease
+    table lets one worker fetch a query while the others wait for its
+    result. The cache is trimmed to max_entries, least recently fetched first.
+    """
+
+    def __init__(self, path, max_entries=256):
+        self.path = path
+        self.max_entries = max_entries
+        self._connections = LocalConnections(path)
+        conn = self._connections.get()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS research_cache ('
+            ' key TEXT PRIMARY KEY, papers TEXT NOT NULL, etag TEXT, last_modified TEXT,'
+            ' fetched_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE TABLE IF NOT EXISTS research_leases (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)')
+
+    def get(self, key):
+        """Return {'papers', 'etag', 'last_modified', 'fetched_at'} or None"""
+        row = self._connections.get().execute(
+            'SELECT papers, etag, last_modified, fetched_at FROM research_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'papers': json.loads(row[0]), 'etag': row[1], 'last_modified': row[2], 'fetched_at': row[3]}
+
+    def put(self, key, papers, etag, last_modified, fetched_at):
+        conn = self._connections.get()
+        conn.execute(
+            'INSERT OR REPLACE INTO research_cache (key, papers, etag, last_modified, fetched_at)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            (key, json.dumps(papers), etag, last_modified, fetched_at)
+        )
+        conn.execute(
+            'DELETE FROM research_cache WHERE key IN ('
+            ' SELECT key FROM research_cache ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def touch(self, key, fetched_at, etag, last_modified):
+        """Mark a revalidated (304) entry as fresh"""
+        self._connections.get().execute(
+            'UPDATE research_cache SET fetched_at = ?, etag = ?, last_modified = ? WHERE key = ?',
+            (fetched_at, etag, last_modified, key)
+        )
+
+    def acquire(self, key, seconds):
+        """Take the fetch lease for key unless another live lease holds it"""
+        now = time.time()
+        cursor = self._connections.get().execute(
+            'INSERT INTO research_leases (key, expires_at) VALUES (?, ?)'
+            ' ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at'
+            ' WHERE research_leases.expires_at <= ?',
+            (key, now + seconds, now)
+        )
+        return cursor.rowcount == 1
+
+    def release(self, key):
+        self._connections.get().execute('DELETE FROM research_leases WHERE key = ?', (key,))
+
+
+class ResearchPapers:
+    """
+    Stale-while-revalidate cache of the /research queries
+
+    get() never waits on a warm cache. Expired entries are returned as-is
+    while a background refresh runs; a query that fails keeps its previous
+    papers. With a ResearchStore, entries are loaded from disk at startup
+    and refreshed at most once per host rather than once per worker.
+    """
+
+    def __init__(self, client, queries=None, ttl=24 * 3600, ttls=None, cold_wait=5.0, max_results=1,
+                 retry_interval=60, store=None):
+        """
+        Args:
+            client: CrossRefClient used for the queries
+            queries: Mapping of section name -> query (RESEARCH_QUERIES by default)
+            ttl: Seconds before cached papers are refreshed in the background
+            ttls: Optional per-section TTL overrides, e.g. {'thyroid_ml': 7 * 86400}
+            cold_wait: Longest a request waits for the first fetch to finish
+            max_results: Papers requested per query
+            retry_interval: Seconds to wait before retrying a failed query
+            store: Optional ResearchStore shared by all workers on the host
+        """
+        self.client = client
+        self.queries = dict(queries or RESEARCH_QUERIES)
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.cold_wait = cold_wait
+        self.max_results = max_results
+        self.retry_interval = retry_interval
+        self.store = store
+        self._entries = {}
+        self._failed_at = {}
+        self._init_sync()
+        if hasattr(os, 'register_at_fork'):
+            # A refresh thread running in the gunicorn master does not exist in
+            # the forked workers; reset the single-flight state there
+            os.register_at_fork(after_in_child=self._init_sync)
+
+        # Cold start: serve whatever a previous process left on disk
+        for name in self.queries:
+            entry = self._stored_entry(name)
+            if entry is not None:
+                self._entries[name] = entry
+
+    def _init_sync(self):
+        self._lock = threading.Lock()
+        self._refresh_done = None
+
+    def _key(self, name):
+        return f'{self.queries[name]}|{self.max_results}'
+
+    def ttl_for(self, name):
+        return self.ttls.get(name, self.ttl)
+
+    def _is_fresh_entry(self, name, entry):
+        return entry is not None and time.time() - entry['fetched_at'] < self.ttl_for(name)
+
+    def is_fresh(self, name):
+        return self._is_fresh_entry(name, self._entries.get(name))
+
+    def is_due(self, name):
+        """Stale, and not failed within the last retry_interval seconds"""
+        failed_at = self._failed_at.get(name)
+        recently_failed = failed_at is not None and time.time() - failed_at < self.retry_interval
+        return not self.is_fresh(name) and not recently_failed
+
+    def get(self):
+        """Return {section: papers}, triggering a refresh if anything is stale"""
+        if any(self.is_due(name) for name in self.queries):
+            done = self.refresh_async()
+        else:
+            done = self._refresh_done
+        if done is not None and not any(self._entries.get(name) for name in self.queries):
+            # Cold cache: wait briefly so the first visitor usually sees papers
+            done.wait(self.cold_wait)
+        return self.snapshot()
+
+    def snapshot(self):
+        return {name: self._entries[name]['papers'] if name in self._entries else [] for name in self.queries}
+
+    def refresh_async(self):
+        """Start a background refresh unless one is running; returns its completion Event"""
+        with self._lock:
+            if self._refresh_done is not None:
+                return self._refresh_done
+            done = self._refresh_done = threading.Event()
+        threading.Thread(target=self._refresh, args=(done,), name='research-refresh', daemon=True).start()
+        return done
+
+    def refresh(self):
+        """Refresh synchronously (joining an in-flight refresh if there is one)"""
+        self.refresh_async().wait()
+        return self.snapshot()
+
+    def _stored_entry(self, name):
+        if self.store is None:
+            return None
+        try:
+            return self.store.get(self._key(name))
+        except sqlite3.Error as e:
+            print(f"Research cache read failed: {e}")
+            return None
+
+    def _wait_for_store(self, name, timeout):
+        """Poll the store until another worker's fetch of name lands"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            entry = self._stored_entry(name)
+            if self._is_fresh_entry(name, entry):
+                return entry
+            time.sleep(0.1)
+        return None
+
+    def _fetch(self, name):
+        """Return a fresh entry for name, or None if it could not be refreshed"""
+        key = self._key(name)
+        stored = self._stored_entry(name)
+        if self._is_fresh_entry(name, stored):
+            # Another worker already refreshed it
+            return name, stored
+        previous = stored or self._entries.get(name)
+
+        leased = False
+        try:
+            if self.store is not None:
+                leased = self.store.acquire(key, self.client.timeout + 5)
+                if not leased:
+                    return name, self._wait_for_store(name, self.client.timeout + 5)
+
+            papers, etag, last_modified = self.client.fetch(
+                self.queries[name], max_results=self.max_results,
+                etag=previous and previous['etag'], last_modified=previous and previous['last_modified']
+            )
+            fetched_at = time.time()
+            if papers is None:
+                # 304 Not Modified: keep the papers we have
+                papers = previous['papers']
+                if stored is not None:
+                    self.store.touch(key, fetched_at, etag, last_modified)
+                elif self.store is not None:
+                    self.store.put(key, papers, etag, last_modified, fetched_at)
+            elif self.store is not None:
+                self.store.put(key, papers, etag, last_modified, fetched_at)
+            return name, {'papers': papers, 'etag': etag, 'last_modified': last_modified, 'fetched_at': fetched_at}
+        except Exception as e:
+            print(f"Error fetching CrossRef papers for '{self.queries[name]}': {e}")
+            return name, None
+        finally:
+            if leased:
+                try:
+                    self.store.release(key)
+                except sqlite3.Error as e:
+                    print(f"Research cache lease release failed: {e}")
+
+    def _refresh(self, done):
+        try:
+            stale = [name for name in self.queries if self.is_due(name)]
+            with ThreadPoolExecutor(max_workers=max(len(stale), 1), thread_name_prefix='crossref') as pool:
+                for name, entry in pool.map(self._fetch, stale):
+                    if entry is None:
+                        self._failed_at[name] = time.time()
+                    else:
+                        self._entries[name] = entry
+                        self._failed_at.pop(name, None)
+        finally:
+            with self._lock:
+                self._refresh_done = None
+            done.set()
@@ -167,6 +167,7 @@ class SurveyForm {
         .then(result => {
             // Store results in sessionStorage and redirect
             sessionStorage.setItem('predictionResults', JSON.stringify(result));
+            sessionStorage.setItem('predictionInput', JSON.stringify(data));
             window.location.href = '/results';
         })
         .catch(error => {
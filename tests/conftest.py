@@ -0,0 +1,22 @@
+"""
+Test configuration: serve Model/ directly with no registry, shared cache,
+metrics directory or background workers, and put Model/ on sys.path like
+app.py does.
+"""
+
+import os
+import sys
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Model'))
+sys.path.insert(0, ROOT)
+
+os.environ['MODEL_REGISTRY'] = ''
+os.environ['PREDICTION_CACHE_SIZE'] = '0'
+for name in ('PREDICTION_CACHE_SHARED_PATH', 'METRICS_DIR', 'MICRO_BATCH_WINDOW_MS', 'TREE_ENGINE', 'SVM_ENGINE',
+             'MODEL_BUNDLE', 'CASCADE', 'MODEL_STUDENT', 'DRIFT_MONITOR'):
+    os.environ.pop(name, None)
+
+# sklearn warns about feature names on every ndarray predict in the baseline path
+warnings.filterwarnings('ignore', category=UserWarning)
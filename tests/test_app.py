@@ -0,0 +1,54 @@
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture(scope='module')
+def client():
+    return app_module.app.test_client()
+
+
+# What static/js/survey.js posts: parseFloat of an empty input is NaN, which
+# JSON.stringify sends as null, and an unanswered pregnancy question is null
+SURVEY_PAYLOAD = {
+    'gender': 'female', 'age': 45, 'tsh': 2.1, 't3': 1.8, 'tt4': 105, 't4u': None,
+    'fti': None, 'tbg': None, 'pregnant': None,
+}
+
+
+def test_survey_payload_is_scored(client):
+    response = client.post('/api/predict', json=SURVEY_PAYLOAD)
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert body['success'] is True
+    assert body['prediction'] in ('Negative', 'Hypo', 'Hyper')
+
+
+def test_survey_payload_features():
+    features = app_module.build_input_features(SURVEY_PAYLOAD)
+    assert features['sex'] == 1 and features['pregnant'] == 0
+    assert features['TSH'] == 2.1 and features['TSH_measured'] == 1
+    assert features['FTI'] == 0.0 and features['FTI_measured'] == 0
+
+
+def test_model_layout_spelling_in_survey_panel():
+    features = app_module.build_input_features({'age': 40, 'TSH': 3})
+    assert features['TSH'] == 3.0 and features['TSH_measured'] == 1
+
+
+def test_partial_model_layout_row_is_rejected(client):
+    row = {col: 0 for col in app_module.FEATURE_COLUMNS if col != 'TBG'}
+    response = client.post('/api/predict', json=row)
+    assert response.status_code == 400
+    assert 'Missing columns: TBG' in response.get_json()['error']
+
+
+def test_empty_panel_is_rejected(client):
+    assert client.post('/api/predict', json={}).status_code == 400
+
+
+def test_batch_reports_errors_per_row(client):
+    response = client.post('/api/predict/batch', json={'panels': [SURVEY_PAYLOAD, {'age': 40, 'TSH': 3}, {}]})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['success'] for result in results] == [True, True, False]
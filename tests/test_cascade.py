@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cascade import CASCADE_FILE, CASCADE_MEMBERS, fit_thresholds, load_cascade, simulate
+from predict import SoftEnsemblePredictor, FEATURE_COLUMNS
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Model')
+
+
+def test_stage_that_cannot_exit_is_merged():
+    # lr is confidently wrong on row 0, so its stage would need a threshold above 1
+    probas = {name: np.array([[0.1, 0.1, 0.8], [0.8, 0.1, 0.1]]) for name in CASCADE_MEMBERS}
+    probas['lr'] = np.array([[1.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    order = ['lr', 'xgb', 'rf', 'svm', 'gb']
+    thresholds = fit_thresholds(probas, order, slack=0.05)
+    assert thresholds[0] is None
+    labels, used = simulate(probas, order, thresholds)
+    assert list(labels) == [2, 0]
+    assert used.min() >= 2
+
+
+def test_shipped_cascade_agrees_with_full_ensemble():
+    cascade = load_cascade(os.path.join(MODEL_DIR, CASCADE_FILE))
+    assert all(t is None or t < 1 for t in cascade['thresholds'])
+    assert cascade['order'][0] == 'lr' and sorted(cascade['order'][-2:]) == ['gb', 'svm']
+
+    full = SoftEnsemblePredictor(MODEL_DIR)
+    early_exit = SoftEnsemblePredictor(MODEL_DIR, cascade=True)
+    X = pd.read_csv(os.path.join(MODEL_DIR, '..', 'dataset', 'df_copy_cleaned.csv'),
+                    usecols=FEATURE_COLUMNS, nrows=500)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    result = early_exit.predict_batch_result(X)
+    assert (result.prediction == full.predict_batch_result(X).prediction).all()
+    assert result.members_used.mean() < len(CASCADE_MEMBERS)
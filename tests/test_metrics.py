@@ -0,0 +1,33 @@
+import os
+
+from metrics import MetricsRegistry, archive_process, _merge_snapshots
+
+
+def test_mirrored_totals_survive_a_worker_exit(tmp_path):
+    directory = str(tmp_path)
+    worker = MetricsRegistry(multiprocess_dir=directory)
+    worker.mirror('cache_hits_total', 5)
+    worker.mirror('cache_hits_total', 8)
+    assert worker.get('cache_hits_total') == 8
+    worker.write_snapshot()
+
+    # The worker exits; a fresh one starts counting from zero
+    archive_process(directory, os.getpid())
+    replacement = MetricsRegistry(multiprocess_dir=directory)
+    replacement.mirror('cache_hits_total', 2)
+    assert 'cache_hits_total 10' in replacement.render()
+
+
+def test_mirror_counts_a_reset_component_from_zero():
+    registry = MetricsRegistry()
+    registry.mirror('reloads_total', 3)
+    registry.mirror('reloads_total', 1)
+    assert registry.get('reloads_total') == 4
+
+
+def test_histograms_with_other_buckets_are_not_merged(capsys):
+    first = {'histograms': [['latency', [], [0.1, 1.0], [1, 2, 0], 1.5, 3]]}
+    second = {'histograms': [['latency', [], [0.5], [4, 0], 0.8, 4]]}
+    _, _, histograms = _merge_snapshots([first, second])
+    assert histograms[('latency', ())] == ((0.1, 1.0), [1, 2, 0], 1.5, 3)
+    assert 'does not match' in capsys.readouterr().out
@@ -0,0 +1,63 @@
+"""
+Parity of the NumPy serving paths with the original computation:
+scaler.transform on a DataFrame, each member's predict_proba on the scaled
+DataFrame, then np.mean over the five members.
+"""
+
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from predict import SoftEnsemblePredictor, FEATURE_COLUMNS
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Model')
+DATASET = os.path.join(MODEL_DIR, '..', 'dataset', 'df_copy_cleaned.csv')
+TOLERANCE = 1e-12
+CLASS_KEYS = {0: 'Hyper', 1: 'Hypo', 2: 'Negative'}
+
+
+def baseline_proba(df):
+    """The pre-fast-path computation, from freshly loaded pickles"""
+    def load(name):
+        return joblib.load(os.path.join(MODEL_DIR, name))
+
+    scaler = load('scaler.pkl')
+    members = [load(f'{name}_model.pkl') for name in ('rf', 'xgb', 'gb', 'svm', 'lr')]
+    X_processed = df[FEATURE_COLUMNS].copy()
+    numeric_cols = list(scaler.feature_names_in_)
+    X_processed[numeric_cols] = scaler.transform(X_processed[numeric_cols])
+    return np.mean([model.predict_proba(X_processed) for model in members], axis=0)
+
+
+@pytest.fixture(scope='module')
+def rows():
+    df = pd.read_csv(DATASET)
+    return df.sample(n=100, random_state=7)[FEATURE_COLUMNS].reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def expected(rows):
+    return baseline_proba(rows)
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    return SoftEnsemblePredictor(MODEL_DIR)
+
+
+def test_predict_batch_result_matches_baseline(predictor, rows, expected):
+    result = predictor.predict_batch_result(rows.to_numpy(dtype=np.float64))
+    assert np.abs(result.probabilities - expected).max() <= TOLERANCE
+    assert (result.prediction == expected.argmax(axis=1)).all()
+
+
+def test_predict_array_matches_baseline(predictor, rows, expected):
+    for i, row in enumerate(rows.to_numpy(dtype=np.float64)):
+        result = predictor.predict_array(row)
+        # The result dictionary reports percentages
+        actual = np.array([result['probabilities'][CLASS_KEYS[c]] / 100 for c in range(3)])
+        assert np.abs(actual - expected[i]).max() <= TOLERANCE, f"row {i}"
+        assert result['prediction'] == expected[i].argmax()
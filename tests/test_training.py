@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import train_test_split
+
+from model import build_members
+from predict import FEATURE_COLUMNS
+from training import train_members
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dataset',
+                       'df_copy_cleaned.csv')
+
+
+def small_members():
+    """model.py's members, with few trees so the test runs in seconds"""
+    members = build_members()
+    for name in ('rf', 'xgb', 'gb'):
+        members[name].set_params(n_estimators=10)
+    return members
+
+
+@pytest.fixture(scope='module')
+def split():
+    df = pd.read_csv(DATASET, nrows=400)
+    X, y = df[FEATURE_COLUMNS], df['target'].astype('category').cat.codes
+    return train_test_split(X, y, test_size=0.25, random_state=42, stratify=y)
+
+
+def probas(results):
+    return {name: result['proba'] for name, result in results.items()}
+
+
+def test_parallel_cached_training_matches_sequential(split, tmp_path):
+    X_train, X_test, y_train, _ = split
+    sequential = train_members(small_members(), X_train, y_train, X_test, workers=1)
+    parallel = train_members(small_members(), X_train, y_train, X_test, workers=2, cache_dir=str(tmp_path))
+    reloaded = train_members(small_members(), X_train, y_train, X_test, workers=2, cache_dir=str(tmp_path))
+
+    assert not any(result['cached'] for result in parallel.values())
+    assert all(result['cached'] for result in reloaded.values())
+    for name, expected in probas(sequential).items():
+        np.testing.assert_array_equal(parallel[name]['proba'], expected)
+        np.testing.assert_array_equal(reloaded[name]['proba'], expected)
+    # Thread caps used while fitting are restored on the returned models
+    assert parallel['rf']['model'].n_jobs == -1
+
+
+def test_cache_is_invalidated_by_data_and_params(split, tmp_path):
+    X_train, X_test, y_train, _ = split
+    cache_dir = str(tmp_path)
+    train_members(small_members(), X_train, y_train, X_test, workers=1, cache_dir=cache_dir)
+
+    changed_data = train_members(small_members(), X_train.iloc[1:], y_train.iloc[1:], X_test,
+                                 workers=1, cache_dir=cache_dir)
+    assert not any(result['cached'] for result in changed_data.values())
+
+    members = small_members()
+    members['rf'].set_params(max_depth=3)
+    changed_params = train_members(members, X_train, y_train, X_test, workers=1, cache_dir=cache_dir)
+    assert [name for name, result in changed_params.items() if not result['cached']] == ['rf']
+
+    # Thread counts do not change the fitted model, so they keep the cache
+    members = small_members()
+    members['rf'].set_params(n_jobs=1)
+    thread_change = train_members(members, X_train, y_train, X_test, workers=1, cache_dir=cache_dir)
+    assert all(result['cached'] for result in thread_change.values())